@@ -0,0 +1,68 @@
+"""
+Import time benchmark of mf2web and the command line scripts.
+
+Each statement is run in a fresh interpreter and the median wall time of
+several runs is reported. Run from the repository root:
+
+    python benchmarks/bench_import.py --repeat 10
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [("python startup", ["-c", "pass"]),
+         ("import mf2web", ["-c", "import mf2web"]),
+         ("import mf2web.server", ["-c", "import mf2web.server"]),
+         ("from mf2web import GwWebFlow",
+          ["-c", "from mf2web import GwWebFlow"]),
+         ("mf2web_cmd.py --help", ["mf2web_cmd.py", "--help"]),
+         ("mf2web_server.py --help", ["mf2web_server.py", "--help"])]
+
+
+def time_case(args, repeat):
+    """
+    Method to time a python command in fresh interpreters
+
+    Parameters
+    ----------
+    args : list
+        python command line arguments
+    repeat : int
+        number of runs
+
+    Returns
+    -------
+        tuple of (median seconds, return code of the last run)
+    """
+    times = []
+    returncode = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        returncode = subprocess.call([sys.executable] + args, cwd=ROOT,
+                                     stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return times[len(times) // 2], returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mf2web import benchmark")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of runs of each case")
+    args = parser.parse_args()
+
+    print("{:<32}{:>12}".format("case", "median ms"))
+    for name, case in CASES:
+        median, returncode = time_case(case, args.repeat)
+        status = "" if returncode == 0 else "  (exit {})".format(returncode)
+        print("{:<32}{:>12.1f}{}".format(name, median * 1000., status))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
-from .mf2web import GwWebFlow
-from . import seawat
-from . import mt3d
-from . import utils
-from . import mf88
+from .version import __version__
+from .lazy import lazy_attributes
+
+# submodules and flopy are imported on first use
+__getattr__, __dir__ = lazy_attributes(
+    __name__, {"GwWebFlow": ".mf2web"},
+    ("seawat", "mt3d", "utils", "mf88", "mf6", "export", "server"))
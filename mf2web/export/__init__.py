@@ -0,0 +1,13 @@
+from ..lazy import lazy_attributes
+
+# backends are imported on first use, they import flopy, netCDF4 and zarr
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {"NetCdfBackend": ".backends", "ZarrBackend": ".backends",
+     "netcdf_to_zarr": ".backends", "product_name": ".backends",
+     "OutputExporter": ".output", "OutputSource": ".output",
+     "ExportCancelled": ".output", "GridGeometry": ".geometry",
+     "CachedNetCdf": ".netcdf", "ActiveCellIndex": ".gather",
+     "compress_netcdf": ".gather", "scatter": ".gather",
+     "ValidityMask": ".mask", "UnitConverter": ".units",
+     "transpose_netcdf": ".timeseries"})
@@ -0,0 +1,593 @@
+"""
+Storage backends for mf2web exports.
+
+The netcdf backend writes through flopy's NetCdf object. The zarr backend
+carries the same coordinate variables and CF attributes (they are copied
+from a flopy NetCdf skeleton) but stores every (time, layer) slice as its
+own Blosc/Zstd compressed chunk, so worker processes can write chunks
+concurrently and a static web host can serve them with plain HTTP GETs.
+"""
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from flopy.export.netcdf import FILLVALUE
+from .netcdf import CachedNetCdf
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+try:
+    import zarr
+    from numcodecs import Blosc
+except ImportError:
+    zarr = None
+    Blosc = None
+
+
+BACKENDS = ("netcdf", "zarr")
+ZARR_STORES = ("directory", "zip")
+
+
+def product_name(report_id, scenario, kind, backend="netcdf",
+                 store="directory"):
+    """
+    Method to build the file name of an exported product
+
+    Parameters
+    ----------
+    report_id : str
+        usgs ipds number
+    scenario : str
+        model scenario
+    kind : str
+        product kind, "in" or "out"
+    backend : str
+        "netcdf" or "zarr"
+    store : str
+        zarr store type, "directory" or "zip"
+
+    Returns
+    -------
+        str
+    """
+    if backend == "netcdf":
+        return ".".join([report_id, scenario, kind, "nc"])
+    elif backend == "zarr":
+        name = ".".join([report_id, scenario, kind, "zarr"])
+        if store == "zip":
+            name += ".zip"
+        return name
+    raise ValueError("Invalid backend: {}".format(backend))
+
+
+def get_backend(backend, filename, model, times, store="directory",
+                **kwargs):
+    """
+    Method to create an export backend
+
+    Parameters
+    ----------
+    backend : str
+        "netcdf" or "zarr"
+    filename : str
+        output file name (for zarr zip stores, the .zip name)
+    model : flopy model object
+    times : list
+        totim values of the time dimension
+
+    Returns
+    -------
+        NetCdfBackend or ZarrBackend
+    """
+    if backend == "netcdf":
+        return NetCdfBackend(filename, model, times, **kwargs)
+    elif backend == "zarr":
+        return ZarrBackend(filename, model, times, store=store, **kwargs)
+    raise ValueError("Invalid backend: {}".format(backend))
+
+
+def open_writer(backend, path):
+    """
+    Method to reopen an existing export for writing data from
+    a worker process. The returned writer does not need the
+    model object.
+
+    Parameters
+    ----------
+    backend : str
+        "netcdf" or "zarr"
+    path : str
+        path of the netcdf file or zarr directory store
+
+    Returns
+    -------
+        writer object with write(), set_attributes() and close() methods
+    """
+    if backend == "zarr":
+        return ZarrWriter(path)
+    elif backend == "netcdf":
+        return NetCdfWriter(path)
+    raise ValueError("Invalid backend for worker writes: {}".format(backend))
+
+
+def zarr_compressor(clevel=5):
+    """
+    Method to get the default zarr compressor (Blosc with Zstd)
+
+    Parameters
+    ----------
+    clevel : int
+        compression level
+
+    Returns
+    -------
+        numcodecs.Blosc
+    """
+    _check_zarr()
+    return Blosc(cname="zstd", clevel=clevel, shuffle=Blosc.BITSHUFFLE)
+
+
+def default_chunks(shape):
+    """
+    Method to get the zarr chunk shape for a variable. Arrays
+    with two or more dimensions are chunked by their last two
+    (y, x) dimensions so every layer slice is a single chunk.
+
+    Parameters
+    ----------
+    shape : tuple
+
+    Returns
+    -------
+        tuple
+    """
+    if len(shape) < 2:
+        return tuple(max(int(i), 1) for i in shape)
+    return (1,) * (len(shape) - 2) + tuple(max(int(i), 1) for i in shape[-2:])
+
+
+def netcdf_to_zarr(nc_file, path, workers=None, store="directory"):
+    """
+    Method to copy a netcdf file (variables, dimensions and CF
+    attributes) to a zarr store. Large variables are copied in
+    chunk aligned blocks by multiple worker processes.
+
+    Parameters
+    ----------
+    nc_file : str
+        netcdf file name
+    path : str
+        zarr directory store name
+    workers : int
+        number of worker processes, default is os.cpu_count()
+    store : str
+        "directory" or "zip". If zip, the directory store is packed
+        into path + ".zip" and removed
+
+    """
+    _check_zarr()
+    if netCDF4 is None:
+        raise ImportError("netCDF4 must be installed for zarr exports")
+
+    blocks = []
+    with netCDF4.Dataset(nc_file) as ds:
+        group = zarr.open_group(path, mode="w")
+        group.attrs.update({k: _jsonify(ds.getncattr(k))
+                            for k in ds.ncattrs()})
+        for name, var in ds.variables.items():
+            if not isinstance(var.dtype, np.dtype):
+                # variable length strings are not carried to zarr
+                continue
+            attrs = {k: _jsonify(var.getncattr(k)) for k in var.ncattrs()}
+            fill = attrs.pop("_FillValue", None)
+            arr = create_zarr_array(group, name, var.dimensions, var.shape,
+                                    var.dtype, attrs, fill_value=fill)
+            if len(var.shape) == 0:
+                arr[...] = var[...]
+                continue
+            step = arr.chunks[0]
+            for start in range(0, var.shape[0], step):
+                blocks.append((name, start, min(start + step,
+                                                var.shape[0])))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_copy_block, nc_file, path, *block)
+                       for block in blocks]
+            for future in futures:
+                future.result()
+    else:
+        for block in blocks:
+            _copy_block(nc_file, path, *block)
+
+    finalize_zarr(path, store)
+
+
+def create_zarr_array(group, name, dimensions, shape, dtype, attrs,
+                      fill_value=None, chunks=None):
+    """
+    Method to create a compressed zarr array with xarray style
+    dimension names and CF attributes
+
+    Parameters
+    ----------
+    group : zarr.Group
+    name : str
+        variable name
+    dimensions : tuple
+        dimension names
+    shape : tuple
+    dtype : np.dtype
+    attrs : dict
+        variable attributes
+    fill_value : float
+    chunks : tuple
+        optional chunk shape, default is default_chunks(shape)
+
+    Returns
+    -------
+        zarr.Array
+    """
+    if chunks is None:
+        chunks = default_chunks(shape)
+    arr = group.create_dataset(name, shape=shape, chunks=chunks,
+                               dtype=dtype, compressor=zarr_compressor(),
+                               fill_value=fill_value, overwrite=True)
+    attrs = dict(attrs)
+    attrs["_ARRAY_DIMENSIONS"] = list(dimensions)
+    arr.attrs.update(attrs)
+    return arr
+
+
+def finalize_zarr(path, store="directory"):
+    """
+    Method to consolidate zarr metadata and optionally pack
+    the directory store into a zip store
+
+    Parameters
+    ----------
+    path : str
+        zarr directory store
+    store : str
+        "directory" or "zip"
+    """
+    zarr.consolidate_metadata(path)
+    if store == "zip":
+        # zarr zip stores must be written uncompressed, chunks are
+        # already compressed by Blosc
+        with zipfile.ZipFile(path + ".zip", "w",
+                             compression=zipfile.ZIP_STORED,
+                             allowZip64=True) as zf:
+            for root, _, files in os.walk(path):
+                for fname in files:
+                    fpath = os.path.join(root, fname)
+                    zf.write(fpath, os.path.relpath(fpath, path))
+        shutil.rmtree(path)
+
+
+class NetCdfBackend(object):
+    """
+    Export backend that writes through flopy's NetCdf object
+
+    Parameters
+    ----------
+    filename : str
+        netcdf file name
+    model : flopy model object
+    times : list
+        totim values of the time dimension
+    **kwargs : keyword arguments passed to CachedNetCdf
+    """
+    kind = "netcdf"
+    parallel = False
+
+    def __init__(self, filename, model, times, **kwargs):
+        self.filename = filename
+        self.path = filename
+        self.nc = CachedNetCdf(filename, model, time_values=times, **kwargs)
+        self.fillvalue = FILLVALUE
+        self.dimension_names = ("time",) + tuple(self.nc.dimension_names)
+        self.grid_units = self.nc.grid_units
+        self.time_units = self.nc.time_units
+        self._variables = {}
+
+    def create_variable(self, name, attribs, dimensions=None,
+                        precision_str="f4"):
+        """
+        Method to create a data variable
+
+        Parameters
+        ----------
+        name : str
+            variable name
+        attribs : dict
+            variable attributes
+        dimensions : tuple
+            dimension names, default is (time, layer, y, x)
+        precision_str : str
+            netcdf precision string
+
+        """
+        if dimensions is None:
+            dimensions = self.dimension_names
+        # records are converted by the exporter as they are read
+        var = self.nc.create_variable(name, attribs,
+                                      precision_str=precision_str,
+                                      dimensions=dimensions, convert=False)
+        self._variables[name] = var
+        return var
+
+    def dimension_sizes(self, names=None):
+        """
+        Method to get the (name, size) of dimensions
+
+        Parameters
+        ----------
+        names : tuple
+            dimension names, default is the data variable dimensions
+
+        Returns
+        -------
+            list of tuples
+        """
+        if names is None:
+            names = self.dimension_names
+        return [(name, len(self.nc.nc.dimensions[name])) for name in names]
+
+    def add_coordinate(self, name, data, attribs):
+        """
+        Method to add a dimension and its coordinate variable
+
+        Parameters
+        ----------
+        name : str
+            dimension and variable name
+        data : np.ndarray
+            1d coordinate values
+        attribs : dict
+            variable attributes
+        """
+        data = np.asarray(data)
+        self.nc.nc.createDimension(name, data.size)
+        var = self.nc.nc.createVariable(name, data.dtype, (name,))
+        var[:] = data
+        var.setncatts(attribs)
+
+    def write(self, name, index, array):
+        self._variables[name][index] = array
+
+    def set_attributes(self, name, attribs):
+        self._variables[name].setncatts(attribs)
+
+    def close(self):
+        self.nc.write()
+
+    def discard(self):
+        """
+        Method to close and remove a partial export
+        """
+        self.nc.nc.close()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+class ZarrBackend(object):
+    """
+    Export backend that writes a zarr directory or zip store. The
+    coordinate variables and global attributes are copied from a
+    flopy NetCdf skeleton so that netcdf and zarr exports carry
+    the same CF metadata.
+
+    Parameters
+    ----------
+    filename : str
+        store name, <name>.zarr for directory stores or
+        <name>.zarr.zip for zip stores
+    model : flopy model object
+    times : list
+        totim values of the time dimension
+    store : str
+        "directory" or "zip"
+    **kwargs : keyword arguments passed to CachedNetCdf
+    """
+    kind = "zarr"
+    parallel = True
+
+    def __init__(self, filename, model, times, store="directory", **kwargs):
+        _check_zarr()
+        if store not in ZARR_STORES:
+            raise ValueError("Invalid zarr store: {}".format(store))
+
+        self.filename = filename
+        self.store = store
+        if store == "zip" and filename.endswith(".zip"):
+            # chunks are written to a directory store and zipped on close
+            self.path = filename[:-4]
+        else:
+            self.path = filename
+
+        self.fillvalue = FILLVALUE
+        tmpdir = tempfile.mkdtemp()
+        try:
+            skeleton = os.path.join(tmpdir, "skeleton.nc")
+            nc = CachedNetCdf(skeleton, model, time_values=times, **kwargs)
+            self.dimension_names = ("time",) + tuple(nc.dimension_names)
+            self.grid_units = nc.grid_units
+            self.time_units = nc.time_units
+            self._dimensions = {k: len(v) for k, v in nc.nc.dimensions.items()}
+            nc.write()
+            netcdf_to_zarr(skeleton, self.path, workers=1)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        self.group = zarr.open_group(self.path, mode="r+")
+
+    def create_variable(self, name, attribs, dimensions=None,
+                        precision_str="f4"):
+        """
+        Method to create a data variable
+
+        Parameters
+        ----------
+        name : str
+            variable name
+        attribs : dict
+            variable attributes
+        dimensions : tuple
+            dimension names, default is (time, layer, y, x)
+        precision_str : str
+            netcdf precision string
+
+        """
+        if dimensions is None:
+            dimensions = self.dimension_names
+        shape = tuple(self._dimensions[d] for d in dimensions)
+        chunks = default_chunks(shape)
+        if len(shape) == 2 and dimensions[0] == "time":
+            # gathered (time, cell) variables, one chunk per time step
+            chunks = (1, max(shape[1], 1))
+        attribs = {k: _jsonify(v) for k, v in attribs.items()}
+        return create_zarr_array(self.group, name, dimensions, shape,
+                                 np.dtype(precision_str), attribs,
+                                 fill_value=self.fillvalue, chunks=chunks)
+
+    def dimension_sizes(self, names=None):
+        """
+        Method to get the (name, size) of dimensions
+
+        Parameters
+        ----------
+        names : tuple
+            dimension names, default is the data variable dimensions
+
+        Returns
+        -------
+            list of tuples
+        """
+        if names is None:
+            names = self.dimension_names
+        return [(name, self._dimensions[name]) for name in names]
+
+    def add_coordinate(self, name, data, attribs):
+        """
+        Method to add a dimension and its coordinate variable
+
+        Parameters
+        ----------
+        name : str
+            dimension and variable name
+        data : np.ndarray
+            1d coordinate values
+        attribs : dict
+            variable attributes
+        """
+        data = np.asarray(data)
+        self._dimensions[name] = data.size
+        arr = create_zarr_array(self.group, name, (name,), data.shape,
+                                data.dtype,
+                                {k: _jsonify(v) for k, v in attribs.items()})
+        arr[:] = data
+
+    def write(self, name, index, array):
+        self.group[name][index] = array
+
+    def set_attributes(self, name, attribs):
+        self.group[name].attrs.update({k: _jsonify(v)
+                                       for k, v in attribs.items()})
+
+    def close(self):
+        finalize_zarr(self.path, self.store)
+
+    def discard(self):
+        """
+        Method to remove a partial export
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class NetCdfWriter(object):
+    """
+    Writer for an existing netcdf file, used by worker processes
+
+    Parameters
+    ----------
+    path : str
+        netcdf file name
+    """
+    def __init__(self, path):
+        if netCDF4 is None:
+            raise ImportError("netCDF4 must be installed for netcdf exports")
+        self.ds = netCDF4.Dataset(path, "a")
+
+    def write(self, name, index, array):
+        self.ds.variables[name][index] = array
+
+    def set_attributes(self, name, attribs):
+        self.ds.variables[name].setncatts(attribs)
+
+    def close(self):
+        self.ds.close()
+
+
+class ZarrWriter(object):
+    """
+    Writer for an existing zarr store, used by worker processes
+
+    Parameters
+    ----------
+    path : str
+        zarr directory store
+    """
+    def __init__(self, path):
+        _check_zarr()
+        self.group = zarr.open_group(path, mode="r+")
+
+    def write(self, name, index, array):
+        self.group[name][index] = array
+
+    def set_attributes(self, name, attribs):
+        self.group[name].attrs.update({k: _jsonify(v)
+                                       for k, v in attribs.items()})
+
+    def close(self):
+        pass
+
+
+def _copy_block(nc_file, path, name, start, stop):
+    """
+    Worker method to copy a block of a netcdf variable to zarr
+    """
+    with netCDF4.Dataset(nc_file) as ds:
+        var = ds.variables[name]
+        data = var[start:stop]
+        fill = getattr(var, "_FillValue", None)
+        if np.ma.isMaskedArray(data):
+            data = data.filled(fill if fill is not None else 0)
+    group = zarr.open_group(path, mode="r+")
+    group[name][start:stop] = data
+
+
+def _jsonify(value):
+    """
+    Method to convert netcdf attribute values to json
+    serializable types for zarr
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    elif isinstance(value, np.generic):
+        return value.item()
+    elif isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+def _check_zarr():
+    if zarr is None:
+        raise ImportError("zarr and numcodecs must be installed "
+                          "for zarr exports")
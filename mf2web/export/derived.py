@@ -0,0 +1,109 @@
+"""
+Derived output products that are computed from heads while the head
+file is streamed into an export.
+"""
+import numpy as np
+
+
+DERIVED_VARIABLES = ("drawdown", "saturated_thickness")
+
+
+def starting_heads(model):
+    """
+    Method to get the starting heads of a model
+
+    Parameters
+    ----------
+    model : flopy model object
+
+    Returns
+    -------
+        np.ndarray or None
+    """
+    bas = model.get_package("BAS6")
+    if bas is not None:
+        return bas.strt.array
+    return None
+
+
+class DerivedProducts(object):
+    """
+    Picklable container of the arrays needed to compute derived
+    products from heads
+
+    Parameters
+    ----------
+    products : list
+        derived variable names, "drawdown" and/or "saturated_thickness"
+    reference : np.ndarray
+        reference heads for drawdown, usually the starting heads
+    reference_time : float
+        optional totim of the head record used as drawdown reference.
+        Overrides reference
+    top : np.ndarray
+        model top (nrow, ncol)
+    botm : np.ndarray
+        layer bottoms (nlay, nrow, ncol)
+    """
+    def __init__(self, products, reference=None, reference_time=None,
+                 top=None, botm=None):
+        for name in products:
+            if name not in DERIVED_VARIABLES:
+                raise ValueError("Invalid derived variable: {}".format(name))
+
+        self.products = list(products)
+        self.reference = reference
+        self.reference_time = reference_time
+
+        if "drawdown" in self.products and reference is None and \
+                reference_time is None:
+            raise ValueError("drawdown needs starting heads or a "
+                             "reference time")
+
+        self.layer_top = None
+        self.botm = None
+        if "saturated_thickness" in self.products:
+            if top is None or botm is None:
+                raise ValueError("saturated_thickness needs the model "
+                                 "top and layer bottoms")
+            botm = np.asarray(botm, dtype=np.float32)
+            self.botm = botm
+            self.layer_top = np.empty_like(botm)
+            self.layer_top[0] = top
+            self.layer_top[1:] = botm[:-1]
+
+    @property
+    def variables(self):
+        return list(self.products)
+
+    def compute(self, head, fillvalue):
+        """
+        Method to compute derived products from a masked head array
+
+        Parameters
+        ----------
+        head : np.ndarray
+            3d head array with inactive, dry and sentinel values
+            already set to the fill value
+        fillvalue : float
+            fill value of the export
+
+        Returns
+        -------
+            dict of {variable name: np.ndarray}
+        """
+        invalid = head == fillvalue
+        products = {}
+        if "drawdown" in self.products:
+            ref_invalid = self.reference == fillvalue
+            dd = np.subtract(self.reference, head, dtype=np.float32)
+            np.putmask(dd, invalid | ref_invalid, fillvalue)
+            products["drawdown"] = dd
+
+        if "saturated_thickness" in self.products:
+            thick = np.minimum(head, self.layer_top) - self.botm
+            thick = thick.astype(np.float32)
+            np.putmask(thick, invalid | (thick <= 0), fillvalue)
+            products["saturated_thickness"] = thick
+
+        return products
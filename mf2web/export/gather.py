@@ -0,0 +1,284 @@
+"""
+Active-cell-only storage of 3d variables using CF compression by
+gathering.
+
+Only active cells are stored along a "cell" dimension. The "cell" index
+variable has a compress = "layer crop_y crop_x" attribute and holds flat
+indices into the bounding box of active cells. The crop_y and crop_x
+coordinates hold the grid rows and columns of the bounding box.
+"""
+import numpy as np
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+
+
+GATHERED_DIMENSION = "cell"
+CROP_DIMENSIONS = ("layer", "crop_y", "crop_x")
+
+
+class ActiveCellIndex(object):
+    """
+    Gather index of the active cells of a structured grid
+
+    Parameters
+    ----------
+    active : np.ndarray
+        boolean (nlay, nrow, ncol) array of active cells
+    """
+    def __init__(self, active):
+        active = np.asarray(active, dtype=bool)
+        if not active.any():
+            raise ValueError("The model grid has no active cells")
+
+        self.shape = active.shape
+        rows = np.flatnonzero(active.any(axis=(0, 2)))
+        cols = np.flatnonzero(active.any(axis=(0, 1)))
+        self.row0, self.row1 = int(rows[0]), int(rows[-1]) + 1
+        self.col0, self.col1 = int(cols[0]), int(cols[-1]) + 1
+
+        crop = active[:, self.row0:self.row1, self.col0:self.col1]
+        self.crop_shape = crop.shape
+        # flat index into the cropped grid, stored in the file
+        self.index = np.flatnonzero(crop).astype(np.int32)
+        # flat index into the full grid, used to gather arrays
+        k, i, j = np.unravel_index(self.index, self.crop_shape)
+        self.full_index = np.ravel_multi_index(
+            (k, i + self.row0, j + self.col0), self.shape)
+
+    @property
+    def ncell(self):
+        return self.index.size
+
+    @property
+    def rows(self):
+        return np.arange(self.row0, self.row1, dtype=np.int32)
+
+    @property
+    def cols(self):
+        return np.arange(self.col0, self.col1, dtype=np.int32)
+
+    def gather(self, array):
+        """
+        Method to gather the active cells of a 3d array
+
+        Parameters
+        ----------
+        array : np.ndarray
+            (nlay, nrow, ncol) array
+
+        Returns
+        -------
+            np.ndarray of ncell values
+        """
+        return np.take(np.asarray(array).reshape(-1), self.full_index)
+
+    def scatter(self, values, fillvalue, crop=False):
+        """
+        Method to scatter gathered values back to a 3d array
+
+        Parameters
+        ----------
+        values : np.ndarray
+            (..., ncell) gathered values
+        fillvalue : float
+            value of inactive cells
+        crop : bool
+            return the bounding box of active cells instead of
+            the full grid
+
+        Returns
+        -------
+            np.ndarray
+        """
+        if crop:
+            return scatter(values, self.index, self.crop_shape, fillvalue)
+        return scatter(values, self.full_index, self.shape, fillvalue)
+
+    def cell(self, layer, row, col):
+        """
+        Method to get the gathered position of a model cell
+
+        Parameters
+        ----------
+        layer : int
+        row : int
+        col : int
+            zero based model cell
+
+        Returns
+        -------
+            int, None if the cell is not active
+        """
+        flat = np.ravel_multi_index((layer, row, col), self.shape)
+        pos = int(np.searchsorted(self.full_index, flat))
+        if pos == self.full_index.size or self.full_index[pos] != flat:
+            return None
+        return pos
+
+    @staticmethod
+    def from_netcdf(ds, shape=None):
+        """
+        Method to rebuild the gather index of an exported file
+
+        Parameters
+        ----------
+        ds : netCDF4.Dataset
+            open netcdf file with gathered variables
+        shape : tuple
+            optional full grid shape, default uses the layer, y and x
+            dimensions of the file
+
+        Returns
+        -------
+            ActiveCellIndex
+        """
+        if shape is None:
+            shape = tuple(len(ds.dimensions[d]) for d in ("layer", "y", "x"))
+        return ActiveCellIndex.from_arrays(
+            shape, ds.variables["crop_y"][:], ds.variables["crop_x"][:],
+            ds.variables[GATHERED_DIMENSION][:])
+
+    @staticmethod
+    def from_arrays(shape, rows, cols, cells):
+        """
+        Method to rebuild the gather index from the stored crop
+        coordinates and cell index
+
+        Parameters
+        ----------
+        shape : tuple
+            full (nlay, nrow, ncol) grid shape
+        rows : np.ndarray
+            crop_y coordinate values
+        cols : np.ndarray
+            crop_x coordinate values
+        cells : np.ndarray
+            cell index values
+
+        Returns
+        -------
+            ActiveCellIndex
+        """
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+        crop_shape = (shape[0], rows.size, cols.size)
+
+        active = np.zeros(shape, dtype=bool)
+        crop = np.zeros(crop_shape, dtype=bool)
+        crop.reshape(-1)[np.asarray(cells)] = True
+        active[:, rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1] = crop
+        return ActiveCellIndex(active)
+
+
+def scatter(values, index, shape, fillvalue):
+    """
+    Fast scatter of gathered values into a full array
+
+    Parameters
+    ----------
+    values : np.ndarray
+        (..., ncell) gathered values, leading dimensions (e.g. time)
+        are kept
+    index : np.ndarray
+        flat indices of the gathered cells in an array of shape
+    shape : tuple
+        shape of the scattered (nlay, nrow, ncol) array
+    fillvalue : float
+        value of cells that are not gathered
+
+    Returns
+    -------
+        np.ndarray of shape values.shape[:-1] + shape
+    """
+    values = np.asarray(values)
+    lead = values.shape[:-1]
+    out = np.full(lead + (int(np.prod(shape)),), fillvalue,
+                  dtype=values.dtype)
+    out[..., index] = values
+    return out.reshape(lead + tuple(shape))
+
+
+def define_gathered_coordinates(backend, index):
+    """
+    Method to write the gather index and crop coordinates to an
+    export backend
+
+    Parameters
+    ----------
+    backend : NetCdfBackend or ZarrBackend
+    index : ActiveCellIndex
+    """
+    backend.add_coordinate(
+        "crop_y", index.rows,
+        {"long_name": "zero based model row of the active cell "
+                      "bounding box"})
+    backend.add_coordinate(
+        "crop_x", index.cols,
+        {"long_name": "zero based model column of the active cell "
+                      "bounding box"})
+    backend.add_coordinate(
+        GATHERED_DIMENSION, index.index,
+        {"long_name": "active cell index",
+         "compress": " ".join(CROP_DIMENSIONS)})
+
+
+def compress_netcdf(src, dst, index):
+    """
+    Method to copy a netcdf file and store every (layer, y, x)
+    variable by active cells only. Variables are copied one
+    leading index (e.g. time step) at a time.
+
+    Parameters
+    ----------
+    src : str
+        netcdf file with full grid variables
+    dst : str
+        compressed netcdf file name
+    index : ActiveCellIndex
+    """
+    if netCDF4 is None:
+        raise ImportError("netCDF4 must be installed for netcdf exports")
+
+    grid_dims = ("layer", "y", "x")
+    with netCDF4.Dataset(src) as ds, netCDF4.Dataset(dst, "w") as out:
+        out.setncatts({k: ds.getncattr(k) for k in ds.ncattrs()})
+        for name, dim in ds.dimensions.items():
+            out.createDimension(name, None if dim.isunlimited()
+                                else len(dim))
+        out.createDimension("crop_y", index.rows.size)
+        out.createDimension("crop_x", index.cols.size)
+        out.createDimension(GATHERED_DIMENSION, index.ncell)
+
+        for name, data, attrs in (
+                ("crop_y", index.rows, {}), ("crop_x", index.cols, {}),
+                (GATHERED_DIMENSION, index.index,
+                 {"compress": " ".join(CROP_DIMENSIONS)})):
+            var = out.createVariable(name, "i4", (name,))
+            var[:] = data
+            var.setncatts(attrs)
+
+        for name, var in ds.variables.items():
+            var.set_auto_mask(False)
+            attrs = {k: var.getncattr(k) for k in var.ncattrs()
+                     if k != "_FillValue"}
+            fill = getattr(var, "_FillValue", None)
+            gathered = tuple(var.dimensions[-3:]) == grid_dims and \
+                var.shape[-3:] == index.shape
+            if gathered:
+                dims = var.dimensions[:-3] + (GATHERED_DIMENSION,)
+                attrs.pop("coordinates", None)
+            else:
+                dims = var.dimensions
+
+            new = out.createVariable(name, var.dtype, dims, zlib=True,
+                                     fill_value=fill)
+            new.setncatts(attrs)
+            if not gathered:
+                new[...] = var[...]
+            elif len(dims) == 1:
+                new[:] = index.gather(var[...])
+            else:
+                for ix in range(var.shape[0]):
+                    new[ix] = index.gather(var[ix])
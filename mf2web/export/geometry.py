@@ -0,0 +1,237 @@
+"""
+Cached grid geometry for exports.
+
+Cell centers, cell vertices and their geographic coordinates are
+computed in one vectorized pass and a single batched coordinate
+transform. Results are kept in memory and persisted to a cache directory
+keyed by (delr, delc, offsets, rotation, crs), so every export of the
+same model reuses them.
+"""
+import os
+import hashlib
+import numpy as np
+try:
+    import pyproj
+except ImportError:
+    pyproj = None
+
+
+GEOGRAPHIC_CRS = "epsg:4326"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".mf2web",
+                                 "geometry")
+
+_memory_cache = {}
+
+
+def crs_string(epsg=None, proj4=None):
+    """
+    Method to build the crs string of a model grid
+
+    Parameters
+    ----------
+    epsg : int
+    proj4 : str
+
+    Returns
+    -------
+        str
+    """
+    if epsg is not None:
+        return "epsg:{}".format(int(epsg))
+    elif proj4 is not None:
+        return proj4.strip()
+    raise ValueError("Model projection must be supplied via "
+                     "epsg code or proj4 string")
+
+
+class GridGeometry(object):
+    """
+    Projected and geographic coordinates of a structured grid
+
+    Parameters
+    ----------
+    delr : np.ndarray
+        column widths
+    delc : np.ndarray
+        row heights
+    xoff : float
+        x coordinate of the lower left corner of the grid
+    yoff : float
+        y coordinate of the lower left corner of the grid
+    angrot : float
+        counter-clockwise grid rotation in degrees
+    crs : str
+        crs string of the projected coordinates, "epsg:<code>"
+        or a proj4 string
+    cache_dir : str
+        directory the geometry is persisted to. None uses
+        ~/.mf2web/geometry, False disables the disk cache
+
+    Attributes
+    ----------
+    xcenters, ycenters : np.ndarray
+        (nrow, ncol) projected cell centers
+    xvertices, yvertices : np.ndarray
+        (nrow + 1, ncol + 1) projected cell corners
+    lon, lat : np.ndarray
+        (nrow, ncol) geographic cell centers
+    lon_vertices, lat_vertices : np.ndarray
+        (nrow + 1, ncol + 1) geographic cell corners
+    bounds : tuple
+        geographic (lon min, lat min, lon max, lat max) of the grid
+    """
+    _arrays = ("xcenters", "ycenters", "xvertices", "yvertices",
+               "lon", "lat", "lon_vertices", "lat_vertices")
+
+    def __init__(self, delr, delc, xoff=0., yoff=0., angrot=0., crs=None,
+                 cache_dir=None):
+        self.delr = np.asarray(delr, dtype=np.float64)
+        self.delc = np.asarray(delc, dtype=np.float64)
+        self.xoff = float(xoff or 0.)
+        self.yoff = float(yoff or 0.)
+        self.angrot = float(angrot or 0.)
+        self.crs = crs
+        if cache_dir is None:
+            cache_dir = DEFAULT_CACHE_DIR
+        self.cache_dir = cache_dir
+        self.key = self._cache_key()
+
+        if self.key in _memory_cache:
+            self.__dict__.update(_memory_cache[self.key])
+        elif not self._load():
+            self._compute()
+            self._save()
+        _memory_cache[self.key] = {k: getattr(self, k)
+                                   for k in self._arrays + ("bounds",)}
+
+    @staticmethod
+    def from_modelgrid(modelgrid, cache_dir=None):
+        """
+        Method to get the geometry of a flopy StructuredGrid
+
+        Parameters
+        ----------
+        modelgrid : flopy.discretization.StructuredGrid
+        cache_dir : str
+
+        Returns
+        -------
+            GridGeometry
+        """
+        crs = crs_string(modelgrid.epsg, modelgrid.proj4)
+        return GridGeometry(modelgrid.delr, modelgrid.delc,
+                            modelgrid.xoffset, modelgrid.yoffset,
+                            modelgrid.angrot, crs, cache_dir)
+
+    @property
+    def shape(self):
+        return self.delc.size, self.delr.size
+
+    @property
+    def transformer(self):
+        """
+        pyproj transformer from the grid crs to geographic coordinates
+        """
+        if pyproj is None:
+            raise ImportError("pyproj must be installed to project "
+                              "grid coordinates")
+        return pyproj.Transformer.from_crs(pyproj.CRS(self.crs),
+                                           pyproj.CRS(GEOGRAPHIC_CRS),
+                                           always_xy=True)
+
+    def cell_bounds(self):
+        """
+        Method to get CF style geographic cell bounds, corners are
+        ordered counter-clockwise from the lower left corner
+
+        Returns
+        -------
+            tuple of (nrow, ncol, 4) lon and lat arrays
+        """
+        lon = _corners(self.lon_vertices)
+        lat = _corners(self.lat_vertices)
+        return lon, lat
+
+    def _cache_key(self):
+        h = hashlib.sha1()
+        h.update(self.delr.tobytes())
+        h.update(self.delc.tobytes())
+        h.update(np.array([self.xoff, self.yoff, self.angrot]).tobytes())
+        h.update(str(self.crs).encode())
+        return h.hexdigest()
+
+    def _cache_file(self):
+        return os.path.join(self.cache_dir, "{}.npz".format(self.key))
+
+    def _load(self):
+        if not self.cache_dir or not os.path.isfile(self._cache_file()):
+            return False
+        try:
+            with np.load(self._cache_file()) as data:
+                for name in self._arrays:
+                    setattr(self, name, data[name])
+                self.bounds = tuple(data["bounds"].tolist())
+        except (IOError, KeyError, ValueError):
+            return False
+        return True
+
+    def _save(self):
+        if not self.cache_dir:
+            return
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        # write to a temporary name so concurrent exports never
+        # read a partial file
+        tmp = self._cache_file() + ".{}.tmp".format(os.getpid())
+        with open(tmp, "wb") as f:
+            np.savez(f, bounds=np.array(self.bounds),
+                     **{k: getattr(self, k) for k in self._arrays})
+        os.replace(tmp, self._cache_file())
+
+    def _compute(self):
+        """
+        Method to compute all grid coordinates with a single
+        batched transform
+        """
+        # local coordinates, origin at the lower left corner
+        xedge = np.concatenate(([0.], np.cumsum(self.delr)))
+        yedge = np.concatenate(([0.], np.cumsum(self.delc)))
+        yedge = yedge[-1] - yedge
+        xcenter = (xedge[:-1] + xedge[1:]) / 2.
+        ycenter = (yedge[:-1] + yedge[1:]) / 2.
+
+        xc, yc = np.meshgrid(xcenter, ycenter)
+        xv, yv = np.meshgrid(xedge, yedge)
+        self.xcenters, self.ycenters = self._rotate(xc, yc)
+        self.xvertices, self.yvertices = self._rotate(xv, yv)
+
+        ncenter = xc.size
+        x = np.concatenate((self.xcenters.ravel(), self.xvertices.ravel()))
+        y = np.concatenate((self.ycenters.ravel(), self.yvertices.ravel()))
+        lon, lat = self.transformer.transform(x, y)
+        lon = np.asarray(lon)
+        lat = np.asarray(lat)
+
+        self.lon = lon[:ncenter].reshape(xc.shape)
+        self.lat = lat[:ncenter].reshape(xc.shape)
+        self.lon_vertices = lon[ncenter:].reshape(xv.shape)
+        self.lat_vertices = lat[ncenter:].reshape(xv.shape)
+        self.bounds = (float(self.lon_vertices.min()),
+                       float(self.lat_vertices.min()),
+                       float(self.lon_vertices.max()),
+                       float(self.lat_vertices.max()))
+
+    def _rotate(self, x, y):
+        angle = np.radians(self.angrot)
+        cos, sin = np.cos(angle), np.sin(angle)
+        xr = self.xoff + x * cos - y * sin
+        yr = self.yoff + x * sin + y * cos
+        return xr, yr
+
+
+def _corners(vertices):
+    """
+    Method to get the four corners of each cell from a vertex lattice
+    """
+    return np.stack((vertices[1:, :-1], vertices[1:, 1:],
+                     vertices[:-1, 1:], vertices[:-1, :-1]), axis=-1)
@@ -0,0 +1,235 @@
+"""
+Export manifests used to skip exports whose inputs have not changed.
+
+A manifest is written next to each exported product and records the
+fingerprint (size, modification time and sha1) of every model file, the
+export options and the mf2web version. Files are hashed in parallel, and
+files whose size and modification time match the previous manifest reuse
+its hash.
+"""
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from ..version import __version__
+
+
+HASH_BLOCK_SIZE = 2 ** 20
+
+
+def model_file_paths(namfile, model_ws=""):
+    """
+    Method to collect the files referenced by a modflow name file,
+    gsflow control file or modflow-88 script file without loading
+    the model. Every token of a non-comment line that is an existing
+    file is included, and name files referenced by a control file
+    are read as well. Package files are scanned for OPEN/CLOSE
+    array files. EXTERNAL arrays and modflow-88 external files are
+    opened on units of the name or script file and are included
+    with it.
+
+    Parameters
+    ----------
+    namfile : str
+        name, control or script file name relative to model_ws
+    model_ws : str
+        model workspace
+
+    Returns
+    -------
+        list of file paths
+    """
+    paths = []
+    pending = [os.path.join(model_ws, namfile)]
+    while pending:
+        fname = pending.pop(0)
+        if fname in paths or not os.path.isfile(fname):
+            continue
+        paths.append(fname)
+        with open(fname) as foo:
+            for line in foo:
+                line = line.split("#")[0].strip()
+                for token in line.split():
+                    path = os.path.join(model_ws, token)
+                    if path in paths or path in pending or \
+                            not os.path.isfile(path):
+                        continue
+                    if token.lower().endswith(".nam"):
+                        pending.append(path)
+                    else:
+                        paths.append(path)
+                        for external in open_close_paths(path, model_ws):
+                            if external not in paths:
+                                paths.append(external)
+    return paths
+
+
+def open_close_paths(fname, model_ws=""):
+    """
+    Method to find the existing OPEN/CLOSE array files of a package
+    file. Binary files (output and unformatted array files) are
+    not scanned.
+
+    Parameters
+    ----------
+    fname : str
+        package file name
+    model_ws : str
+        model workspace the array files are relative to
+
+    Returns
+    -------
+        list of file paths
+    """
+    paths = []
+    with open(fname, "rb") as foo:
+        if b"\0" in foo.read(HASH_BLOCK_SIZE):
+            return paths
+        foo.seek(0)
+        for line in foo:
+            if b"OPEN/CLOSE" not in line.upper():
+                continue
+            tokens = line.decode("utf-8", "replace").split()
+            for ix, token in enumerate(tokens[:-1]):
+                if token.upper() != "OPEN/CLOSE":
+                    continue
+                path = os.path.join(model_ws, tokens[ix + 1].strip("'\""))
+                if os.path.isfile(path) and path not in paths:
+                    paths.append(path)
+    return paths
+
+
+def fingerprint(path, previous=None):
+    """
+    Method to fingerprint a file
+
+    Parameters
+    ----------
+    path : str
+        file name
+    previous : dict
+        optional previous fingerprint, its hash is reused when the
+        size and modification time have not changed
+
+    Returns
+    -------
+        dict of size, mtime and sha1, None if the file does not exist
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    if previous is not None and previous.get("size") == stat.st_size and \
+            previous.get("mtime") == stat.st_mtime_ns:
+        return dict(previous)
+
+    h = hashlib.sha1()
+    with open(path, "rb") as foo:
+        for block in iter(lambda: foo.read(HASH_BLOCK_SIZE), b""):
+            h.update(block)
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns,
+            "sha1": h.hexdigest()}
+
+
+def fingerprint_files(paths, previous=None, workers=None):
+    """
+    Method to fingerprint files in parallel threads
+
+    Parameters
+    ----------
+    paths : list
+        file names
+    previous : dict
+        optional {path: fingerprint} of a previous manifest
+    workers : int
+        number of hashing threads
+
+    Returns
+    -------
+        dict of {path: fingerprint}
+    """
+    if previous is None:
+        previous = {}
+    paths = sorted(set(paths))
+    if workers is None:
+        workers = min(32, (os.cpu_count() or 1) + 4)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        prints = pool.map(lambda p: fingerprint(p, previous.get(p)), paths)
+        return dict(zip(paths, prints))
+
+
+class ExportManifest(object):
+    """
+    Manifest of the inputs of an exported product
+
+    Parameters
+    ----------
+    product : str
+        exported file or store name
+    files : list
+        model, reference and output files the product depends on
+    options : dict
+        export options, values must be json serializable
+    """
+    def __init__(self, product, files, options=None):
+        self.product = product
+        self.files = sorted(set(os.path.abspath(f) for f in files))
+        # round trip so tuples and lists compare equal
+        self.options = json.loads(json.dumps(options or {}, default=str,
+                                             sort_keys=True))
+        self.fingerprints = None
+
+    @property
+    def filename(self):
+        return self.product + ".manifest.json"
+
+    def read(self):
+        """
+        Method to read the previous manifest of the product
+
+        Returns
+        -------
+            dict or None
+        """
+        if not os.path.isfile(self.filename):
+            return None
+        try:
+            with open(self.filename) as foo:
+                return json.load(foo)
+        except (IOError, ValueError):
+            return None
+
+    def is_current(self):
+        """
+        Method to check if the product is up to date with its
+        inputs. The current fingerprints are kept for write().
+
+        Returns
+        -------
+            bool
+        """
+        previous = self.read() or {}
+        self.fingerprints = fingerprint_files(self.files,
+                                              previous.get("files"))
+        if not os.path.exists(self.product) or not previous:
+            return False
+        return previous.get("version") == __version__ and \
+            previous.get("options") == self.options and \
+            previous.get("files") == self.fingerprints
+
+    def write(self):
+        """
+        Method to write the manifest after a successful export
+        """
+        if self.fingerprints is None:
+            self.fingerprints = fingerprint_files(self.files)
+        data = {"product": os.path.basename(self.product),
+                "version": __version__,
+                "options": self.options,
+                "files": self.fingerprints}
+        tmp = self.filename + ".{}.tmp".format(os.getpid())
+        with open(tmp, "w") as foo:
+            json.dump(data, foo, indent=1, sort_keys=True)
+        os.replace(tmp, self.filename)
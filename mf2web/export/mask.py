@@ -0,0 +1,81 @@
+"""
+Validity mask shared by every output variable and time step of an export.
+"""
+import numpy as np
+
+
+# inactive and dry cell values of MT3D/SEAWAT (CINACT) and modflow
+# (HNOFLO) that are masked in every export
+DEFAULT_SENTINELS = (1e30, -1e30)
+
+
+class ValidityMask(object):
+    """
+    Combined mask of inactive cells and sentinel values. The static
+    inactive mask (ibound == 0 or icbund == 0) is built once per run.
+    Sentinel values (hdry, hnoflo, 1e30, ...) are compared into a
+    reusable buffer, giving a per-time dry-cell mask, and every record
+    is masked with a single np.putmask call.
+
+    Parameters
+    ----------
+    inactive : np.ndarray
+        boolean (nlay, nrow, ncol) array of inactive cells
+    sentinels : list
+        values that are written as fill values, in addition to
+        DEFAULT_SENTINELS
+    """
+    def __init__(self, inactive=None, sentinels=()):
+        self.inactive = None
+        self.shape = None
+        if inactive is not None:
+            self.inactive = np.ascontiguousarray(inactive, dtype=bool)
+            self.shape = self.inactive.shape
+        self.sentinels = np.unique(np.asarray(
+            list(sentinels) + list(DEFAULT_SENTINELS), dtype=np.float32))
+        self.dry = None
+        self._buffer = None
+
+    def __getstate__(self):
+        # buffers are rebuilt in worker processes
+        state = dict(self.__dict__)
+        state["dry"] = None
+        state["_buffer"] = None
+        return state
+
+    def apply(self, a, fillvalue):
+        """
+        Method to mask a record. Inactive cells, sentinel values
+        and NaN values are set to the fill value
+
+        Parameters
+        ----------
+        a : np.ndarray
+            record array, masked arrays are filled first
+        fillvalue : float
+            fill value of the export
+
+        Returns
+        -------
+            np.ndarray of float32
+        """
+        a = np.ma.filled(a, fillvalue).astype(np.float32, copy=False)
+        if not a.flags.writeable:
+            a = a.copy()
+
+        if self.dry is None or self.dry.shape != a.shape:
+            self.dry = np.empty(a.shape, dtype=bool)
+            self._buffer = np.empty(a.shape, dtype=bool)
+
+        dry, buf = self.dry, self._buffer
+        np.isnan(a, out=dry)
+        for value in self.sentinels:
+            np.equal(a, value, out=buf)
+            np.logical_or(dry, buf, out=dry)
+
+        if self.inactive is not None and self.shape == a.shape:
+            np.logical_or(dry, self.inactive, out=buf)
+            np.putmask(a, buf, fillvalue)
+        else:
+            np.putmask(a, dry, fillvalue)
+        return a
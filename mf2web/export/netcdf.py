@@ -0,0 +1,168 @@
+import numpy as np
+from flopy.export.netcdf import NetCdf
+from .geometry import GridGeometry, pyproj
+from .units import UnitConverter
+try:
+    from flopy.export.unitsformat import NC_UNITS_FORMAT
+except ImportError:
+    NC_UNITS_FORMAT = {}
+
+
+class CachedNetCdf(NetCdf):
+    """
+    Override of flopy's NetCdf that takes cell coordinates from the
+    mf2web grid geometry cache instead of reprojecting the model grid
+    for every export. Geographic cell bounds are added to the latitude
+    and longitude variables. Length and time dimensioned variables,
+    including the elevation, delr and delc coordinates and the time
+    coordinate, are optionally converted as flopy writes them.
+
+    Parameters
+    ----------
+    output_filename : str
+        netcdf file name
+    model : flopy model object
+    time_values : list
+        totim values of the time dimension
+    cache_dir : str
+        grid geometry cache directory, see GridGeometry
+    units : UnitConverter
+        optional converter of length and time dimensioned variables
+    **kwargs : keyword arguments passed to flopy's NetCdf
+    """
+    # length dimensioned coordinates written by flopy
+    coordinate_units = {"elevation": "{0}", "delr": "{0}", "delc": "{0}"}
+
+    def __init__(self, output_filename, model, time_values=None,
+                 cache_dir=None, units=None, **kwargs):
+        # set before NetCdf.__init__, which initializes the geometry
+        self.geometry_cache_dir = cache_dir
+        self.geometry = None
+        self.units = units
+        super(CachedNetCdf, self).__init__(output_filename, model,
+                                           time_values=time_values,
+                                           **kwargs)
+
+    def initialize_geometry(self):
+        """
+        Method to set the projected and geographic coordinates
+        from the grid geometry cache
+        """
+        self.log("loading grid geometry")
+        self.geometry = GridGeometry.from_modelgrid(
+            self.model_grid, cache_dir=self.geometry_cache_dir)
+        self.log("loading grid geometry")
+
+        self.grid_crs = pyproj.CRS(self.geometry.crs)
+        self.xs = self.geometry.lon
+        self.ys = self.geometry.lat
+
+        vmin, vmax = self.model_grid.botm.min(), self.model_grid.top.max()
+        if self.z_positive == "down":
+            vmin, vmax = vmax, vmin
+        else:
+            self.zs = self.model_grid.xyzcellcenters[2].copy()
+
+        self.bounds = self.geometry.bounds
+        self.vbounds = vmin, vmax
+
+    def create_variable(self, name, attributes, *args, **kwargs):
+        """
+        Override of flopy's create_variable that converts the units of
+        length and time dimensioned variables. The variable returned
+        converts arrays as they are assigned.
+
+        Parameters
+        ----------
+        name : str
+            variable name
+        attributes : dict
+            variable attributes
+        convert : bool
+            convert the variable, default is True. Output exports pass
+            False for records that are already converted
+        *args, **kwargs : arguments passed to flopy's create_variable
+        """
+        convert = kwargs.pop("convert", True)
+        if self.units is None or not convert:
+            return super(CachedNetCdf, self).create_variable(
+                name, attributes, *args, **kwargs)
+
+        attributes = dict(attributes)
+        if name == "time":
+            # CF "<unit> since <start>" time coordinate
+            factor = self.units.scale("{1}")
+            since = str(attributes.get("units", "")).partition(" since ")[2]
+            attributes["units"] = self.units.target_time
+            if since:
+                attributes["units"] += " since " + since
+        else:
+            units_format = self.coordinate_units.get(
+                name, NC_UNITS_FORMAT.get(name))
+            if units_format is None:
+                return super(CachedNetCdf, self).create_variable(
+                    name, attributes, *args, **kwargs)
+            factor = self.units.scale(units_format)
+            attributes["units"] = self.units.units(units_format)
+        if factor is not None:
+            for key in ("min", "max", "valid_min", "valid_max"):
+                if key in attributes:
+                    attributes[key] = attributes[key] * factor
+        var = super(CachedNetCdf, self).create_variable(
+            name, attributes, *args, **kwargs)
+        if factor is None:
+            return var
+        return ConvertedVariable(var, factor, self.fillvalue)
+
+    def initialize_file(self, time_values=None):
+        super(CachedNetCdf, self).initialize_file(time_values=time_values)
+        self._add_cell_bounds()
+
+    def _add_cell_bounds(self):
+        """
+        Method to write CF cell bounds of latitude and longitude
+        """
+        if self.geometry is None or \
+                tuple(self.dimension_names[-2:]) != ("y", "x"):
+            return
+
+        lon, lat = self.geometry.cell_bounds()
+        self.nc.createDimension("nv", 4)
+        for name, data in (("longitude", lon), ("latitude", lat)):
+            bnds = "{}_bnds".format(name)
+            var = self.nc.createVariable(bnds, "f8", ("y", "x", "nv"))
+            var[:] = data
+            if name in self.nc.variables:
+                self.nc.variables[name].setncattr("bounds", bnds)
+
+
+class ConvertedVariable(object):
+    """
+    Wrapper of a netCDF4 variable that converts arrays as they are
+    assigned. Model arrays are copied, the conversion never changes
+    the model.
+
+    Parameters
+    ----------
+    var : netCDF4.Variable
+    factor : float
+        unit conversion factor
+    fillvalue : float
+        fill value of the export
+    """
+    def __init__(self, var, factor, fillvalue):
+        self.var = var
+        self.factor = factor
+        self.fillvalue = fillvalue
+
+    def __setitem__(self, key, value):
+        a = np.ma.array(value, copy=True)
+        if a.dtype.kind == "f":
+            UnitConverter.apply(a, self.factor, self.fillvalue)
+        self.var[key] = a
+
+    def __getitem__(self, key):
+        return self.var[key]
+
+    def __getattr__(self, name):
+        return getattr(self.var, name)
@@ -0,0 +1,936 @@
+"""
+Streaming export of modflow and mt3d output files.
+
+Records are read one time step at a time and written straight to the
+export backend, so memory use is bounded by a single 3d array instead of
+the full (time, layer, row, column) variable.
+"""
+import os
+import re
+import copy
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, \
+    as_completed
+import numpy as np
+import flopy as fp
+from flopy.export.netcdf import FILLVALUE
+from .backends import get_backend, open_writer
+from .derived import DerivedProducts, starting_heads
+from .mask import ValidityMask
+from .stats import VariableStatistics, define_statistics_dimension, \
+    write_statistics
+from .units import UnitConverter
+from .zonebudget import ZoneBudget, ZONE_BUDGET, write_zone_budget
+from .gather import ActiveCellIndex, GATHERED_DIMENSION, \
+    define_gathered_coordinates
+from ..utils.budgetfile import SelectiveCellBudgetFile, kstpkper_totims
+from ..utils.headfile import binary_head_cache
+
+
+# units format strings, {0} is the grid length unit and {1} the time unit
+OUTPUT_UNITS = {"head": "{0}",
+                "drawdown": "{0}",
+                "saturated_thickness": "{0}",
+                "cell_by_cell_flow": "{0}^3/{1}"}
+
+# connection based budget terms (MODFLOW 6) that are not cell arrays
+CONNECTION_TERMS = ("flow-ja-face",)
+
+# records queued between the reading threads and the writing thread
+RECORD_QUEUE_SIZE = 8
+
+# per-species dissolved and sorbed concentration files of MT3DMS/SEAWAT
+UCN_PATTERN = re.compile(r"^MT3D(\d{3})(S?)\.UCN$", re.IGNORECASE)
+
+
+def find_ucn_files(model_ws="", ncomp=None):
+    """
+    Method to find the per-species concentration files
+    (MT3D001.UCN, MT3D001S.UCN, ...) of a model workspace
+
+    Parameters
+    ----------
+    model_ws : str
+        model workspace
+    ncomp : int
+        optional number of species (BTN ncomp), files of higher
+        species numbers are ignored
+
+    Returns
+    -------
+        list of file names relative to model_ws
+    """
+    files = []
+    for fname in sorted(os.listdir(model_ws or ".")):
+        match = UCN_PATTERN.match(fname)
+        if match is None:
+            continue
+        if ncomp is not None and int(match.group(1)) > ncomp:
+            continue
+        files.append(fname)
+    return files
+
+
+def species_variable(filename, default="concentration"):
+    """
+    Method to get the variable name of a species concentration file,
+    concentration_<n> or sorbed_concentration_<n>
+
+    Parameters
+    ----------
+    filename : str
+        concentration file name
+    default : str
+        name used if the file name has no species number
+
+    Returns
+    -------
+        str
+    """
+    match = UCN_PATTERN.match(os.path.basename(filename))
+    if match is None:
+        return default
+    name = "concentration_{}".format(int(match.group(1)))
+    if match.group(2):
+        name = "sorbed_" + name
+    return name
+
+
+def get_output_reader(key, filename, budget_terms=None, totim_lookup=None):
+    """
+    Method to open a modflow or mt3d output file
+
+    Parameters
+    ----------
+    key : str
+        output file type, "UCN", "HDS", "FHD" or "CBC"
+    filename : str
+        output file name
+    budget_terms : list
+        optional list of cell budget terms to read. Only records
+        with these terms are indexed and read from "CBC" files,
+        None reads every term
+    totim_lookup : dict
+        optional {(kstp, kper): totim} lookup for budget records
+        that do not store totim (non-compact budget files)
+
+    Returns
+    -------
+        flopy binary or formatted file object
+    """
+    key = key.upper()
+    if key == "UCN":
+        return fp.utils.UcnFile(filename)
+    elif key == "HDS":
+        return fp.utils.HeadFile(filename)
+    elif key == "FHD":
+        # formatted heads are parsed once into a binary head file
+        return fp.utils.HeadFile(binary_head_cache(filename))
+    elif key == "CBC":
+        # flopy's CellBudgetFile can not look up records of
+        # non-compact budget files by totim
+        return SelectiveCellBudgetFile(filename, budget_terms,
+                                       totim_lookup=totim_lookup)
+    raise KeyError("Invalid output key: {}".format(key))
+
+
+def variable_name(text):
+    """
+    Method to create a variable name from a record text
+
+    Parameters
+    ----------
+    text : bytes or str
+        record text from a binary output file
+
+    Returns
+    -------
+        str
+    """
+    if isinstance(text, bytes):
+        text = text.decode()
+    return text.strip().lower().replace(" ", "_")
+
+
+class OutputSource(object):
+    """
+    Picklable description of one output file and the variables
+    that are exported from it
+
+    Parameters
+    ----------
+    key : str
+        output file type, "UCN", "HDS", "FHD" or "CBC"
+    filename : str
+        output file name
+    variables : list
+        list of (variable name, record text) tuples. record text
+        is None for head and concentration files
+    reader_kwargs : dict
+        keyword arguments used to reopen the file with
+        get_output_reader()
+    derived : DerivedProducts
+        optional products computed from the head records of
+        this file
+    scale : dict
+        optional {variable name: unit conversion factor}, see
+        UnitConverter
+    baseline : str
+        optional output file of a baseline run, records are written
+        as differences to the baseline records of the same totim
+    zone_budget : ZoneBudget
+        optional zone budget that cell budget records are
+        aggregated in as they are read
+    """
+    def __init__(self, key, filename, variables, reader_kwargs=None,
+                 derived=None, scale=None, baseline=None,
+                 zone_budget=None):
+        self.key = key.upper()
+        self.filename = filename
+        self.variables = variables
+        if reader_kwargs is None:
+            reader_kwargs = {}
+        self.reader_kwargs = reader_kwargs
+        self.derived = derived
+        if scale is None:
+            scale = {}
+        self.scale = scale
+        self.baseline = baseline
+        self.zone_budget = zone_budget
+
+    @property
+    def variable_names(self):
+        """
+        Names of all variables written from this file,
+        including derived products
+        """
+        names = [name for name, _ in self.variables]
+        if self.derived is not None:
+            names += self.derived.variables
+        return names
+
+    def open(self):
+        """
+        Method to open the output file
+
+        Returns
+        -------
+            flopy output file object
+        """
+        return get_output_reader(self.key, self.filename,
+                                 **self.reader_kwargs)
+
+    def open_baseline(self):
+        """
+        Method to open the baseline output file
+
+        Returns
+        -------
+            flopy output file object
+        """
+        return get_output_reader(self.key, self.baseline,
+                                 **self.reader_kwargs)
+
+    @staticmethod
+    def from_reader(key, filename, reader, reader_kwargs=None, name=None):
+        """
+        Method to build an OutputSource from an open output file
+
+        Parameters
+        ----------
+        key : str
+        filename : str
+        reader : flopy output file object
+        reader_kwargs : dict
+            keyword arguments used to reopen the file
+        name : str
+            optional variable name of concentration files,
+            default is "concentration"
+
+        Returns
+        -------
+            OutputSource
+        """
+        key = key.upper()
+        if key == "CBC":
+            variables = [(variable_name(text), text)
+                         for text in reader.textlist
+                         if variable_name(text) not in CONNECTION_TERMS]
+        elif key == "UCN":
+            variables = [(name or "concentration", None)]
+        else:
+            text = reader.text
+            if isinstance(text, bytes):
+                text = text.decode()
+            variables = [(variable_name(text), None)]
+        return OutputSource(key, filename, variables, reader_kwargs)
+
+    def units_format(self, var_name):
+        if self.key == "CBC":
+            return OUTPUT_UNITS["cell_by_cell_flow"]
+        return OUTPUT_UNITS.get(var_name)
+
+
+def read_record(reader, totim, text=None):
+    """
+    Method to read a single 3d record from an output file
+
+    Parameters
+    ----------
+    reader : flopy output file object
+    totim : float
+        simulation time of the record
+    text : bytes
+        record text for cell budget files
+
+    Returns
+    -------
+        np.ndarray of float32
+    """
+    if text is None:
+        a = reader.get_data(totim=totim)
+    else:
+        a = reader.get_data(totim=totim, text=text, full3D=True)
+        if isinstance(a, list):
+            if len(a) == 0:
+                return None
+            a = a[0]
+    return a
+
+
+def difference(a, b, fillvalue):
+    """
+    Method to subtract a baseline record in place. Cells that are
+    fill values in either record are written as fill values
+
+    Parameters
+    ----------
+    a : np.ndarray
+        masked record
+    b : np.ndarray
+        masked baseline record of the same shape
+    fillvalue : float
+        fill value of the export
+
+    Returns
+    -------
+        np.ndarray
+    """
+    valid = np.not_equal(a, fillvalue)
+    np.logical_and(valid, b != fillvalue, out=valid)
+    np.subtract(a, b, out=a, where=valid)
+    np.putmask(a, ~valid, fillvalue)
+    return a
+
+
+class ExportCancelled(Exception):
+    """
+    Exception raised when an export is cancelled. The partial
+    export is removed before it is raised.
+    """
+    pass
+
+
+def fill_source(writer, source, times, mask=None, fillvalue=FILLVALUE,
+                start=0, stop=None, gather=None, progress=None, cancel=None):
+    """
+    Method to stream one output file into an export, time step
+    by time step. This method does not need the model object and
+    can be run in a worker process. Sources with a baseline file are
+    read in lockstep with it and only time steps of both files are
+    written, as differences.
+
+    Parameters
+    ----------
+    writer : export backend or writer
+    source : OutputSource
+    times : list
+        totim values of the export time dimension
+    mask : ValidityMask
+        mask of inactive cells and sentinel values
+    fillvalue : float
+        fill value of the export
+    start : int
+        first time index to write
+    stop : int
+        time index to stop writing at
+    gather : ActiveCellIndex
+        optional gather index, only active cells are written
+    progress : callable
+        optional method called with the number of time steps
+        completed, once per time step
+    cancel : threading.Event
+        optional event, filling stops before the next time step
+        once it is set
+
+    Returns
+    -------
+        dict of {variable name: VariableStatistics}, with the
+        ZoneBudget of the source under "zone_budget"
+    """
+    reader = source.open()
+    source_times = set(reader.recordarray["totim"].tolist())
+    baseline = None
+    if source.baseline is not None:
+        baseline = source.open_baseline()
+        source_times &= set(baseline.recordarray["totim"].tolist())
+    if stop is None:
+        stop = len(times)
+    if mask is None:
+        mask = ValidityMask()
+
+    derived = source.derived
+    if derived is not None and derived.reference_time is not None:
+        derived.reference = mask.apply(
+            read_record(reader, derived.reference_time), fillvalue)
+
+    statistics = {}
+    zone_budget = source.zone_budget
+    for itime in range(start, stop):
+        if cancel is not None and cancel.is_set():
+            break
+        totim = times[itime]
+        variables = source.variables if totim in source_times else ()
+        for var_name, text in variables:
+            a = read_record(reader, totim, text)
+            if a is None:
+                continue
+            if zone_budget is not None:
+                # budgets are aggregated from the unmasked record
+                zone_budget.update(itime, var_name, a)
+            a = mask.apply(a, fillvalue)
+            if baseline is not None:
+                b = read_record(baseline, totim, text)
+                if b is None:
+                    continue
+                a = difference(a, mask.apply(b, fillvalue), fillvalue)
+            products = {var_name: a}
+            if derived is not None and var_name == "head":
+                # derived products are computed in the same pass, from
+                # heads in model units
+                products.update(derived.compute(a, fillvalue))
+
+            for name, d in products.items():
+                UnitConverter.apply(d, source.scale.get(name), fillvalue)
+                _write(writer, name, itime, d, gather, statistics, fillvalue)
+        if progress is not None:
+            progress(1)
+
+    reader.close()
+    if baseline is not None:
+        baseline.close()
+    if zone_budget is not None:
+        statistics[ZONE_BUDGET] = zone_budget
+    return statistics
+
+
+class QueueWriter(object):
+    """
+    Writer of worker threads that passes records through a bounded
+    queue to the thread that writes the export, so memory use is
+    bounded by maxsize records
+
+    Parameters
+    ----------
+    maxsize : int
+        maximum number of queued records
+    """
+    def __init__(self, maxsize=RECORD_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize)
+        self.closed = False
+
+    def write(self, name, index, array):
+        self._put((name, index, array))
+
+    def finish(self):
+        """
+        Method called by a worker once it has queued every record
+        """
+        self._put(None)
+
+    def drain(self, backend, nworkers):
+        """
+        Method to write queued records to the export until every
+        worker has finished
+
+        Parameters
+        ----------
+        backend : NetCdfBackend or ZarrBackend
+        nworkers : int
+            number of workers writing to the queue
+        """
+        while nworkers > 0:
+            item = self.queue.get()
+            if item is None:
+                nworkers -= 1
+            else:
+                backend.write(*item)
+
+    def close(self):
+        """
+        Method to stop the queue, workers still writing raise an
+        IOError instead of blocking on a full queue
+        """
+        self.closed = True
+
+    def _put(self, item):
+        while not self.closed:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        if item is not None:
+            raise IOError("The export writer is closed")
+
+
+def _write(writer, name, itime, a, gather, statistics, fillvalue):
+    """
+    Method to write a record, gathering active cells if requested
+    """
+    # statistics are taken per layer, before gathering
+    _update_statistics(statistics, name, itime, a, fillvalue)
+    if gather is not None:
+        a = gather.gather(a)
+    writer.write(name, itime, a)
+
+
+def _fill_worker(backend, path, source, times, mask, fillvalue, start,
+                 stop, gather):
+    """
+    Worker process method that reopens the export store and
+    fills a block of time steps
+    """
+    writer = open_writer(backend, path)
+    try:
+        return fill_source(writer, source, times, mask, fillvalue, start,
+                           stop, gather)
+    finally:
+        writer.close()
+
+
+def _update_statistics(statistics, name, itime, a, fillvalue):
+    if name not in statistics:
+        statistics[name] = VariableStatistics(a.shape[0], fillvalue)
+    statistics[name].update(itime, a)
+
+
+def _merge_statistics(statistics, other):
+    for name, stats in other.items():
+        if name in statistics:
+            statistics[name].merge(stats)
+        else:
+            statistics[name] = stats
+    return statistics
+
+
+class OutputExporter(object):
+    """
+    Class to stream modflow and mt3d output files into a netcdf
+    file or zarr store
+
+    Parameters
+    ----------
+    filename : str
+        export file name
+    model : flopy model object
+    output_files : dict
+        dictionary of {key: output file name}, valid keys are
+        "UCN", "HDS", "FHD" and "CBC". A list of "UCN" files (one
+        per species) is exported to concentration_<n> and
+        sorbed_concentration_<n> variables, each file is read in
+        its own worker process
+    model_ws : str
+        model workspace the output file names are relative to
+    masked_vals : list
+        values to write as fill values (e.g. hdry, hnoflo)
+    backend : str
+        "netcdf" or "zarr"
+    store : str
+        zarr store type, "directory" or "zip"
+    workers : int
+        number of worker processes, default is os.cpu_count(). Zarr
+        stores are filled by workers writing blocks of time steps,
+        netcdf exports with more than one output file read each file
+        in its own worker process
+    budget_terms : list
+        optional list of cell budget terms to export, e.g.
+        ["STORAGE", "WELLS"]. None exports every term
+    derived : list
+        optional derived products computed from heads,
+        "drawdown" and/or "saturated_thickness"
+    drawdown_reference : float
+        optional totim of the head record that drawdown is
+        relative to. Default is the model starting heads
+    cache_dir : str
+        grid geometry cache directory, see GridGeometry
+    active_only : bool
+        store only active cells along a CF "cell" dimension
+        (compression by gathering), cropped to the bounding box
+        of active cells
+    units : UnitConverter
+        optional converter of length and time dimensioned variables,
+        records and the time, elevation, delr and delc coordinates
+        are converted as they are written
+    baseline_files : dict
+        optional output files of a baseline run, with the keys of
+        output_files. Variables are written as the difference to the
+        baseline, for the totims of both runs. Derived products are
+        not computed for differences
+    baseline_ws : str
+        workspace the baseline file names are relative to, default
+        is model_ws
+    zones : np.ndarray
+        optional (nlay, nrow, ncol) integer zone array. Cell budget
+        terms are summed by zone as the records are read and written
+        to zone_budget (time, zone, budget_term) and zone_exchange
+        (time, zone, to_zone) variables, flow face terms give the
+        flows between zones. Cells of zone 0 are not aggregated
+    progress : callable
+        optional method called as progress(done, total) with the
+        number of time steps written over all output files. Worker
+        processes report each block of time steps as it completes
+    cancel : threading.Event
+        optional event that cancels the export. Filling stops between
+        time steps, the partial export is removed and ExportCancelled
+        is raised
+    """
+    def __init__(self, filename, model, output_files, model_ws="",
+                 masked_vals=(), backend="netcdf", store="directory",
+                 workers=None, budget_terms=None, derived=None,
+                 drawdown_reference=None, cache_dir=None,
+                 active_only=False, units=None, baseline_files=None,
+                 baseline_ws=None, zones=None, progress=None,
+                 cancel=None):
+        self.filename = filename
+        self.model = model
+        self.output_files = output_files
+        self.model_ws = model_ws
+        self.masked_vals = list(masked_vals)
+        self.backend = backend
+        self.store = store
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self.budget_terms = budget_terms
+        self.derived = derived
+        self.drawdown_reference = drawdown_reference
+        self.cache_dir = cache_dir
+        self.units = units
+        self.baseline_files = None
+        if baseline_files is not None:
+            self.baseline_files = {k.upper(): v
+                                   for k, v in baseline_files.items()}
+        if baseline_ws is None:
+            baseline_ws = model_ws
+        self.baseline_ws = baseline_ws
+        self.zones = zones
+        self.progress = progress
+        self.cancel = cancel
+        self._done = 0
+        self._total = 0
+
+        for attr in ("hdry", "hnoflo"):
+            value = getattr(model, attr, None)
+            if isinstance(value, (int, float)) and \
+                    value not in self.masked_vals:
+                self.masked_vals.append(value)
+
+        self.inactive = None
+        idomain = model.modelgrid.idomain
+        if idomain is not None:
+            self.inactive = np.asarray(idomain) == 0
+
+        self.gather = None
+        if active_only:
+            if self.inactive is None:
+                raise ValueError("active_only exports need ibound or icbund")
+            self.gather = ActiveCellIndex(~self.inactive)
+
+        # one mask per run, shared by every variable and time step
+        self.mask = ValidityMask(self.inactive, self.masked_vals)
+
+    def export(self):
+        """
+        Method to write the output export
+        """
+        sources = []
+        times = []
+        for key, value in self.output_files.items():
+            # a list of files is exported to one variable per file,
+            # e.g. one concentration variable per species
+            species = isinstance(value, (list, tuple))
+            files = value if species else [value]
+            baselines = self._baseline_files(key, len(files))
+            for ix, fname in enumerate(files):
+                if baselines is not None and baselines[ix] is None:
+                    continue
+                fname = os.path.join(self.model_ws, fname)
+                name = None
+                if species:
+                    name = species_variable(
+                        fname, "concentration_{}".format(ix + 1))
+                kwargs = self._reader_kwargs(key)
+                reader = get_output_reader(key, fname, **kwargs)
+                source = OutputSource.from_reader(key, fname, reader,
+                                                  kwargs, name)
+                source_times = reader.recordarray["totim"].tolist()
+                reader.close()
+                if baselines is not None:
+                    # records are aligned on totim, time steps that
+                    # are not in both runs are not exported
+                    source.baseline = baselines[ix]
+                    reader = source.open_baseline()
+                    source_times = sorted(
+                        set(source_times) &
+                        set(reader.recordarray["totim"].tolist()))
+                    reader.close()
+                elif self.derived and source.key in ("HDS", "FHD") and \
+                        "head" in [n for n, _ in source.variables]:
+                    source.derived = self._derived_products()
+                if self.zones is not None and source.key == "CBC" and \
+                        source.baseline is None:
+                    source.zone_budget = ZoneBudget(
+                        self.zones, [n for n, _ in source.variables])
+                sources.append(source)
+                times.extend(source_times)
+
+        times = sorted(set(times))
+        self._done = 0
+        self._total = len(times) * len(sources)
+        if self.cancelled:
+            raise ExportCancelled(
+                "Export of {} was cancelled".format(self.filename))
+
+        backend = get_backend(self.backend, self.filename, self.model,
+                              times, store=self.store,
+                              cache_dir=self.cache_dir, units=self.units)
+        if self.gather is not None:
+            define_gathered_coordinates(backend, self.gather)
+        for source in sources:
+            self._define_variables(backend, source)
+
+        if backend.parallel and self.workers > 1:
+            statistics = self._fill_parallel(backend, sources, times)
+        elif len(sources) > 1 and self.workers > 1:
+            statistics = self._fill_files(backend, sources, times)
+        else:
+            statistics = {}
+            for source in sources:
+                _merge_statistics(statistics,
+                               fill_source(backend, source, times,
+                                           self.mask, backend.fillvalue,
+                                           gather=self.gather,
+                                           progress=self._step,
+                                           cancel=self.cancel))
+
+        if self.cancelled:
+            backend.discard()
+            raise ExportCancelled(
+                "Export of {} was cancelled".format(self.filename))
+
+        zone_budget = statistics.pop(ZONE_BUDGET, None)
+        if zone_budget is not None:
+            units = OUTPUT_UNITS["cell_by_cell_flow"]
+            scale = None
+            if self.units is not None:
+                scale = self.units.scale(units)
+                units = self.units.units(units)
+            else:
+                units = units.format(backend.grid_units, backend.time_units)
+            write_zone_budget(backend, zone_budget, len(times), units,
+                              scale)
+
+        define_statistics_dimension(backend)
+        for name, stats in statistics.items():
+            write_statistics(backend, name, stats, len(times))
+        backend.close()
+
+    @property
+    def cancelled(self):
+        """
+        Boolean flag indicating the export was cancelled
+        """
+        return self.cancel is not None and self.cancel.is_set()
+
+    def _step(self, n=1):
+        """
+        Method to report n completed time steps
+        """
+        self._done += n
+        if self.progress is not None:
+            self.progress(self._done, self._total)
+
+    def _collect(self, futures, statistics):
+        """
+        Method to merge worker results as they complete. Pending
+        workers are cancelled once the export is cancelled.
+
+        Parameters
+        ----------
+        futures : dict
+            {future: number of time steps}
+        statistics : dict
+            variable statistics updated in place
+        """
+        for future in as_completed(futures):
+            if self.cancelled:
+                for pending in futures:
+                    pending.cancel()
+                break
+            _merge_statistics(statistics, future.result())
+            self._step(futures[future])
+        return statistics
+
+    def _baseline_files(self, key, nfiles):
+        """
+        Method to get the baseline files of an output file type
+
+        Returns
+        -------
+            list of baseline file names, None entries have no
+            baseline file. None if the export is not a difference
+        """
+        if self.baseline_files is None:
+            return None
+        value = self.baseline_files.get(key.upper())
+        if value is None:
+            print("Warning, no baseline {} file, skipping {} output"
+                  .format(key, key))
+            return [None] * nfiles
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        if len(value) != nfiles:
+            print("Warning, {} baseline {} files for {} output files, "
+                  "unmatched files are skipped".format(len(value), key,
+                                                       nfiles))
+        value = [os.path.join(self.baseline_ws, f) for f in value]
+        return (value + [None] * nfiles)[:nfiles]
+
+    def _reader_kwargs(self, key):
+        """
+        Method to get the reader options of an output file
+        """
+        if key.upper() == "CBC":
+            budget_terms = None
+            if self.budget_terms is not None:
+                budget_terms = list(self.budget_terms)
+            # records of non-compact budget files are placed on the
+            # time axis by their kstpkper
+            return {"budget_terms": budget_terms,
+                    "totim_lookup": kstpkper_totims(self.model.modeltime)}
+        return {}
+
+    def _derived_products(self):
+        """
+        Method to collect the model arrays needed for derived products
+        """
+        reference = None
+        if self.drawdown_reference is None:
+            strt = starting_heads(self.model)
+            if strt is not None:
+                reference = self.mask.apply(strt, FILLVALUE)
+
+        top, botm = None, None
+        if "saturated_thickness" in self.derived:
+            top = self.model.modelgrid.top
+            botm = self.model.modelgrid.botm
+
+        return DerivedProducts(self.derived, reference,
+                               self.drawdown_reference, top, botm)
+
+    def _define_variables(self, backend, source):
+        """
+        Method to create the export variables of an output file
+        """
+        for var_name in source.variable_names:
+            attribs = {"long_name": var_name}
+            if source.baseline is not None:
+                attribs["long_name"] = "{} difference".format(var_name)
+                attribs["baseline"] = os.path.basename(source.baseline)
+            if self.gather is None:
+                attribs["coordinates"] = "time layer latitude longitude"
+            units = source.units_format(var_name)
+            if units is not None and self.units is not None:
+                source.scale[var_name] = self.units.scale(units)
+                attribs["units"] = self.units.units(units)
+            elif units is not None:
+                attribs["units"] = units.format(backend.grid_units,
+                                                backend.time_units)
+            backend.create_variable(var_name, attribs,
+                                    dimensions=self._dimensions(backend))
+
+    def _dimensions(self, backend):
+        """
+        Method to get the dimensions of output variables
+        """
+        if self.gather is not None:
+            return ("time", GATHERED_DIMENSION)
+        return backend.dimension_names
+
+    def _fill_parallel(self, backend, sources, times):
+        """
+        Method to fill variables from worker processes. Each
+        worker writes a contiguous block of time steps, which
+        maps to whole chunks of the store.
+        """
+        ntimes = len(times)
+        nblocks = self.workers
+        if self.cancel is not None or self.progress is not None:
+            # smaller blocks, so cancellation and progress are
+            # not held up by a single long running worker
+            nblocks *= 4
+        nblocks = max(1, min(nblocks, ntimes))
+        bounds = np.linspace(0, ntimes, nblocks + 1).astype(int)
+
+        statistics = {}
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            for source in sources:
+                for start, stop in zip(bounds[:-1], bounds[1:]):
+                    if start == stop:
+                        continue
+                    future = pool.submit(_fill_worker, backend.kind,
+                                         backend.path, source, times,
+                                         self.mask, backend.fillvalue,
+                                         int(start), int(stop), self.gather)
+                    futures[future] = int(stop - start)
+            self._collect(futures, statistics)
+        return statistics
+
+    def _fill_files(self, backend, sources, times):
+        """
+        Method to read each output file in its own worker thread.
+        Workers pass their records to this thread through a bounded
+        queue and every record is written once, straight into the
+        export, while the other files are read.
+        """
+        writer = QueueWriter()
+        lock = threading.Lock()
+
+        def step(n=1):
+            with lock:
+                self._step(n)
+
+        def fill(source):
+            try:
+                # validity masks keep per-record buffers
+                return fill_source(writer, source, times,
+                                   copy.copy(self.mask), backend.fillvalue,
+                                   gather=self.gather, progress=step,
+                                   cancel=self.cancel)
+            finally:
+                writer.finish()
+
+        statistics = {}
+        with ThreadPoolExecutor(
+                max_workers=min(self.workers, len(sources))) as pool:
+            futures = [pool.submit(fill, source) for source in sources]
+            try:
+                writer.drain(backend, len(futures))
+            finally:
+                writer.close()
+            for future in futures:
+                _merge_statistics(statistics, future.result())
+        return statistics
@@ -0,0 +1,353 @@
+"""
+Streaming export of PRMS (GSFLOW) statvar and animation output files.
+
+Both files are plain text and can reach tens of GB. They are read a
+chunk of lines at a time, the numbers of a chunk are parsed in a single
+vectorized call and written straight to the netcdf file, so memory use is
+bounded by the chunk size instead of the file size.
+"""
+import itertools
+from collections import OrderedDict
+import numpy as np
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+
+
+# output_files keys of PRMS output files
+PRMS_OUTPUT_KEYS = ("STATVAR", "ANI")
+PRMS_FILLVALUE = -9999.
+CHUNK_SIZE = 100000
+
+
+def ymdhms_to_datetime(ymdhms):
+    """
+    Method to convert (n, 6) year, month, day, hour, minute and
+    second columns to datetime64 values
+
+    Parameters
+    ----------
+    ymdhms : np.ndarray
+        (n, 6) array
+
+    Returns
+    -------
+        np.ndarray of datetime64[s]
+    """
+    y, m, d, hh, mm, ss = np.asarray(ymdhms, dtype=np.int64).T
+    dates = (y - 1970).astype("datetime64[Y]") + \
+        (m - 1).astype("timedelta64[M]")
+    dates = dates.astype("datetime64[D]") + (d - 1).astype("timedelta64[D]")
+    seconds = hh * 3600 + mm * 60 + ss
+    return dates.astype("datetime64[s]") + seconds.astype("timedelta64[s]")
+
+
+def _parse_numbers(lines, ncol, fname):
+    """
+    Method to parse whitespace delimited numbers of a chunk of lines
+    with a single vectorized call
+    """
+    values = np.fromstring("".join(lines), dtype=np.float64, sep=" ")
+    if values.size % ncol != 0:
+        raise ValueError("Unexpected number of values in {}".format(fname))
+    return values.reshape(-1, ncol)
+
+
+class StatvarReader(object):
+    """
+    Chunked reader of PRMS statvar files
+
+    Parameters
+    ----------
+    filename : str
+        statvar file name
+    chunk_size : int
+        number of time steps parsed at a time
+
+    Attributes
+    ----------
+    variables : OrderedDict
+        {statvar name: list of ids (hru, segment, ...)}
+    """
+    def __init__(self, filename, chunk_size=CHUNK_SIZE):
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.columns = []
+        with open(filename) as foo:
+            nvars = int(foo.readline().split()[0])
+            for _ in range(nvars):
+                name, ix = foo.readline().split()[:2]
+                self.columns.append((name, int(ix)))
+
+        self.variables = OrderedDict()
+        for name, ix in self.columns:
+            self.variables.setdefault(name, []).append(ix)
+
+    def column_index(self, name):
+        """
+        Method to get the value columns of a statvar
+        """
+        return [ix for ix, (n, _) in enumerate(self.columns) if n == name]
+
+    def chunks(self):
+        """
+        Generator of time step chunks
+
+        Returns
+        -------
+            generator of (datetime64 array, (ntimes, nvars) values)
+        """
+        ncol = 7 + len(self.columns)
+        with open(self.filename) as foo:
+            for _ in range(len(self.columns) + 1):
+                foo.readline()
+            while True:
+                lines = list(itertools.islice(foo, self.chunk_size))
+                if not lines:
+                    break
+                data = _parse_numbers(lines, ncol, self.filename)
+                yield ymdhms_to_datetime(data[:, 1:7]), data[:, 7:]
+
+
+class AnimationReader(object):
+    """
+    Chunked reader of PRMS animation files. Animation files hold
+    one row per time step and spatial unit (hru or segment),
+    grouped by time step.
+
+    Parameters
+    ----------
+    filename : str
+        animation file name
+    chunk_size : int
+        approximate number of rows parsed at a time
+
+    Attributes
+    ----------
+    dimension : str
+        spatial dimension name, "hru" or "segment"
+    ids : np.ndarray
+        ids of the spatial units
+    variables : list
+        names of the output variables
+    start : np.datetime64
+        time of the first time step, None if the file has no
+        time steps
+    """
+    def __init__(self, filename, chunk_size=CHUNK_SIZE):
+        self.filename = filename
+        self.chunk_size = chunk_size
+
+        with open(filename) as foo:
+            self._skip = 0
+            line = foo.readline()
+            while line.startswith("#"):
+                self._skip += 1
+                line = foo.readline()
+            names = line.split()
+            # column name line and column format line
+            foo.readline()
+            self._skip += 2
+
+            timestamp, ids = None, []
+            for line in foo:
+                t, rest = line.split(None, 1)
+                if timestamp is None:
+                    timestamp = t
+                elif t != timestamp:
+                    break
+                ids.append(int(float(rest.split(None, 1)[0])))
+
+        self.dimension = names[1][1:] if names[1].startswith("n") \
+            else names[1]
+        self.ids = np.array(ids, dtype=np.int32)
+        self.variables = names[2:]
+        self.start = None
+        if timestamp is not None:
+            self.start = np.datetime64(timestamp[:10], "D")\
+                .astype("datetime64[s]")
+
+    def chunks(self):
+        """
+        Generator of time step chunks
+
+        Returns
+        -------
+            generator of (datetime64 array, (ntimes, nunits, nvars) values)
+        """
+        n = self.ids.size
+        ncol = len(self.variables) + 1
+        steps = max(1, self.chunk_size // max(n, 1))
+        with open(self.filename) as foo:
+            for _ in range(self._skip):
+                foo.readline()
+            while True:
+                lines = list(itertools.islice(foo, steps * n))
+                if not lines:
+                    break
+                if len(lines) % n != 0:
+                    raise ValueError("Incomplete time step in {}"
+                                     .format(self.filename))
+                parts = [line.split(None, 1) for line in lines]
+                times = np.array([p[0][:10] for p in parts[::n]],
+                                 dtype="datetime64[D]").astype("datetime64[s]")
+                data = _parse_numbers([p[1] for p in parts], ncol,
+                                      self.filename)
+                yield times, data.reshape(-1, n, ncol)[:, :, 1:]
+
+
+def export_prms(filename, statvar=None, animation=None, start_datetime=None,
+                chunk_size=CHUNK_SIZE):
+    """
+    Method to stream PRMS statvar and animation files into a netcdf
+    file. Animation variables have (time, hru) or (time, segment)
+    dimensions, statvar variables have (statvar_time, <name>_id)
+    dimensions.
+
+    Parameters
+    ----------
+    filename : str
+        netcdf file name
+    statvar : str
+        optional statvar file name
+    animation : str
+        optional animation file name
+    start_datetime : str
+        optional reference date of the time variables, e.g.
+        "1-1-1970 00:00:00". Default is the first output time
+    chunk_size : int
+        number of rows parsed and written at a time
+    """
+    if netCDF4 is None:
+        raise ImportError("netCDF4 must be installed for netcdf exports")
+
+    start = None
+    if start_datetime is not None:
+        start = _parse_start(start_datetime)
+
+    with netCDF4.Dataset(filename, "w") as ds:
+        ds.setncatts({"Conventions": "CF-1.6",
+                      "source": "PRMS output exported by mf2web"})
+        if animation is not None:
+            reader = AnimationReader(animation, chunk_size)
+            start = _write_animation(ds, reader, start)
+        if statvar is not None:
+            reader = StatvarReader(statvar, chunk_size)
+            _write_statvar(ds, reader, start)
+
+
+def _parse_start(start_datetime):
+    """
+    Method to parse a "m-d-y h:m:s", "m/d/y h:m:s" or iso
+    start date
+    """
+    parts = start_datetime.strip().split()
+    time = parts[1] if len(parts) > 1 else "00:00:00"
+    date = [int(i) for i in parts[0].replace("/", "-").split("-")]
+    if date[0] < 1000:
+        m, d, y = date
+    else:
+        y, m, d = date
+    return np.datetime64("{:04d}-{:02d}-{:02d}T{}".format(y, m, d, time),
+                         "s")
+
+
+def _create_time(ds, name, start):
+    ds.createDimension(name, None)
+    var = ds.createVariable(name, "f8", (name,))
+    var.setncatts({"units": "days since {}".format(
+        str(start).replace("T", " ")), "calendar": "standard",
+        "standard_name": "time", "long_name": name})
+    return var
+
+
+def _days(times, start):
+    return (times - start).astype(np.float64) / 86400.
+
+
+def _update_extrema(extrema, name, a):
+    valid = a[np.isfinite(a)]
+    if valid.size > 0:
+        mn, mx = extrema.get(name, (np.inf, -np.inf))
+        extrema[name] = (min(mn, float(valid.min())),
+                         max(mx, float(valid.max())))
+
+
+def _set_extrema(ds, extrema):
+    for name, (mn, mx) in extrema.items():
+        ds.variables[name].setncatts({"min": mn, "max": mx})
+
+
+def _write_animation(ds, reader, start):
+    """
+    Method to write animation variables chunk by chunk
+    """
+    dim = reader.dimension
+    ds.createDimension(dim, reader.ids.size)
+    var = ds.createVariable(dim, "i4", (dim,))
+    var[:] = reader.ids
+    var.setncattr("long_name", "PRMS {} id".format(dim))
+
+    # the time dimension must exist before the animation variables
+    if start is None:
+        start = reader.start
+    if start is None:
+        start = np.datetime64("1970-01-01T00:00:00", "s")
+    time_var = _create_time(ds, "time", start)
+    for name in reader.variables:
+        ds.createVariable(name, "f4", ("time", dim), zlib=True,
+                          fill_value=PRMS_FILLVALUE,
+                          chunksizes=(1, max(reader.ids.size, 1)))
+        ds.variables[name].setncattr("long_name", name)
+
+    extrema = {}
+    itime = 0
+    for times, values in reader.chunks():
+        n = times.size
+        time_var[itime:itime + n] = _days(times, start)
+        for ix, name in enumerate(reader.variables):
+            a = values[:, :, ix]
+            ds.variables[name][itime:itime + n] = a
+            _update_extrema(extrema, name, a)
+        itime += n
+
+    _set_extrema(ds, extrema)
+    return start
+
+
+def _write_statvar(ds, reader, start):
+    """
+    Method to write statvar variables chunk by chunk
+    """
+    columns = OrderedDict()
+    for name, ids in reader.variables.items():
+        id_dim = "{}_id".format(name)
+        ds.createDimension(id_dim, len(ids))
+        var = ds.createVariable(id_dim, "i4", (id_dim,))
+        var[:] = ids
+        columns[name] = reader.column_index(name)
+
+    time_var = None
+    extrema = {}
+    itime = 0
+    for times, values in reader.chunks():
+        if time_var is None:
+            if start is None:
+                start = times[0]
+            time_var = _create_time(ds, "statvar_time", start)
+            for name in columns:
+                var = ds.createVariable(
+                    "statvar_{}".format(name), "f4",
+                    ("statvar_time", "{}_id".format(name)), zlib=True,
+                    fill_value=PRMS_FILLVALUE)
+                var.setncattr("long_name", name)
+        n = times.size
+        time_var[itime:itime + n] = _days(times, start)
+        for name, cols in columns.items():
+            a = values[:, cols]
+            ds.variables["statvar_{}".format(name)][itime:itime + n] = a
+            _update_extrema(extrema, "statvar_{}".format(name), a)
+        itime += n
+
+    _set_extrema(ds, extrema)
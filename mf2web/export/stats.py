@@ -0,0 +1,383 @@
+"""
+Streaming statistics of exported variables.
+
+Statistics are accumulated as each record is written, so clients can set
+colorbar ranges from the attributes and auxiliary variables of an export
+without scanning the data. Percentiles are interpolated in a histogram of
+linear bins over the range of the data. Bin widths are powers of two and
+bin edges are multiples of the width, so histograms of different ranges
+(layers, time steps, worker processes) are merged exactly by coarsening
+to the wider bins. With 4096 bins a percentile is within 1/2048 of the
+range of a variable. Fill values (inactive cells, hdry, hnoflo, ...) are
+excluded.
+"""
+import numpy as np
+
+
+PERCENTILES = (2, 5, 25, 50, 75, 95, 98)
+STATISTICS = ("count", "min", "max", "mean") + \
+    tuple("p{:02d}".format(p) for p in PERCENTILES)
+STATISTIC_DIMENSION = "statistic"
+
+NBINS = 4096
+# smallest bin width relative to the largest magnitude of the data,
+# keeps bin indices exact
+PRECISION_BITS = 40
+
+
+class Histogram(object):
+    """
+    Mergeable histogram of linear bins. Bin i covers
+    [(start + i) * 2 ** exponent, (start + i + 1) * 2 ** exponent),
+    bins are made twice as wide whenever the data does not fit.
+
+    Parameters
+    ----------
+    nbins : int
+        number of bins
+    """
+    def __init__(self, nbins=NBINS):
+        self.nbins = nbins
+        self.exponent = None
+        self.start = 0
+        self.counts = np.zeros(nbins, dtype=np.int64)
+
+    def copy(self):
+        other = Histogram(self.nbins)
+        other.exponent = self.exponent
+        other.start = self.start
+        other.counts = self.counts.copy()
+        return other
+
+    def add(self, values):
+        """
+        Method to count values
+
+        Parameters
+        ----------
+        values : np.ndarray
+            finite values
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        vmin, vmax = float(values.min()), float(values.max())
+        if self.exponent is None:
+            self.exponent = self._initial_exponent(vmin, vmax)
+        self._fit(vmin, vmax)
+        index = np.floor(np.ldexp(values, -self.exponent)).astype(np.int64)
+        self.counts += np.bincount(index - self.start, minlength=self.nbins)
+
+    def merge(self, other):
+        """
+        Method to add the counts of another histogram
+
+        Parameters
+        ----------
+        other : Histogram
+
+        Returns
+        -------
+            Histogram
+        """
+        used = np.nonzero(other.counts)[0]
+        if used.size == 0:
+            return self
+        if self.exponent is None:
+            self.exponent = other.exponent
+            self.start = other.start
+            self.counts = other.counts.copy()
+            return self
+
+        other = other.copy()
+        while other.exponent < self.exponent:
+            other._coarsen()
+        used = np.nonzero(other.counts)[0]
+        self._fit(np.ldexp(float(other.start + used[0]), other.exponent),
+                  np.ldexp(float(other.start + used[-1]), other.exponent))
+        while other.exponent < self.exponent:
+            other._coarsen()
+        used = np.nonzero(other.counts)[0]
+        self.counts[other.start + used - self.start] += other.counts[used]
+        return self
+
+    def percentiles(self, percentiles, vmin, vmax):
+        """
+        Method to interpolate percentiles, values are taken as
+        evenly spread within a bin
+
+        Parameters
+        ----------
+        percentiles : list
+            percentiles between 0 and 100
+        vmin, vmax : float
+            minimum and maximum of the values, percentiles are
+            clipped to them
+
+        Returns
+        -------
+            np.ndarray of float64
+        """
+        cumulative = np.cumsum(self.counts)
+        n = cumulative[-1]
+        # zero based rank, as np.percentile
+        rank = np.asarray(percentiles, dtype=np.float64) / 100. * (n - 1)
+        ibin = np.searchsorted(cumulative, rank, side="right")
+        ibin = np.minimum(ibin, self.nbins - 1)
+        before = cumulative[ibin] - self.counts[ibin]
+        fraction = (rank - before + 0.5) / np.maximum(self.counts[ibin], 1)
+        values = np.ldexp(self.start + ibin + fraction, self.exponent)
+        return np.clip(values, vmin, vmax)
+
+    def _initial_exponent(self, vmin, vmax):
+        magnitude = max(abs(vmin), abs(vmax))
+        exponent = int(np.frexp(magnitude)[1]) - PRECISION_BITS
+        if vmax > vmin:
+            exponent = max(exponent,
+                           int(np.frexp((vmax - vmin) / self.nbins)[1]))
+        return exponent
+
+    def _fit(self, vmin, vmax):
+        """
+        Method to coarsen and shift the bins so that the counted
+        values and the range vmin to vmax fit
+        """
+        while True:
+            lo = int(np.floor(np.ldexp(vmin, -self.exponent)))
+            hi = int(np.floor(np.ldexp(vmax, -self.exponent)))
+            used = np.nonzero(self.counts)[0]
+            if used.size:
+                lo = min(lo, self.start + int(used[0]))
+                hi = max(hi, self.start + int(used[-1]))
+            if hi - lo < self.nbins:
+                break
+            self._coarsen()
+        if lo < self.start or hi >= self.start + self.nbins:
+            counts = np.zeros(self.nbins, dtype=np.int64)
+            counts[self.start + used - lo] = self.counts[used]
+            self.counts = counts
+            self.start = lo
+
+    def _coarsen(self):
+        """
+        Method to merge pairs of bins into bins twice as wide
+        """
+        index = self.start + np.arange(self.nbins, dtype=np.int64)
+        start = self.start // 2
+        self.counts = np.bincount(index // 2 - start, weights=self.counts,
+                                  minlength=self.nbins)\
+            .astype(np.int64)[:self.nbins]
+        self.start = start
+        self.exponent += 1
+
+
+def summarize(count, total, mn, mx, histograms, fillvalue):
+    """
+    Method to build the statistics of groups of values, e.g. layers
+
+    Parameters
+    ----------
+    count : np.ndarray
+        number of values of each group
+    total : np.ndarray
+        sum of the values of each group
+    mn, mx : np.ndarray
+        minimum and maximum of each group
+    histograms : list
+        Histogram of each group
+    fillvalue : float
+        value of statistics of empty groups
+
+    Returns
+    -------
+        np.ndarray of shape (len(histograms), len(STATISTICS))
+    """
+    out = np.full((len(histograms), len(STATISTICS)), fillvalue,
+                  dtype=np.float64)
+    for ix, histogram in enumerate(histograms):
+        if count[ix] == 0:
+            continue
+        out[ix, :4] = (count[ix], mn[ix], mx[ix], total[ix] / count[ix])
+        out[ix, 4:] = histogram.percentiles(PERCENTILES, mn[ix], mx[ix])
+    return out
+
+
+class VariableStatistics(object):
+    """
+    Running statistics of a variable, per layer, per layer and time
+    step and over the whole variable
+
+    Parameters
+    ----------
+    nlay : int
+        number of layers
+    fillvalue : float
+        fill value of the export, excluded from the statistics
+    """
+    def __init__(self, nlay, fillvalue):
+        self.nlay = nlay
+        self.fillvalue = fillvalue
+        self.count = np.zeros(nlay, dtype=np.int64)
+        self.total = np.zeros(nlay, dtype=np.float64)
+        self.min = np.full(nlay, np.inf)
+        self.max = np.full(nlay, -np.inf)
+        self.histograms = [Histogram() for _ in range(nlay)]
+        # {time index: (nlay, len(STATISTICS)) array}
+        self.steps = {}
+
+    def update(self, itime, a):
+        """
+        Method to add a record
+
+        Parameters
+        ----------
+        itime : int
+            time index of the record
+        a : np.ndarray
+            masked (nlay, ...) record
+        """
+        a = np.asarray(a).reshape(self.nlay, -1)
+        valid = np.not_equal(a, self.fillvalue)
+        np.logical_and(valid, np.isfinite(a), out=valid)
+
+        layers = np.nonzero(valid)[0]
+        values = a[valid].astype(np.float64)
+        count = np.bincount(layers, minlength=self.nlay)
+        total = np.bincount(layers, weights=values, minlength=self.nlay)
+        mn = np.where(valid, a, np.inf).min(axis=1)
+        mx = np.where(valid, a, -np.inf).max(axis=1)
+
+        # each layer of the time step is binned over its own range
+        offsets = np.concatenate([[0], np.cumsum(count)])
+        histograms = []
+        for k in range(self.nlay):
+            histogram = Histogram()
+            histogram.add(values[offsets[k]:offsets[k + 1]])
+            histograms.append(histogram)
+            self.histograms[k].merge(histogram)
+
+        self.steps[itime] = summarize(count, total, mn, mx, histograms,
+                                      self.fillvalue)
+        self.count += count
+        self.total += total
+        np.minimum(self.min, mn, out=self.min)
+        np.maximum(self.max, mx, out=self.max)
+
+    def merge(self, other):
+        """
+        Method to add the statistics of another block of time
+        steps, e.g. from a worker process
+
+        Parameters
+        ----------
+        other : VariableStatistics
+
+        Returns
+        -------
+            VariableStatistics
+        """
+        self.count += other.count
+        self.total += other.total
+        for mine, theirs in zip(self.histograms, other.histograms):
+            mine.merge(theirs)
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        self.steps.update(other.steps)
+        return self
+
+    def layer_statistics(self):
+        """
+        Method to get the statistics of each layer over every
+        time step
+
+        Returns
+        -------
+            (nlay, len(STATISTICS)) np.ndarray
+        """
+        return summarize(self.count, self.total, self.min, self.max,
+                         self.histograms, self.fillvalue)
+
+    def time_statistics(self, ntime):
+        """
+        Method to get the statistics of each layer and time step,
+        time steps without records are fill values
+
+        Parameters
+        ----------
+        ntime : int
+            number of time steps of the export
+
+        Returns
+        -------
+            (ntime, nlay, len(STATISTICS)) np.ndarray
+        """
+        out = np.full((ntime, self.nlay, len(STATISTICS)), self.fillvalue)
+        for itime, step in self.steps.items():
+            out[itime] = step
+        return out
+
+    def statistics(self):
+        """
+        Method to get the statistics of the whole variable
+
+        Returns
+        -------
+            dict of {statistic: value}, empty if every value is
+            a fill value
+        """
+        count = self.count.sum()
+        if count == 0:
+            return {}
+        histogram = Histogram()
+        for layer in self.histograms:
+            histogram.merge(layer)
+        values = summarize([count], [self.total.sum()], [self.min.min()],
+                           [self.max.max()], [histogram], self.fillvalue)[0]
+        return {name: float(value) if name != "count" else int(value)
+                for name, value in zip(STATISTICS, values)}
+
+
+def define_statistics_dimension(backend):
+    """
+    Method to add the statistic dimension of the auxiliary
+    statistics variables to an export backend
+
+    Parameters
+    ----------
+    backend : NetCdfBackend or ZarrBackend
+    """
+    backend.add_coordinate(
+        STATISTIC_DIMENSION, np.arange(len(STATISTICS), dtype=np.int32),
+        {"long_name": "statistic index",
+         "statistics": " ".join(STATISTICS)})
+
+
+def write_statistics(backend, name, stats, ntime):
+    """
+    Method to write the statistics of a variable as attributes
+    and as <name>_layer_stats (layer, statistic) and <name>_stats
+    (time, layer, statistic) variables
+
+    Parameters
+    ----------
+    backend : NetCdfBackend or ZarrBackend
+    name : str
+        variable name
+    stats : VariableStatistics
+    ntime : int
+        number of time steps of the export
+    """
+    backend.set_attributes(name, stats.statistics())
+    for suffix, dims, values in (
+            ("layer_stats", ("layer", STATISTIC_DIMENSION),
+             stats.layer_statistics()),
+            ("stats", ("time", "layer", STATISTIC_DIMENSION),
+             stats.time_statistics(ntime))):
+        aux = "{}_{}".format(name, suffix)
+        backend.create_variable(
+            aux, {"long_name": "{} statistics".format(name),
+                  "statistics": " ".join(STATISTICS),
+                  "percentile_method": "linear histogram, {} bins"
+                                       .format(NBINS)},
+            dimensions=dims, precision_str="f8")
+        backend.write(aux, Ellipsis, values)
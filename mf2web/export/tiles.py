@@ -0,0 +1,330 @@
+"""
+Pre-rendered Web-Mercator (EPSG:3857) tile pyramids of exported layers.
+
+The source-cell lookup that maps every tile pixel to a model cell is
+built once per grid and zoom set with vectorized transforms, cached next
+to the grid geometry, and reused for every variable, time step and
+layer. Each tile is written as a compact little-endian float32 array of
+tile_size x tile_size values, and an index.json describes the pyramid so
+a static web host can serve it with no server compute.
+"""
+import os
+import json
+import hashlib
+import numpy as np
+from .geometry import pyproj
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+
+
+TILE_SIZE = 256
+MERCATOR_CRS = "epsg:3857"
+MERCATOR_EXTENT = 20037508.342789244
+
+
+def lonlat_to_tile(lon, lat, zoom):
+    """
+    Method to get the xyz tile indices that contain a location
+
+    Parameters
+    ----------
+    lon : float
+    lat : float
+    zoom : int
+
+    Returns
+    -------
+        tuple of (x, y) tile indices
+    """
+    n = 2 ** zoom
+    lat = np.radians(np.clip(lat, -85.0511, 85.0511))
+    x = int((lon + 180.) / 360. * n)
+    y = int((1. - np.log(np.tan(lat) + 1. / np.cos(lat)) / np.pi) / 2. * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_pixel_centers(x, y, zoom, tile_size=TILE_SIZE):
+    """
+    Method to get the Web-Mercator coordinates of the pixel
+    centers of a tile
+
+    Parameters
+    ----------
+    x : int
+        tile column
+    y : int
+        tile row
+    zoom : int
+    tile_size : int
+        tile width and height in pixels
+
+    Returns
+    -------
+        tuple of (tile_size, tile_size) x and y arrays
+    """
+    span = 2. * MERCATOR_EXTENT / 2 ** zoom
+    res = span / tile_size
+    offsets = (np.arange(tile_size) + 0.5) * res
+    xs = -MERCATOR_EXTENT + x * span + offsets
+    ys = MERCATOR_EXTENT - y * span - offsets
+    return np.meshgrid(xs, ys)
+
+
+class TileLookup(object):
+    """
+    Source-cell lookup of every pixel of a Web-Mercator tile
+    pyramid covering a model grid
+
+    Parameters
+    ----------
+    geometry : mf2web.export.GridGeometry
+    zooms : list
+        zoom levels of the pyramid
+    tile_size : int
+        tile width and height in pixels
+
+    Attributes
+    ----------
+    tiles : dict
+        {(zoom, x, y): flat cell index array of tile_size ** 2
+        values, -1 where the pixel is outside of the grid}
+    """
+    def __init__(self, geometry, zooms, tile_size=TILE_SIZE):
+        self.geometry = geometry
+        self.zooms = sorted(int(z) for z in zooms)
+        self.tile_size = tile_size
+
+        h = hashlib.sha1()
+        h.update(geometry.key.encode())
+        h.update(np.array(self.zooms + [tile_size]).tobytes())
+        self.key = h.hexdigest()
+
+        self.tiles = {}
+        if not self._load():
+            for zoom in self.zooms:
+                self.tiles.update(self._build_zoom(zoom))
+            self._save()
+
+    def resample(self, array2d, nodata):
+        """
+        Method to resample a layer onto every tile of the pyramid
+
+        Parameters
+        ----------
+        array2d : np.ndarray
+            (nrow, ncol) layer values
+        nodata : float
+            value written to pixels outside of the grid
+
+        Returns
+        -------
+            generator of ((zoom, x, y), (tile_size, tile_size) array)
+        """
+        flat = np.ascontiguousarray(array2d, dtype=np.float32).ravel()
+        shape = (self.tile_size, self.tile_size)
+        for key, lookup in self.tiles.items():
+            values = np.take(flat, np.maximum(lookup, 0))
+            np.putmask(values, lookup < 0, nodata)
+            yield key, values.reshape(shape)
+
+    def _build_zoom(self, zoom):
+        """
+        Method to build the lookups of every tile at a zoom level
+        with a single batched inverse transform
+        """
+        lon0, lat0, lon1, lat1 = self.geometry.bounds
+        x0, y0 = lonlat_to_tile(lon0, lat1, zoom)
+        x1, y1 = lonlat_to_tile(lon1, lat0, zoom)
+        keys = [(zoom, x, y) for x in range(x0, x1 + 1)
+                for y in range(y0, y1 + 1)]
+
+        npix = self.tile_size ** 2
+        xs = np.empty(len(keys) * npix)
+        ys = np.empty(len(keys) * npix)
+        for ix, (_, x, y) in enumerate(keys):
+            mx, my = tile_pixel_centers(x, y, zoom, self.tile_size)
+            xs[ix * npix:(ix + 1) * npix] = mx.ravel()
+            ys[ix * npix:(ix + 1) * npix] = my.ravel()
+
+        transformer = pyproj.Transformer.from_crs(
+            pyproj.CRS(MERCATOR_CRS), pyproj.CRS(self.geometry.crs),
+            always_xy=True)
+        gx, gy = transformer.transform(xs, ys)
+        lookup = self._cell_index(np.asarray(gx), np.asarray(gy))
+
+        tiles = {}
+        for ix, key in enumerate(keys):
+            tile = lookup[ix * npix:(ix + 1) * npix]
+            if (tile >= 0).any():
+                tiles[key] = tile
+        return tiles
+
+    def _cell_index(self, x, y):
+        """
+        Method to get the flat cell index of projected coordinates,
+        -1 outside of the grid
+        """
+        g = self.geometry
+        angle = np.radians(g.angrot)
+        dx, dy = x - g.xoff, y - g.yoff
+        # local coordinates from the lower left corner
+        xl = dx * np.cos(angle) + dy * np.sin(angle)
+        yl = -dx * np.sin(angle) + dy * np.cos(angle)
+
+        xedge = np.concatenate(([0.], np.cumsum(g.delr)))
+        yedge = np.concatenate(([0.], np.cumsum(g.delc)))
+        # rows are counted from the top of the grid
+        col = np.searchsorted(xedge, xl, side="right") - 1
+        row = np.searchsorted(yedge, yedge[-1] - yl, side="right") - 1
+
+        nrow, ncol = g.shape
+        valid = (col >= 0) & (col < ncol) & (row >= 0) & (row < nrow)
+        index = np.where(valid, row * ncol + col, -1)
+        return index.astype(np.int32)
+
+    def _cache_file(self):
+        cache_dir = self.geometry.cache_dir
+        if not cache_dir:
+            return None
+        return os.path.join(cache_dir, "tiles.{}.npz".format(self.key))
+
+    def _load(self):
+        fname = self._cache_file()
+        if fname is None or not os.path.isfile(fname):
+            return False
+        with np.load(fname) as data:
+            keys = data["keys"]
+            lookups = data["lookups"]
+        self.tiles = {tuple(int(i) for i in k): lookups[ix]
+                      for ix, k in enumerate(keys)}
+        return True
+
+    def _save(self):
+        fname = self._cache_file()
+        if fname is None or not self.tiles:
+            return
+        if not os.path.isdir(os.path.dirname(fname)):
+            os.makedirs(os.path.dirname(fname))
+        keys = np.array(list(self.tiles.keys()), dtype=np.int32)
+        lookups = np.array(list(self.tiles.values()), dtype=np.int32)
+        tmp = fname + ".{}.tmp".format(os.getpid())
+        with open(tmp, "wb") as f:
+            np.savez(f, keys=keys, lookups=lookups)
+        os.replace(tmp, fname)
+
+
+def export_tile_pyramid(nc_file, geometry, out_dir, zooms, variables=None,
+                        tile_size=TILE_SIZE):
+    """
+    Method to write a Web-Mercator tile pyramid of the layers and
+    time steps of an exported netcdf file
+
+    Tiles are written to out_dir/<variable>/<time>/<layer>/<z>/<x>/<y>.bin
+    as little-endian float32 arrays. Tiles where every pixel is
+    missing are not written, the tiles of the index are the tiles
+    written for at least one variable, time step and layer.
+
+    Parameters
+    ----------
+    nc_file : str
+        exported netcdf file
+    geometry : mf2web.export.GridGeometry
+        geometry of the model grid
+    out_dir : str
+        directory of the tile pyramid
+    zooms : list
+        zoom levels to render
+    variables : list
+        variables to render, default is every variable with
+        (layer, y, x) dimensions
+    tile_size : int
+        tile width and height in pixels
+
+    Returns
+    -------
+        dict : pyramid index that is also written to out_dir/index.json
+    """
+    if netCDF4 is None:
+        raise ImportError("netCDF4 must be installed to export tiles")
+    if pyproj is None:
+        raise ImportError("pyproj must be installed to export tiles")
+
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    lookup = TileLookup(geometry, zooms, tile_size)
+    index = {"tile_size": tile_size, "dtype": "<f4", "crs": MERCATOR_CRS,
+             "zooms": lookup.zooms,
+             "path": "{variable}/{time}/{layer}/{z}/{x}/{y}.bin",
+             "variables": {}}
+    written = set()
+
+    with netCDF4.Dataset(nc_file) as ds:
+        if variables is None:
+            variables = [name for name, var in ds.variables.items()
+                         if tuple(var.dimensions[-3:]) == ("layer", "y", "x")]
+
+        times = []
+        if "time" in ds.variables:
+            times = ds.variables["time"][:].tolist()
+
+        for name in variables:
+            var = ds.variables[name]
+            var.set_auto_mask(False)
+            nodata = float(getattr(var, "_FillValue", np.nan))
+            timed = var.dimensions[0] == "time"
+            ntimes = var.shape[0] if timed else 1
+            nlay = var.shape[-3]
+
+            for itime in range(ntimes):
+                for k in range(nlay):
+                    layer = var[itime, k] if timed else var[k]
+                    path = os.path.join(out_dir, name, str(itime), str(k))
+                    written.update(_write_tiles(lookup, layer, nodata,
+                                                path))
+
+            index["variables"][name] = {
+                "times": times if timed else [],
+                "nlay": nlay,
+                "nodata": nodata,
+                "units": getattr(var, "units", ""),
+                "min": _float_attr(var, "min"),
+                "max": _float_attr(var, "max")}
+
+    index["tiles"] = sorted([list(k) for k in written])
+    with open(os.path.join(out_dir, "index.json"), "w") as foo:
+        json.dump(index, foo)
+    return index
+
+
+def _write_tiles(lookup, layer, nodata, path):
+    """
+    Method to write the tiles of a single layer
+
+    Returns
+    -------
+        list of the (z, x, y) tiles written
+    """
+    written = []
+    for (z, x, y), tile in lookup.resample(layer, nodata):
+        if np.isnan(nodata):
+            empty = np.isnan(tile).all()
+        else:
+            empty = (tile == nodata).all()
+        if empty:
+            continue
+        tdir = os.path.join(path, str(z), str(x))
+        if not os.path.isdir(tdir):
+            os.makedirs(tdir)
+        tile.astype("<f4").tofile(os.path.join(tdir, "{}.bin".format(y)))
+        written.append((z, x, y))
+    return written
+
+
+def _float_attr(var, name):
+    value = getattr(var, name, None)
+    if value is None:
+        return None
+    return float(value)
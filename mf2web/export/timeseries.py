@@ -0,0 +1,167 @@
+"""
+Cell-major (transposed) copies of time-major exports.
+
+Output exports store one (layer, y, x) array per time step, so the time
+series of a single cell touches every time step of the file. The cell-major
+copy stores (layer, y, x, time) variables with contiguous storage, so the
+full time series of any cell is a single contiguous read. The transpose is
+done out of core, in tiles of time steps and rows that fit in a bounded
+amount of memory.
+"""
+import re
+import numpy as np
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+
+
+# heads and concentrations are transposed by default
+TIMESERIES_VARIABLES = re.compile(r"^(head|(sorbed_)?concentration(_\d+)?)$")
+
+# memory used by one tile of the transpose
+MAX_TILE_BYTES = 64 * 2 ** 20
+
+
+def timeseries_variables(ds):
+    """
+    Method to find the time-major variables of a dataset that are
+    transposed by default, heads and concentrations
+
+    Parameters
+    ----------
+    ds : netCDF4.Dataset
+
+    Returns
+    -------
+        list of variable names
+    """
+    return [name for name, var in ds.variables.items()
+            if TIMESERIES_VARIABLES.match(name) and len(var.dimensions) > 1
+            and var.dimensions[0] == "time"]
+
+
+def transpose_blocks(shape, itemsize, max_bytes=MAX_TILE_BYTES):
+    """
+    Method to split a (time, ...) variable into tiles of time steps
+    and rows that fit in max_bytes. Tiles cover whole trailing rows
+    (the last dimension), so each tile is a hyperslab of both the
+    source and the transposed variable.
+
+    Parameters
+    ----------
+    shape : tuple
+        shape of the time-major variable, e.g. (time, layer, y, x)
+        or (time, cell)
+    itemsize : int
+        bytes per value
+    max_bytes : int
+        maximum size of a tile
+
+    Returns
+    -------
+        generator of (source index, transposed index) tuples of slices
+    """
+    ntime, spatial = shape[0], shape[1:]
+    if len(spatial) > 1:
+        lead, nrow, ncol = spatial[:-2], spatial[-2], spatial[-1]
+    else:
+        lead, nrow, ncol = (), spatial[0], 1
+
+    row_bytes = max(1, itemsize * ncol)
+    tsteps = ntime
+    rows = max_bytes // (row_bytes * max(1, ntime))
+    if rows < 1:
+        # a single row of every time step does not fit, the time
+        # dimension is tiled as well
+        rows = 1
+        tsteps = max(1, max_bytes // row_bytes)
+    rows = min(rows, nrow)
+
+    for k in np.ndindex(*lead):
+        for r0 in range(0, nrow, rows):
+            rslice = slice(r0, min(r0 + rows, nrow))
+            for t0 in range(0, ntime, tsteps):
+                tslice = slice(t0, min(t0 + tsteps, ntime))
+                if len(spatial) > 1:
+                    src = (tslice,) + k + (rslice, slice(None))
+                    dst = k + (rslice, slice(None), tslice)
+                else:
+                    src = (tslice, rslice)
+                    dst = (rslice, tslice)
+                yield src, dst
+
+
+def transpose_netcdf(src, dst, variables=None, max_bytes=MAX_TILE_BYTES):
+    """
+    Method to write a cell-major copy of a time-major netcdf export.
+    Selected variables are stored with time as the last (contiguous)
+    dimension, other variables and every dimension and attribute are
+    copied as they are.
+
+    Parameters
+    ----------
+    src : str
+        time-major netcdf file, e.g. <ipds>.<scenario>.out.nc
+    dst : str
+        cell-major netcdf file name
+    variables : list
+        optional list of time-major variables to transpose, default
+        is heads and concentrations
+    max_bytes : int
+        maximum memory used by one tile of the transpose
+
+    Returns
+    -------
+        list of the transposed variable names
+    """
+    if netCDF4 is None:
+        raise ImportError("netCDF4 must be installed for netcdf exports")
+
+    with netCDF4.Dataset(src) as ds, netCDF4.Dataset(dst, "w") as out:
+        if variables is None:
+            variables = timeseries_variables(ds)
+        missing = [name for name in variables if name not in ds.variables]
+        if missing:
+            raise KeyError("Variables not in {}: {}".format(
+                src, ", ".join(missing)))
+
+        out.setncatts({k: ds.getncattr(k) for k in ds.ncattrs()})
+        # fixed size dimensions, contiguous variables can not have an
+        # unlimited dimension
+        for name, dim in ds.dimensions.items():
+            out.createDimension(name, len(dim))
+
+        for name, var in ds.variables.items():
+            var.set_auto_mask(False)
+            attrs = {k: var.getncattr(k) for k in var.ncattrs()
+                     if k != "_FillValue"}
+            fill = getattr(var, "_FillValue", None)
+            if name not in variables:
+                new = out.createVariable(name, var.dtype, var.dimensions,
+                                         zlib=True, fill_value=fill)
+                new.setncatts(attrs)
+                if var.dimensions and var.dimensions[0] == "time" and \
+                        len(var.dimensions) > 1:
+                    for ix in range(var.shape[0]):
+                        new[ix] = var[ix]
+                else:
+                    new[...] = var[...]
+                continue
+
+            if "coordinates" in attrs:
+                coords = attrs["coordinates"].split()
+                attrs["coordinates"] = " ".join(
+                    [c for c in coords if c != "time"] + ["time"])
+            new = out.createVariable(name, var.dtype,
+                                     var.dimensions[1:] + ("time",),
+                                     contiguous=True, fill_value=fill)
+            new.setncatts(attrs)
+            new.set_auto_mask(False)
+            for src_ix, dst_ix in transpose_blocks(var.shape,
+                                                   var.dtype.itemsize,
+                                                   max_bytes):
+                new[dst_ix] = np.moveaxis(var[src_ix], 0, -1)
+
+        out.setncattr("cell_major_variables", " ".join(variables))
+    return list(variables)
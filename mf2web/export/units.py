@@ -0,0 +1,168 @@
+"""
+Unit conversion of exported variables.
+
+Variables are converted as each record or array is written, from the
+model length and time units of the usgs model reference file to the
+export units. The conversion factor of a variable follows from its units
+format string, e.g. "{0}^3/{1}" for cell by cell flows, so one converter
+covers every length and time dimensioned variable.
+"""
+import re
+import numpy as np
+
+
+# length units in meters and time units in seconds
+LENGTH_UNITS = {"feet": 0.3048, "meters": 1., "centimeters": 0.01,
+                "kilometers": 1000., "miles": 1609.344}
+TIME_UNITS = {"seconds": 1., "minutes": 60., "hours": 3600.,
+              "days": 86400., "years": 365.25 * 86400.}
+
+UNIT_ALIASES = {"ft": "feet", "foot": "feet", "m": "meters",
+                "meter": "meters", "metre": "meters", "metres": "meters",
+                "cm": "centimeters", "centimeter": "centimeters",
+                "km": "kilometers", "kilometer": "kilometers",
+                "mi": "miles", "mile": "miles",
+                "s": "seconds", "sec": "seconds", "second": "seconds",
+                "min": "minutes", "minute": "minutes",
+                "h": "hours", "hr": "hours", "hour": "hours",
+                "d": "days", "day": "days",
+                "y": "years", "yr": "years", "year": "years"}
+
+# {0} is the length unit and {1} the time unit, with an optional power
+_UNIT_TOKEN = re.compile(r"\{([01])\}(?:\^(-?\d+))?")
+
+
+def unit_name(unit):
+    """
+    Method to normalize a unit name, e.g. "ft" or "Foot" to "feet"
+
+    Parameters
+    ----------
+    unit : str
+
+    Returns
+    -------
+        str
+    """
+    unit = unit.strip().lower()
+    return UNIT_ALIASES.get(unit, unit)
+
+
+def units_dimensions(units_format):
+    """
+    Method to get the length and time powers of a units format
+    string, e.g. (3, -1) for "{0}^3/{1}"
+
+    Parameters
+    ----------
+    units_format : str
+
+    Returns
+    -------
+        tuple of (length power, time power)
+    """
+    powers = [0, 0]
+    for sign, part in zip((1, -1), units_format.split("/", 1)):
+        for ix, power in _UNIT_TOKEN.findall(part):
+            powers[int(ix)] += sign * int(power or 1)
+    return tuple(powers)
+
+
+class UnitConverter(object):
+    """
+    Converter of length and time dimensioned variables
+
+    Parameters
+    ----------
+    length_unit : str
+        model length unit, e.g. "feet"
+    time_unit : str
+        model time unit, e.g. "days"
+    target_length : str
+        export length unit, default is "meters"
+    target_time : str
+        export time unit, default is "days"
+    """
+    def __init__(self, length_unit, time_unit, target_length="meters",
+                 target_time="days"):
+        self.length_unit = unit_name(length_unit)
+        self.time_unit = unit_name(time_unit)
+        self.target_length = unit_name(target_length)
+        self.target_time = unit_name(target_time)
+
+        for unit in (self.length_unit, self.target_length):
+            if unit not in LENGTH_UNITS:
+                raise ValueError("Unknown length unit: {}".format(unit))
+        for unit in (self.time_unit, self.target_time):
+            if unit not in TIME_UNITS:
+                raise ValueError("Unknown time unit: {}".format(unit))
+
+        self.length_factor = LENGTH_UNITS[self.length_unit] / \
+            LENGTH_UNITS[self.target_length]
+        self.time_factor = TIME_UNITS[self.time_unit] / \
+            TIME_UNITS[self.target_time]
+
+    def __repr__(self):
+        return "UnitConverter({} {} -> {} {})".format(
+            self.length_unit, self.time_unit, self.target_length,
+            self.target_time)
+
+    def scale(self, units_format):
+        """
+        Method to get the conversion factor of a variable
+
+        Parameters
+        ----------
+        units_format : str
+            units format string of the variable
+
+        Returns
+        -------
+            float, None if the variable is not converted
+        """
+        length, time = units_dimensions(units_format)
+        factor = self.length_factor ** length * self.time_factor ** time
+        if factor == 1.:
+            return None
+        return factor
+
+    def units(self, units_format):
+        """
+        Method to get the export units of a variable
+
+        Parameters
+        ----------
+        units_format : str
+            units format string of the variable
+
+        Returns
+        -------
+            str
+        """
+        return units_format.format(self.target_length, self.target_time)
+
+    @staticmethod
+    def apply(a, factor, fillvalue):
+        """
+        Method to convert an array in place, fill values are kept
+
+        Parameters
+        ----------
+        a : np.ndarray
+            floating point array, masked arrays are converted
+            in their data
+        factor : float
+            conversion factor from scale()
+        fillvalue : float
+            fill value of the export
+
+        Returns
+        -------
+            np.ndarray
+        """
+        data = np.ma.getdata(a)
+        if factor is None or data.dtype.kind != "f":
+            return a
+        np.multiply(data, factor, out=data, where=data != fillvalue,
+                    casting="unsafe")
+        return a
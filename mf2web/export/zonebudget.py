@@ -0,0 +1,254 @@
+"""
+Zone budgets aggregated while cell budget records are exported.
+
+Every cell budget record that streams through the output exporter is
+summed by zone with np.bincount, so water budgets by zone (layer, county,
+basin, ...) come out of the same pass as the export instead of a separate
+ZoneBudget run over the cell budget file. Flow face terms are aggregated
+into flows between zones. MODFLOW 6 FLOW-JA-FACE records are connection
+based and are not exported, so flows between zones are not computed for
+MODFLOW 6 models.
+"""
+import numpy as np
+from .units import UnitConverter
+
+
+ZONE_BUDGET = "zone_budget"
+ZONE_EXCHANGE = "zone_exchange"
+
+# flow face terms and the grid axis of the neighbouring cell
+FACE_TERMS = {"flow_right_face": 2, "flow_front_face": 1,
+              "flow_lower_face": 0}
+
+
+def layer_zones(shape):
+    """
+    Method to build a zone array of model layers, zone k + 1 for
+    layer k
+
+    Parameters
+    ----------
+    shape : tuple
+        (nlay, nrow, ncol) grid shape
+
+    Returns
+    -------
+        np.ndarray of int32
+    """
+    zones = np.arange(1, shape[0] + 1, dtype=np.int32)
+    return np.broadcast_to(zones[:, None, None], shape).copy()
+
+
+class ZoneBudget(object):
+    """
+    Running zone budget of the cell budget terms of an export
+
+    Parameters
+    ----------
+    zones : np.ndarray
+        (nlay, nrow, ncol) integer zone array, cells of zone 0 (or
+        less) are not aggregated
+    terms : list
+        budget variable names, e.g. "storage" or "wells". Each term
+        is split in <term>_in and <term>_out budget terms
+
+    Attributes
+    ----------
+    zone_ids : np.ndarray
+        zone numbers
+    terms : list
+        budget term names, the budget variable terms and the
+        from_other_zones and to_other_zones flows between zones
+    """
+    def __init__(self, zones, terms):
+        zones = np.asarray(zones, dtype=np.int64)
+        self.shape = zones.shape
+        self.zone_ids = np.unique(zones[zones > 0]).astype(np.int32)
+        if self.zone_ids.size == 0:
+            raise ValueError("The zone array has no zones")
+        self.nzone = self.zone_ids.size
+
+        # compact zone index, cells without a zone go to the
+        # last slot that is dropped from the budget
+        index = np.searchsorted(self.zone_ids, zones)
+        index[zones <= 0] = self.nzone
+        self.index = index.ravel()
+
+        self.terms = []
+        for term in terms:
+            if term not in FACE_TERMS:
+                self.terms += ["{}_in".format(term), "{}_out".format(term)]
+        self.terms += ["from_other_zones", "to_other_zones"]
+        self._columns = {term: ix for ix, term in enumerate(self.terms)}
+
+        # {time index: array}
+        self.budgets = {}
+        self.exchange = {}
+
+    def update(self, itime, name, a):
+        """
+        Method to add a cell budget record
+
+        Parameters
+        ----------
+        itime : int
+            time index of the record
+        name : str
+            budget variable name
+        a : np.ndarray
+            (nlay, nrow, ncol) cell budget record
+        """
+        a = np.ma.filled(a, 0.).astype(np.float64, copy=False)
+        if a.shape != self.shape:
+            return
+        if name in FACE_TERMS:
+            self._update_exchange(itime, FACE_TERMS[name], a)
+            return
+
+        column = self._columns.get("{}_in".format(name))
+        if column is None:
+            return
+        n = self.nzone + 1
+        flat = a.ravel()
+        inflow = np.bincount(self.index, weights=np.maximum(flat, 0.),
+                             minlength=n)
+        outflow = np.bincount(self.index, weights=np.minimum(flat, 0.),
+                              minlength=n)
+        budget = self._budget(itime)
+        budget[:, column] += inflow[:-1]
+        budget[:, column + 1] -= outflow[:-1]
+
+    def _update_exchange(self, itime, axis, a):
+        """
+        Method to add the flows between zones of a flow face record.
+        Face flows are from a cell to its neighbour along axis, only
+        faces between cells of different zones are summed
+        """
+        zone = self.index.reshape(self.shape)
+        face = [slice(None)] * 3
+        neighbour = [slice(None)] * 3
+        face[axis] = slice(None, -1)
+        neighbour[axis] = slice(1, None)
+
+        z1 = zone[tuple(face)].ravel()
+        z2 = zone[tuple(neighbour)].ravel()
+        q = a[tuple(face)].ravel()
+        cross = z1 != z2
+        z1, z2, q = z1[cross], z2[cross], q[cross]
+
+        # exchange[i, j] is the flow from zone i to zone j, positive
+        # face flows are towards the neighbour
+        n = self.nzone + 1
+        exchange = np.bincount(z1 * n + z2, weights=np.maximum(q, 0.),
+                               minlength=n * n)
+        exchange -= np.bincount(z2 * n + z1, weights=np.minimum(q, 0.),
+                                minlength=n * n)
+        exchange = exchange.reshape(n, n)
+
+        if itime not in self.exchange:
+            self.exchange[itime] = np.zeros((self.nzone, self.nzone))
+        self.exchange[itime] += exchange[:-1, :-1]
+
+        # totals include flows to and from cells without a zone
+        budget = self._budget(itime)
+        budget[:, self._columns["from_other_zones"]] += \
+            exchange[:, :-1].sum(axis=0)
+        budget[:, self._columns["to_other_zones"]] += \
+            exchange[:-1, :].sum(axis=1)
+
+    def _budget(self, itime):
+        if itime not in self.budgets:
+            self.budgets[itime] = np.zeros((self.nzone, len(self.terms)))
+        return self.budgets[itime]
+
+    def merge(self, other):
+        """
+        Method to add the budgets of another block of time steps,
+        e.g. from a worker process
+
+        Parameters
+        ----------
+        other : ZoneBudget
+
+        Returns
+        -------
+            ZoneBudget
+        """
+        for attr in ("budgets", "exchange"):
+            mine = getattr(self, attr)
+            for itime, values in getattr(other, attr).items():
+                if itime in mine:
+                    mine[itime] += values
+                else:
+                    mine[itime] = values
+        return self
+
+    def arrays(self, ntime, fillvalue):
+        """
+        Method to get the zone budget of every time step, time
+        steps without budget records are fill values. Flows between
+        zones of time steps without flow face records are fill
+        values as well
+
+        Parameters
+        ----------
+        ntime : int
+            number of time steps of the export
+        fillvalue : float
+
+        Returns
+        -------
+            tuple of (ntime, nzone, nterm) budget and
+            (ntime, nzone, nzone) exchange arrays
+        """
+        budget = np.full((ntime, self.nzone, len(self.terms)), fillvalue)
+        for itime, values in self.budgets.items():
+            budget[itime] = values
+            if itime not in self.exchange:
+                budget[itime, :, -2:] = fillvalue
+        exchange = np.full((ntime, self.nzone, self.nzone), fillvalue)
+        for itime, values in self.exchange.items():
+            exchange[itime] = values
+        return budget, exchange
+
+
+def write_zone_budget(backend, zone_budget, ntime, units=None, scale=None):
+    """
+    Method to write the zone_budget (time, zone, budget_term) and
+    zone_exchange (time, zone, to_zone) variables of an export
+
+    Parameters
+    ----------
+    backend : NetCdfBackend or ZarrBackend
+    zone_budget : ZoneBudget
+    ntime : int
+        number of time steps of the export
+    units : str
+        flow units
+    scale : float
+        optional unit conversion factor, see UnitConverter
+    """
+    budget, exchange = zone_budget.arrays(ntime, backend.fillvalue)
+    backend.add_coordinate("zone", zone_budget.zone_ids,
+                           {"long_name": "zone number"})
+    backend.add_coordinate("to_zone", zone_budget.zone_ids,
+                           {"long_name": "zone number flow is to"})
+    backend.add_coordinate(
+        "budget_term", np.arange(len(zone_budget.terms), dtype=np.int32),
+        {"long_name": "zone budget term index",
+         "terms": " ".join(zone_budget.terms)})
+
+    for name, dims, values, long_name in (
+            (ZONE_BUDGET, ("time", "zone", "budget_term"), budget,
+             "zone budget"),
+            (ZONE_EXCHANGE, ("time", "zone", "to_zone"), exchange,
+             "flow between zones")):
+        attribs = {"long_name": long_name}
+        if units is not None:
+            attribs["units"] = units
+        if name == ZONE_BUDGET:
+            attribs["terms"] = " ".join(zone_budget.terms)
+        UnitConverter.apply(values, scale, backend.fillvalue)
+        backend.create_variable(name, attribs, dimensions=dims,
+                                precision_str="f8")
+        backend.write(name, Ellipsis, values)
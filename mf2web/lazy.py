@@ -0,0 +1,49 @@
+"""
+Lazy attribute loading for mf2web packages.
+
+Package __init__ modules map their public names to the submodule that
+defines them. Submodules (and their flopy, netCDF4, zarr and pyproj
+imports) are imported on first attribute access (PEP 562), so that
+`import mf2web` and command line help stay fast.
+"""
+import importlib
+
+
+def lazy_attributes(package, attributes, submodules=()):
+    """
+    Method to build the module __getattr__ and __dir__ functions
+    of a package
+
+    Parameters
+    ----------
+    package : str
+        package name, __name__ of the package __init__
+    attributes : dict
+        {public name: relative module name that defines it}
+    submodules : list
+        names of submodules that are imported on access
+
+    Returns
+    -------
+        tuple of (__getattr__, __dir__) functions
+    """
+    module = importlib.import_module(package)
+    public = sorted(list(attributes) + list(submodules))
+
+    def __getattr__(name):
+        if name in attributes:
+            value = getattr(importlib.import_module(attributes[name],
+                                                    package), name)
+        elif name in submodules:
+            value = importlib.import_module("." + name, package)
+        else:
+            raise AttributeError("module {!r} has no attribute {!r}"
+                                 .format(package, name))
+        # cache on the package, later lookups skip __getattr__
+        setattr(module, name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(module)) | set(public))
+
+    return __getattr__, __dir__
@@ -1,14 +1,21 @@
 import os
+import hashlib
+import shutil
+import tempfile
+import asyncio
+import functools
+import threading
+from collections import OrderedDict
 import flopy as fp
 import numpy as np
-from .seawat import Seawat
-from .mf88 import Modflow88
-try:
-    import gsflow
-except ImportError:
-    gsflow = None
-    print("Install pyGSFLOW for gsflow capabilities")
-    print("https://github.com/usgs-pygsflow/pygsflow")
+from .export import OutputExporter, CachedNetCdf, GridGeometry, \
+    ActiveCellIndex, compress_netcdf, netcdf_to_zarr, product_name, \
+    UnitConverter, transpose_netcdf, ExportCancelled
+from .export.tiles import export_tile_pyramid
+from .export.manifest import ExportManifest, model_file_paths
+from .export.prms import PRMS_OUTPUT_KEYS, CHUNK_SIZE, export_prms
+from .export.output import find_ucn_files
+from .export.zonebudget import layer_zones
 
 
 class GwWebFlow(object):
@@ -26,7 +33,11 @@ class GwWebFlow(object):
             usgs ipds number
         output_files : dict
             dictionary of model output files, valid keys
-            are "hds", "cbc", and "ucn"
+            are "hds", "cbc", and "ucn". "ucn" can be a list
+            of per-species concentration files, or "auto" to find
+            the MT3D00N.UCN and MT3D00NS.UCN files of the BTN
+            species. PRMS statvar and animation files of gsflow
+            models use the "statvar" and "ani" keys
 
             example
             >>> output_files = {"hds" : "Lucerne_head.out",
@@ -38,6 +49,33 @@ class GwWebFlow(object):
 
         length_multiplier : float
             optional model length conversion factor
+
+        budget_terms : list
+            optional list of cell budget terms to export, for
+            example ["STORAGE", "WELLS"]. Records with other terms
+            are skipped when reading the cell budget file
+
+        cache_dir : str
+            optional directory for cached grid coordinates,
+            default is ~/.mf2web/geometry
+
+        profile : str
+            export profile that sets the packages loaded with the
+            model. "full" (default) loads every package, "output-only"
+            loads the grid packages and the MT3D BTN package and
+            "grid-only" loads the grid packages. Exports that need
+            more packages reload the model, see PROFILES
+
+        units : tuple
+            optional (length unit, time unit) of the export, e.g.
+            ("meters", "days"). Length and time dimensioned variables
+            are converted from the length_units and time_units of the
+            reference file as they are written
+
+        scratch_dir : str
+            optional directory for out-of-core storage of modflow-88
+            package arrays. Arrays are written once to memory-mapped
+            scratch files and paged in on demand by exports
     Notes
     -----
     usage
@@ -45,13 +83,36 @@ class GwWebFlow(object):
     >>> gwweb = GwWebFlow("mojave.nam", "mojave.ref.txt", "01-4002")
     >>> gwweb.create_netcdf_input_file()
 
+    output exports skip parsing of the flow and boundary packages
+    >>> gwweb = GwWebFlow("mojave.nam", "mojave.ref.txt", "01-4002",
+    >>>                   output_files={"hds": "mojave.hds"},
+    >>>                   profile="output-only")
+    >>> gwweb.create_netcdf_output_file()
+
+    from a coroutine, loading and exports run on an executor
+    >>> gwweb = await GwWebFlow.load_async("mojave.nam", "mojave.ref.txt",
+    >>>                                    "01-4002")
+    >>> await gwweb.create_netcdf_output_file_async(progress=callback)
+
     """
     LENUNI = {}
     ITEMUNI = {}
     VERSION = {}
+    # package types loaded by each export profile, ordered from the
+    # fewest packages to every package (None). BAS and BCF are the
+    # modflow-88 grid packages
+    PROFILES = OrderedDict([("grid-only", ("DIS", "BAS6", "BAS", "BCF")),
+                            ("output-only", ("DIS", "BAS6", "BAS", "BCF",
+                                             "BTN")),
+                            ("full", None)])
+    MT_PACKAGES = ("BTN",)
+    # layer property flow packages that define hdry
+    FLOW_PACKAGES = ("BCF6", "LPF", "UPW")
 
     def __init__(self, namfile, reference_file, report_id, scenario="0",
-                 output_files=None, model_ws="", length_multiplier=None):
+                 output_files=None, model_ws="", length_multiplier=None,
+                 budget_terms=None, cache_dir=None, profile="full",
+                 units=None, scratch_dir=None):
 
         self.namefile = os.path.split(namfile)[-1]
         self.reference = reference_file
@@ -65,6 +126,15 @@ class GwWebFlow(object):
         self.yul = None
         self.rotation = None
         self.length_multiplier = length_multiplier
+        self.budget_terms = budget_terms
+        self.cache_dir = cache_dir
+        if profile not in self.PROFILES:
+            raise ValueError("Unknown export profile {}, valid profiles "
+                             "are {}".format(profile,
+                                             ", ".join(self.PROFILES)))
+        self.profile = profile
+        self.units = units
+        self.scratch_dir = scratch_dir
         self.length_unit = None
         self.time_unit = None
         self.start_date = None
@@ -73,54 +143,184 @@ class GwWebFlow(object):
         self.proj4 = None
         self.epsg = None
         self._read_usgs_model_reference_file()
+        self._unit_converter = None
+        if units is not None:
+            if self.length_unit is None or self.time_unit is None:
+                raise ValueError("Unit conversion needs the length and "
+                                 "time units of the reference file")
+            self._unit_converter = UnitConverter(self.length_unit,
+                                                 self.time_unit, *units)
+        self._model = None
+        self._loaded_profile = None
+
+    @property
+    def model(self):
+        """
+        Model object, loaded on first use so that up-to-date exports
+        are skipped without reading model files
+        """
+        if self._model is None:
+            self._load_model(self.profile)
+        return self._model
 
+    def _require_profile(self, profile):
+        """
+        Method to load the model with the packages an export needs.
+        A model loaded with fewer packages is reloaded.
+
+        Parameters
+        ----------
+            profile : str
+                export profile, see PROFILES
+        """
+        order = list(self.PROFILES)
+        profile = max(profile, self.profile, key=order.index)
+        if self._model is not None and \
+                order.index(self._loaded_profile) >= order.index(profile):
+            return
+        if self._model is not None:
+            print("Reloading model with the {} export profile"
+                  .format(profile))
+        self._load_model(profile)
+
+    def _load_only(self, profile):
+        """
+        Method to get the modflow and mt3d package types loaded for
+        an export profile. Package types that are not in the name
+        file are dropped, flopy raises on them.
+
+        Returns
+        -------
+            tuple of (modflow, mt3d) lists, None loads every package
+        """
+        packages = self.PROFILES[profile]
+        if packages is None:
+            return None, None
+        mf = [p for p in packages if p not in self.MT_PACKAGES]
+        mt = [p for p in packages if p in self.MT_PACKAGES]
+        if self.version != "mf88":
+            entries = _namefile_entries(self._modflow_namefile())
+            mf = [p for p in mf if p in entries]
+        return mf, mt
+
+    def _modflow_namefile(self):
+        """
+        Method to get the path of the modflow name file, from the
+        modflow_name entry of gsflow control files
+        """
+        namfile = os.path.join(self.model_ws, self.namefile)
+        if self.version != "gsflow":
+            return namfile
+        with open(namfile) as foo:
+            lines = [line.strip() for line in foo]
+        for ix, line in enumerate(lines):
+            if line == "modflow_name":
+                # record name, number of values, type and value
+                return os.path.join(self.model_ws, lines[ix + 3])
+        raise ValueError("No modflow_name in {}".format(namfile))
+
+    def _flow_package_hdry(self):
+        """
+        Method to read hdry from the layer property flow package
+        file, for models loaded without it
+
+        Returns
+        -------
+            float or None
+        """
+        entries = _namefile_entries(self._modflow_namefile())
+        for ftype in self.FLOW_PACKAGES:
+            if ftype not in entries:
+                continue
+            with open(os.path.join(self.model_ws, entries[ftype])) as foo:
+                for line in foo:
+                    if line.strip() and not line.startswith("#"):
+                        try:
+                            # item 1 is IxxxCB HDRY ...
+                            return float(line.split()[1].upper()
+                                         .replace("D", "E"))
+                        except (IndexError, ValueError):
+                            return None
+        return None
+
+    def _load_model(self, profile="full"):
+        """
+        Method to load the model and set its grid and start time
+        from the usgs model reference file. Version specific
+        loaders are imported here, only for the model version used
+
+        Parameters
+        ----------
+            profile : str
+                export profile that sets the packages loaded
+        """
+        load_only, mt_load_only = self._load_only(profile)
         if self.version == "seawat":
+            from .seawat import Seawat
             # call mf2web.seawat.Seawat b/c modelgrid.idomain broken in flopy seawat
-            self.model = Seawat.load(os.path.join(self.model_ws,
-                                                  self.namefile),
-                                      model_ws=self.model_ws,
-                                      version=self.version)
+            self._model = Seawat.load(os.path.join(self.model_ws,
+                                                   self.namefile),
+                                       model_ws=self.model_ws,
+                                       version=self.version,
+                                       load_only=load_only,
+                                       mt_load_only=mt_load_only)
 
         elif self.version == "mf6":
-            raise NotImplementedError()
+            from .mf6 import Mf6GridModel
+            # grid and time discretization from the binary grid and tdis
+            # files, the simulation is only loaded for input exports
+            self._model = Mf6GridModel.load(self.namefile,
+                                            model_ws=self.model_ws,
+                                            lenuni=self.length_unit)
 
         elif self.version == "mf88":
-            self.model = Modflow88.load(os.path.join(self.model_ws,
-                                                     self.namefile),
-                                        model_ws=model_ws,
-                                        lenuni=self.length_unit)
+            from .mf88 import Modflow88
+            self._model = Modflow88.load(os.path.join(self.model_ws,
+                                                      self.namefile),
+                                         model_ws=self.model_ws,
+                                         lenuni=self.length_unit,
+                                         load_only=load_only,
+                                         scratch_dir=self.scratch_dir)
 
         elif self.version in ("mfowhm", "mf96"):
             err = "{} is not yet supported".format(self.version)
             raise NotImplementedError(err)
 
         elif self.version == "gsflow":
-            if gsflow is None:
-                raise ImportError("pygsflow must be installed for GSFLOW models")
+            try:
+                import gsflow
+            except ImportError:
+                raise ImportError("pygsflow must be installed for GSFLOW "
+                                  "models, see "
+                                  "https://github.com/usgs-pygsflow/pygsflow")
 
-            self.model = gsflow.GsflowModel.load_from_file(os.path.join(model_ws,
-                                                                        self.namefile))
+            self._model = gsflow.GsflowModel.load_from_file(os.path.join(self.model_ws,
+                                                                         self.namefile),
+                                                            mf_load_only=load_only)
 
         else:
             # method for modflow-2000, 2005, and nwt models
-            self.model = fp.modflow.Modflow.load(os.path.join(model_ws,
-                                                              self.namefile),
-                                                 model_ws=self.model_ws,
-                                                 version=self.version,
-                                                 check=False)
+            self._model = fp.modflow.Modflow.load(os.path.join(self.model_ws,
+                                                               self.namefile),
+                                                  model_ws=self.model_ws,
+                                                  version=self.version,
+                                                  load_only=load_only,
+                                                  check=False)
 
         if self.version == "mf88":
             self.model.bas.start_datetime = self.start_date + " " + self.start_time
 
         elif self.version == "gsflow":
             self.model.mf.dis.start_datetime = self.start_date + " " + self.start_time
+        elif self.version == "mf6":
+            self.model.start_datetime = self.start_date + " " + self.start_time
         else:
             self.model.dis.start_datetime = self.start_date + ' ' + self.start_time
 
         if self.length_multiplier is not None:
             if self.version == "mf88":
-                delr = self.model.bcf.delr.array * length_multiplier
-                delc = self.model.bcf.delc.array * length_multiplier
+                delr = self.model.bcf.delr.array * self.length_multiplier
+                delc = self.model.bcf.delc.array * self.length_multiplier
                 nrow, ncol, nlay, nper = self.model.nrow_ncol_nlay_nper
 
                 self.model.bcf.delr = fp.utils.Util2d(self.model, (ncol,), np.float32,
@@ -130,8 +330,8 @@ class GwWebFlow(object):
                                                       delc, name="delr", locat=self.model.dis.unit_number[0])
 
             elif self.version == "gsflow":
-                delr = self.model.mf.dis.delr.array * length_multiplier
-                delc = self.model.mf.dis.delc.array * length_multiplier
+                delr = self.model.mf.dis.delr.array * self.length_multiplier
+                delc = self.model.mf.dis.delc.array * self.length_multiplier
 
                 self.model.mf.dis.delr = fp.utils.Util2d(self.model.mf, (self.model.mf.dis.ncol,),
                                                          np.float32, delr, name="delr",
@@ -141,9 +341,12 @@ class GwWebFlow(object):
                                                          np.float32, delc, name="delr",
                                                          locat=self.model.mf.dis.unit_number[0])
 
+            elif self.version == "mf6":
+                self.model.multiply_lengths(self.length_multiplier)
+
             else:
-                delr = self.model.dis.delr.array * length_multiplier
-                delc = self.model.dis.delc.array * length_multiplier
+                delr = self.model.dis.delr.array * self.length_multiplier
+                delc = self.model.dis.delc.array * self.length_multiplier
 
                 self.model.dis.delr = fp.utils.Util2d(self.model, (self.model.dis.ncol,), np.float32,
                                                       delr, name="delr", locat=self.model.dis.unit_number[0])
@@ -212,6 +415,13 @@ class GwWebFlow(object):
                     self.model._mt.modelgrid.proj4 = self.proj4
                     self.model._mt.modelgrid._require_cache_updates()
 
+            elif self.version == "mf6":
+                self.model.modelgrid._xoff = self.model.modelgrid._xul_to_xll(self.xul)
+                self.model.modelgrid._yoff = self.model.modelgrid._yul_to_yll(self.yul)
+                self.model.modelgrid.epsg = self.epsg
+                self.model.modelgrid.proj4 = self.proj4
+                self.model.modelgrid._require_cache_updates()
+
             elif self.version == "gsflow":
                 self.model.mf.modelgrid._xoff = self.model.mf.modelgrid._xul_to_xll(self.xul)
                 self.model.mf.modelgrid._yoff = self.model.mf.modelgrid._yul_to_yll(self.yul)
@@ -219,53 +429,645 @@ class GwWebFlow(object):
                 self.model.mf.modelgrid.proj4 = self.proj4
                 self.model.mf.modelgrid._require_cache_updates()
 
-    def create_netcdf_input_file(self):
+        self._loaded_profile = profile
+
+    @classmethod
+    async def load_async(cls, namfile, reference_file, report_id,
+                         executor=None, **kwargs):
+        """
+        Coroutine that loads a model on an executor, so the event
+        loop is not blocked while model files are read
+
+        Parameters
+        ----------
+            namfile : str
+                modflow name file name or gsflow control file
+            reference_file : str
+                usgs model refence file for archiving
+            report_id : str
+                usgs ipds number
+            executor : concurrent.futures.Executor
+                optional executor, default is the event loop's
+                default executor
+            **kwargs : keyword arguments passed to GwWebFlow
+
+        Returns
+        -------
+            GwWebFlow
+        """
+        func = functools.partial(_load_model, cls, namfile, reference_file,
+                                 report_id, **kwargs)
+        return await _run_in_executor(func, executor)
+
+    async def create_netcdf_input_file_async(self, executor=None, **kwargs):
+        """
+        Coroutine version of create_netcdf_input_file() that runs
+        the export on an executor
+
+        Parameters
+        ----------
+            executor : concurrent.futures.Executor
+                optional executor, default is the event loop's
+                default executor
+            **kwargs : keyword arguments passed to
+                create_netcdf_input_file()
+        """
+        func = functools.partial(self.create_netcdf_input_file, **kwargs)
+        return await _run_in_executor(func, executor)
+
+    async def create_netcdf_output_file_async(self, progress=None,
+                                              cancel=None, executor=None,
+                                              **kwargs):
+        """
+        Coroutine version of create_netcdf_output_file() that runs
+        the export on an executor. Cancelling the awaiting task sets
+        the cancel event, the export stops at the next time step and
+        the partial export is removed.
+
+        Parameters
+        ----------
+            progress : callable
+                optional method called on the event loop as
+                progress(done, total) with the number of time steps
+                written
+            cancel : threading.Event
+                optional event that cancels the export,
+                mf2web.export.ExportCancelled is raised
+            executor : concurrent.futures.Executor
+                optional executor, default is the event loop's
+                default executor
+            **kwargs : keyword arguments passed to
+                create_netcdf_output_file()
+        """
+        loop = asyncio.get_running_loop()
+        if cancel is None:
+            cancel = threading.Event()
+        if progress is not None:
+            progress = _call_soon(loop, progress)
+        func = functools.partial(self.create_netcdf_output_file,
+                                 progress=progress, cancel=cancel, **kwargs)
+        return await _run_in_executor(func, executor, cancel)
+
+    def create_netcdf_input_file(self, backend="netcdf", store="directory",
+                                 workers=None, active_only=False,
+                                 force=False):
         """
         Method that writes a netcdf input file from
         modflow model files
+
+        Parameters
+        ----------
+            backend : str
+                export format, "netcdf" or "zarr"
+            store : str
+                zarr store type, "directory" or "zip"
+            workers : int
+                number of processes used to write zarr chunks,
+                default is os.cpu_count()
+            active_only : bool
+                store 3d arrays by active cells only (CF compression
+                by gathering), cropped to the active cell bounding box
+            force : bool
+                export even if the file is up to date with the
+                model files, see _manifest()
+        """
+        ncf_name = product_name(self.report_id, self.scenario, "in",
+                                backend, store)
+        manifest = self._manifest("in", ncf_name,
+                                  {"backend": backend, "store": store,
+                                   "active_only": active_only})
+        if not force and manifest.is_current():
+            print("{} is up to date, skipping export".format(ncf_name))
+            return
+        self._require_profile("full")
+        self._check_structured()
+
+        if backend == "zarr" or active_only:
+            # flopy writes the CF input variables, which are then
+            # gathered and/or copied chunk by chunk into the zarr store
+            tmpdir = tempfile.mkdtemp(
+                dir=os.path.dirname(os.path.abspath(ncf_name)))
+            try:
+                tmp_name = os.path.join(tmpdir, "input.nc")
+                self._export_input(tmp_name)
+                if active_only:
+                    gathered = os.path.join(tmpdir, "input.active.nc")
+                    compress_netcdf(tmp_name, gathered,
+                                    self._active_cell_index())
+                    tmp_name = gathered
+
+                if backend == "zarr":
+                    store_path = ncf_name
+                    if store == "zip":
+                        store_path = ncf_name[:-4]
+                    netcdf_to_zarr(tmp_name, store_path, workers=workers,
+                                   store=store)
+                else:
+                    shutil.move(tmp_name, ncf_name)
+            finally:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+        else:
+            self._export_input(ncf_name)
+        manifest.write()
+
+    def _manifest(self, kind, product, options, extra_files=()):
+        """
+        Method to build the manifest of an exported product from the
+        name file, reference file, package files, output files and
+        export options. The model is not loaded.
+
+        Parameters
+        ----------
+            kind : str
+                "in", "out", "diff" or "prms"
+            product : str
+                exported file or store name
+            options : dict
+                export options
+            extra_files : list
+                other files the product is built from, e.g. the
+                output files of a baseline run
+
+        Returns
+        -------
+            ExportManifest
+        """
+        files = model_file_paths(self.namefile, self.model_ws)
+        files.append(os.path.join(self.model_ws, self.reference))
+        files.extend(extra_files)
+        if kind in ("out", "diff"):
+            for key, value in self._output_files().items():
+                if key == "UCN" and value in (None, "auto"):
+                    value = find_ucn_files(self.model_ws)
+                if not isinstance(value, (list, tuple)):
+                    value = [value]
+                files.extend(os.path.join(self.model_ws, f) for f in value)
+        elif kind == "prms":
+            files.extend(os.path.join(self.model_ws, f)
+                         for f in self._output_files(prms=True).values())
+
+        options = dict(options)
+        options.update({"kind": kind, "scenario": self.scenario,
+                        "version": self.version,
+                        "length_multiplier": self.length_multiplier,
+                        "units": self.units})
+        if kind in ("out", "diff"):
+            options["budget_terms"] = self.budget_terms
+        return ExportManifest(product, files, options)
+
+    def _check_structured(self):
+        """
+        Method to check that the model grid can be exported, the
+        netcdf and zarr exports need a structured grid
+        """
+        grid_type = self._flow_model.modelgrid.grid_type
+        if grid_type != "structured":
+            raise NotImplementedError("{} grids are not supported by the "
+                                      "export".format(grid_type))
+
+    def _active_cell_index(self):
+        """
+        Method to build the gather index of active model cells
+        """
+        idomain = self._flow_model.modelgrid.idomain
+        if idomain is None:
+            raise ValueError("active_only exports need ibound or icbund")
+        return ActiveCellIndex(np.asarray(idomain) != 0)
+
+    def _export_input(self, ncf_name):
+        """
+        Method to export model input packages with flopy
         """
-        ncf_name = ".".join([self.report_id, self.scenario, "in", "nc"])
         if self.version == "gsflow":
+            if self._unit_converter is not None:
+                print("Warning, gsflow input is exported in model units")
             self.model.export_nc(ncf_name)
+        elif self.version == "mf6":
+            # input packages need the full simulation, exported on the
+            # grid and time discretization of the light model
+            gwf = self._mf6_simulation().get_model(self.model.name)
+            nc = CachedNetCdf(ncf_name, gwf, cache_dir=self.cache_dir,
+                              units=self._unit_converter,
+                              modelgrid=self.model.modelgrid,
+                              modeltime=self.model.modeltime)
+            gwf.export(nc)
+            nc.write()
         else:
-            self.model.export(ncf_name)
+            # cell coordinates come from the grid geometry cache
+            nc = CachedNetCdf(ncf_name, self.model, cache_dir=self.cache_dir,
+                              units=self._unit_converter)
+            self.model.export(nc)
+            nc.write()
 
-    def create_netcdf_output_file(self, masked_vals=[]):
+    def _mf6_simulation(self):
+        """
+        Method to load the full MODFLOW 6 simulation, only needed
+        to export input packages
+        """
+        return fp.mf6.MFSimulation.load(sim_ws=self.model_ws,
+                                        verbosity_level=0)
+
+    def create_netcdf_output_file(self, masked_vals=[], backend="netcdf",
+                                  store="directory", workers=None,
+                                  derived=None, drawdown_reference=None,
+                                  active_only=False, zones=None,
+                                  progress=None, cancel=None, force=False):
         """
         Method that writes a netcdf output file from
         modflow model output files. Currently supports
-        Seawat binary concentration files and modflow
-        binary head files
+        Seawat binary concentration files, modflow
+        binary and formatted head files and cell budget
+        files
+
+        Parameters
+        ----------
+            masked_vals : list
+                output values to write as fill values
+            backend : str
+                export format, "netcdf" or "zarr"
+            store : str
+                zarr store type, "directory" or "zip"
+            workers : int
+                number of worker processes, default is os.cpu_count().
+                Each output file is read in its own process and zarr
+                chunks are written concurrently
+            derived : list
+                optional derived products computed from heads while
+                the head file is read, "drawdown" and/or
+                "saturated_thickness"
+            drawdown_reference : float
+                optional totim of the head record drawdown is relative
+                to. Default is the starting heads of the model
+            active_only : bool
+                store variables by active cells only (CF compression
+                by gathering), cropped to the active cell bounding box
+            zones : np.ndarray or str
+                optional zone array for zone budgets of the cell budget
+                terms, an integer (nlay, nrow, ncol) or (nrow, ncol)
+                array, a ZoneBudget zone file relative to model_ws or
+                "layer" for a zone per layer. Budgets are aggregated as
+                the cell budget file is exported and written to the
+                zone_budget and zone_exchange variables
+            progress : callable
+                optional method called as progress(done, total) with
+                the number of time steps written
+            cancel : threading.Event
+                optional event that cancels the export between time
+                steps, mf2web.export.ExportCancelled is raised
+            force : bool
+                export even if the file is up to date with the
+                model and output files
         """
         if self.output_files is None:
             return
 
+        if self._output_files(prms=True):
+            self.create_netcdf_prms_file(force=force)
+        output_files = self._output_files()
+        if not output_files:
+            return
+
         if self.version == "mf88":
             raise NotImplementedError("output not yet implemented for mf88")
 
-        ncf_name = ".".join([self.report_id, self.scenario, "out", "nc"])
-
-        export_dict = {}
-        for key, value in self.output_files.items():
-            if key.upper() == "UCN":
-                out = fp.utils.UcnFile(os.path.join(self.model_ws, value))
-            elif key.upper() == "HDS":
-                out = fp.utils.HeadFile(os.path.join(self.model_ws, value))
-            elif key.upper() == "FHD":
-                out = fp.utils.FormattedHeadFile(os.path.join(self.model_ws, value))
-            elif key.upper() == "CBC":
-                out = fp.utils.CellBudgetFile(os.path.join(self.model_ws, value))
-            else:
-                raise KeyError("Invalid output key: {}".format(key))
+        ncf_name = product_name(self.report_id, self.scenario, "out",
+                                backend, store)
+        manifest = self._manifest("out", ncf_name,
+                                  {"backend": backend, "store": store,
+                                   "masked_vals": list(masked_vals),
+                                   "derived": derived,
+                                   "drawdown_reference": drawdown_reference,
+                                   "active_only": active_only,
+                                   "zones": _zones_option(zones)},
+                                  _zone_files(zones, self.model_ws))
+        if not force and manifest.is_current():
+            print("{} is up to date, skipping export".format(ncf_name))
+            return
+        masked_vals = self._prepare_output(output_files, masked_vals)
+
+        exporter = OutputExporter(ncf_name, self._flow_model,
+                                  output_files,
+                                  model_ws=self.model_ws,
+                                  masked_vals=masked_vals,
+                                  backend=backend, store=store,
+                                  workers=workers,
+                                  budget_terms=self.budget_terms,
+                                  derived=derived,
+                                  drawdown_reference=drawdown_reference,
+                                  cache_dir=self.cache_dir,
+                                  active_only=active_only,
+                                  units=self._unit_converter,
+                                  zones=self._zone_array(zones),
+                                  progress=progress, cancel=cancel)
+        exporter.export()
+        manifest.write()
+
+    def _zone_array(self, zones):
+        """
+        Method to build the (nlay, nrow, ncol) zone array of zone
+        budgets
+
+        Parameters
+        ----------
+            zones : np.ndarray or str
+                zone array, zone file or "layer"
+
+        Returns
+        -------
+            np.ndarray or None
+        """
+        if zones is None:
+            return None
+        shape = self._flow_model.modelgrid.shape
+        if isinstance(zones, str):
+            if zones.lower() == "layer":
+                return layer_zones(shape)
+            zones = fp.utils.ZoneBudget.read_zone_file(
+                os.path.join(self.model_ws, zones))
+        zones = np.asarray(zones, dtype=np.int32)
+        if zones.ndim == 2:
+            zones = np.broadcast_to(zones, shape)
+        if zones.shape != shape:
+            raise ValueError("Zone array shape {} does not match the model "
+                             "grid {}".format(zones.shape, shape))
+        return zones
+
+    def create_netcdf_diff_file(self, baseline_ws=None, baseline_files=None,
+                                masked_vals=[], backend="netcdf",
+                                store="directory", workers=None,
+                                active_only=False, progress=None,
+                                cancel=None, force=False):
+        """
+        Method that writes the difference of the model output files
+        to the output files of a baseline run, usually the base
+        scenario "0", to <ipds>.<scenario>.diff.nc. Records of both
+        runs are read in lockstep, aligned on totim, and written as
+        scenario minus baseline. Cells that are masked in either run
+        are written as fill values.
+
+        Parameters
+        ----------
+            baseline_ws : str
+                workspace of the baseline output files, default is
+                the model workspace
+            baseline_files : dict
+                baseline output files with the keys of output_files,
+                default is the output file names in baseline_ws. At
+                least one of baseline_ws and baseline_files is needed,
+                a ValueError is raised when a baseline file is an
+                output file of the model
+            masked_vals : list
+                output values to write as fill values
+            backend : str
+                export format, "netcdf" or "zarr"
+            store : str
+                zarr store type, "directory" or "zip"
+            workers : int
+                number of worker processes, default is os.cpu_count()
+            active_only : bool
+                store variables by active cells only (CF compression
+                by gathering), cropped to the active cell bounding box
+            progress : callable
+                optional method called as progress(done, total) with
+                the number of time steps written
+            cancel : threading.Event
+                optional event that cancels the export between time
+                steps, mf2web.export.ExportCancelled is raised
+            force : bool
+                export even if the file is up to date with the
+                model and output files of both runs
+        """
+        output_files = self._output_files()
+        if not output_files:
+            return
+
+        if self.version == "mf88":
+            raise NotImplementedError("output not yet implemented for mf88")
+
+        if baseline_ws is None and baseline_files is None:
+            raise ValueError("create_netcdf_diff_file needs baseline_ws "
+                             "or baseline_files")
+        if baseline_ws is None:
+            baseline_ws = self.model_ws
+        if baseline_files is None:
+            baseline_files = output_files
+        baseline_files = {k.upper(): v for k, v in baseline_files.items()}
+        if baseline_files.get("UCN") in (None, "auto") and \
+                "UCN" in output_files:
+            baseline_files["UCN"] = find_ucn_files(baseline_ws)
+
+        extra_files = []
+        for value in baseline_files.values():
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            extra_files.extend(os.path.join(baseline_ws, f) for f in value)
+
+        # a run diffed against itself is all zeros
+        model_paths = set()
+        for value in output_files.values():
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            model_paths.update(os.path.abspath(os.path.join(self.model_ws, f))
+                               for f in value if f not in (None, "auto"))
+        same = [f for f in extra_files if os.path.abspath(f) in model_paths]
+        if same:
+            raise ValueError("Baseline files are output files of the model: "
+                             "{}".format(", ".join(same)))
+
+        ncf_name = product_name(self.report_id, self.scenario, "diff",
+                                backend, store)
+        manifest = self._manifest("diff", ncf_name,
+                                  {"backend": backend, "store": store,
+                                   "masked_vals": list(masked_vals),
+                                   "active_only": active_only},
+                                  extra_files)
+        if not force and manifest.is_current():
+            print("{} is up to date, skipping export".format(ncf_name))
+            return
+        masked_vals = self._prepare_output(output_files, masked_vals)
+
+        exporter = OutputExporter(ncf_name, self._flow_model,
+                                  output_files,
+                                  model_ws=self.model_ws,
+                                  masked_vals=masked_vals,
+                                  backend=backend, store=store,
+                                  workers=workers,
+                                  budget_terms=self.budget_terms,
+                                  cache_dir=self.cache_dir,
+                                  active_only=active_only,
+                                  units=self._unit_converter,
+                                  baseline_files=baseline_files,
+                                  baseline_ws=baseline_ws,
+                                  progress=progress, cancel=cancel)
+        exporter.export()
+        manifest.write()
+
+    def _prepare_output(self, output_files, masked_vals):
+        """
+        Method to load the model for an output export and resolve
+        automatic concentration files
+
+        Parameters
+        ----------
+            output_files : dict
+                output files with upper case keys, updated in place
+            masked_vals : list
+                output values to write as fill values
+
+        Returns
+        -------
+            list : masked_vals with hdry of models loaded without
+                the layer property flow package
+        """
+        self._require_profile("output-only")
+        self._check_structured()
+        if self._loaded_profile != "full" and self.version != "mf6":
+            # hdry is set by the layer property flow package, which
+            # the output-only profile does not load
+            hdry = self._flow_package_hdry()
+            if hdry is not None:
+                masked_vals = list(masked_vals) + [hdry]
+        if "UCN" in output_files and output_files["UCN"] in (None, "auto"):
+            output_files["UCN"] = self._species_files()
+        return masked_vals
+
+    def create_netcdf_timeseries_file(self, variables=None, max_bytes=None,
+                                      force=False):
+        """
+        Method that writes a cell-major copy of the netcdf output
+        file to <ipds>.<scenario>.ts.nc, for hydrograph queries.
+        Heads and concentrations are stored with time as the last,
+        contiguous dimension, so the time series of a cell is a
+        single read. The output file is transposed in tiles of
+        bounded size, the model is not loaded.
+
+        Parameters
+        ----------
+            variables : list
+                optional list of variables to transpose, default
+                is heads and concentrations
+            max_bytes : int
+                optional memory used by one tile of the transpose,
+                default is mf2web.export.timeseries.MAX_TILE_BYTES
+            force : bool
+                export even if the file is up to date with the
+                netcdf output file
+        """
+        src = product_name(self.report_id, self.scenario, "out")
+        if not os.path.isfile(src):
+            raise IOError("{} not found, create the netcdf output file "
+                          "first".format(src))
+
+        ncf_name = product_name(self.report_id, self.scenario, "ts")
+        manifest = ExportManifest(ncf_name, [src],
+                                  {"kind": "ts", "variables": variables})
+        if not force and manifest.is_current():
+            print("{} is up to date, skipping export".format(ncf_name))
+            return
+
+        kwargs = {}
+        if max_bytes is not None:
+            kwargs["max_bytes"] = max_bytes
+        transpose_netcdf(src, ncf_name, variables=variables, **kwargs)
+        manifest.write()
+
+    def create_netcdf_prms_file(self, chunk_size=CHUNK_SIZE, force=False):
+        """
+        Method that writes a netcdf file from PRMS statvar and
+        animation output files of a gsflow model. Files are
+        parsed and written chunk by chunk, the model is not loaded.
+
+        Parameters
+        ----------
+            chunk_size : int
+                number of rows parsed and written at a time
+            force : bool
+                export even if the file is up to date with the
+                output files
+        """
+        prms_files = self._output_files(prms=True)
+        if not prms_files:
+            return
+
+        ncf_name = product_name(self.report_id, self.scenario, "prms")
+        manifest = self._manifest("prms", ncf_name, {})
+        if not force and manifest.is_current():
+            print("{} is up to date, skipping export".format(ncf_name))
+            return
+
+        files = {k: os.path.join(self.model_ws, v)
+                 for k, v in prms_files.items()}
+        export_prms(ncf_name, statvar=files.get("STATVAR"),
+                    animation=files.get("ANI"),
+                    start_datetime=self.start_date + " " + self.start_time,
+                    chunk_size=chunk_size)
+        manifest.write()
+
+    def _species_files(self):
+        """
+        Method to find the concentration files of every species
+        of the BTN package
+        """
+        btn = self.model.get_package("BTN")
+        ncomp = None if btn is None else btn.ncomp
+        files = find_ucn_files(self.model_ws, ncomp)
+        if not files:
+            raise IOError("No MT3D00N.UCN files found in {}"
+                          .format(self.model_ws))
+        return files
+
+    def _output_files(self, prms=False):
+        """
+        Method to get the modflow/mt3d output files, or the PRMS
+        output files, with upper case keys
+        """
+        if self.output_files is None:
+            return {}
+        return {k.upper(): v for k, v in self.output_files.items()
+                if (k.upper() in PRMS_OUTPUT_KEYS) == prms}
+
+    def create_tile_pyramid(self, zooms=(8, 10, 12), kind="out",
+                            variables=None, out_dir=None):
+        """
+        Method that writes a Web-Mercator tile pyramid of every
+        layer and time step of an exported netcdf file
+
+        Parameters
+        ----------
+            zooms : list
+                zoom levels to render
+            kind : str
+                exported file to render, "in" or "out"
+            variables : list
+                optional list of variables to render, default is
+                every (layer, y, x) variable
+            out_dir : str
+                tile directory, default is <ipds>.<scenario>.<kind>.tiles
+
+        Returns
+        -------
+            dict : index of the tile pyramid
+        """
+        ncf_name = product_name(self.report_id, self.scenario, kind)
+        if out_dir is None:
+            out_dir = ".".join([self.report_id, self.scenario, kind,
+                                "tiles"])
 
-            export_dict[key.lower()] = out
+        self._require_profile("grid-only")
+        # the pixel to cell lookup is cached with the grid geometry
+        geometry = GridGeometry.from_modelgrid(self._flow_model.modelgrid,
+                                               cache_dir=self.cache_dir)
+        return export_tile_pyramid(ncf_name, geometry, out_dir, zooms,
+                                   variables=variables)
 
+    @property
+    def _flow_model(self):
+        """
+        Flow model used for grid and output exports
+        """
         if self.version == "gsflow":
-            fp.export.utils.output_helper(ncf_name, self.model.mf, export_dict,
-                                          masked_vals=masked_vals)
-        else:
-            fp.export.utils.output_helper(ncf_name, self.model, export_dict,
-                                          masked_vals=masked_vals)
+            return self.model.mf
+        return self.model
 
     def _read_usgs_model_reference_file(self):
         """
@@ -339,3 +1141,86 @@ class GwWebFlow(object):
 
             if self.start_time is None:
                 self.start_time = "00:00:00"
+
+
+def _load_model(cls, namfile, reference_file, report_id, **kwargs):
+    """
+    Method to create a GwWebFlow object and load its model with the
+    packages of its export profile
+    """
+    gwweb = cls(namfile, reference_file, report_id, **kwargs)
+    gwweb._require_profile(gwweb.profile)
+    return gwweb
+
+
+async def _run_in_executor(func, executor=None, cancel=None):
+    """
+    Method to run a blocking call on an executor from a coroutine.
+    The call is shielded from task cancellation, which sets the
+    cancel event instead and waits for the call to stop, so the
+    partial export is removed before the cancellation is raised
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor, func)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        if cancel is not None:
+            cancel.set()
+            while not future.done():
+                try:
+                    await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    continue
+                except ExportCancelled:
+                    break
+        raise
+
+
+def _call_soon(loop, callback):
+    """
+    Method to wrap a callback so that calls from executor threads
+    are scheduled on the event loop
+    """
+    def wrapper(*args):
+        loop.call_soon_threadsafe(callback, *args)
+    return wrapper
+
+
+def _zones_option(zones):
+    """
+    Method to record a zone array in the manifest options, arrays
+    are recorded by their sha1
+    """
+    if zones is None or isinstance(zones, str):
+        return zones
+    zones = np.ascontiguousarray(zones, dtype=np.int32)
+    return hashlib.sha1(zones.tobytes()).hexdigest()
+
+
+def _zone_files(zones, model_ws):
+    """
+    Method to get the zone file of a zones option, fingerprinted
+    with the files of an export
+    """
+    if isinstance(zones, str) and zones != "layer":
+        return [os.path.join(model_ws, zones)]
+    return []
+
+
+def _namefile_entries(namfile):
+    """
+    Method to read the file types of a modflow name file without
+    loading the model
+
+    Returns
+    -------
+        dict of {upper case file type: file name}
+    """
+    entries = {}
+    with open(namfile) as foo:
+        for line in foo:
+            tokens = line.split("#")[0].split()
+            if len(tokens) > 2:
+                entries.setdefault(tokens[0].upper(), tokens[2])
+    return entries
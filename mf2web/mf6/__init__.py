@@ -0,0 +1,2 @@
+from .mf6 import Mf6GridModel, read_blocks
+from .grb import GrbFile
@@ -0,0 +1,123 @@
+import numpy as np
+
+
+class GrbFile(object):
+    """
+    Reader of MODFLOW 6 binary grid (.grb) files. The grid
+    geometry, idomain, top and botm are read straight from the file
+    that MODFLOW 6 writes for the discretization package, so the
+    model input files do not need to be loaded.
+
+    Parameters
+    ----------
+    filename : str
+        binary grid file name
+
+    Attributes
+    ----------
+    grid_type : str
+        "DIS" or "DISV"
+    data : dict
+        {name: value} of every record of the file, e.g. "NLAY",
+        "DELR", "BOTM" or "IDOMAIN"
+    """
+    _header_length = 50
+    _dtypes = {"INTEGER": np.dtype("<i4"), "DOUBLE": np.dtype("<f8")}
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.data = {}
+        with open(filename, "rb") as foo:
+            self.grid_type = self._read_text(foo).split()[1].upper()
+            self.version = self._read_text(foo).split()[1]
+            ntxt = int(self._read_text(foo).split()[1])
+            lentxt = int(self._read_text(foo).split()[1])
+
+            definitions = [self._read_text(foo, lentxt).split()
+                           for _ in range(ntxt)]
+            for definition in definitions:
+                name, dtype, ndim = definition[0], definition[1], \
+                    int(definition[3])
+                shape = tuple(int(i) for i in definition[4:4 + ndim])
+                self.data[name] = self._read_record(foo, dtype, shape)
+
+        if self.grid_type not in ("DIS", "DISV"):
+            raise NotImplementedError("{} grids are not supported"
+                                      .format(self.grid_type))
+
+    def _read_text(self, foo, length=None):
+        if length is None:
+            length = self._header_length
+        return foo.read(length).decode("ascii", "replace").strip()
+
+    def _read_record(self, foo, dtype, shape):
+        if dtype.upper() == "CHARACTER":
+            return self._read_text(foo, int(np.prod(shape)))
+        dtype = self._dtypes[dtype.upper()]
+        count = int(np.prod(shape)) if shape else 1
+        values = np.fromfile(foo, dtype=dtype, count=count)
+        if not shape:
+            return values[0].item()
+        # dimensions are written in fortran order
+        return values.reshape(shape[::-1])
+
+    @property
+    def nlay(self):
+        return self.data["NLAY"]
+
+    @property
+    def ncpl(self):
+        if self.grid_type == "DIS":
+            return self.data["NROW"] * self.data["NCOL"]
+        return self.data["NCPL"]
+
+    @property
+    def shape(self):
+        """
+        Layered shape of cell arrays
+        """
+        if self.grid_type == "DIS":
+            return self.nlay, self.data["NROW"], self.data["NCOL"]
+        return self.nlay, self.ncpl
+
+    @property
+    def top(self):
+        return self.data["TOP"].reshape(self.shape[1:])
+
+    @property
+    def botm(self):
+        return self.data["BOTM"].reshape(self.shape)
+
+    @property
+    def idomain(self):
+        return self.data["IDOMAIN"].reshape(self.shape)
+
+    @property
+    def origin(self):
+        """
+        (xorigin, yorigin, angrot) of the grid
+        """
+        return (self.data.get("XORIGIN", 0.), self.data.get("YORIGIN", 0.),
+                self.data.get("ANGROT", 0.))
+
+    def cell2d(self):
+        """
+        Method to build flopy vertex grid cell2d and vertex lists
+        of a DISV grid
+
+        Returns
+        -------
+            tuple of (vertices, cell2d) lists
+        """
+        verts = self.data["VERTICES"]
+        vertices = [[ix, x, y] for ix, (x, y) in enumerate(verts)]
+        # iavert and javert are one based, polygons are closed
+        iavert = self.data["IAVERT"] - 1
+        javert = self.data["JAVERT"] - 1
+        cellx, celly = self.data["CELLX"], self.data["CELLY"]
+        cell2d = []
+        for icell in range(self.ncpl):
+            iverts = javert[iavert[icell]:iavert[icell + 1] - 1].tolist()
+            cell2d.append([icell, cellx[icell], celly[icell], len(iverts)]
+                          + iverts)
+        return vertices, cell2d
@@ -0,0 +1,274 @@
+import os
+from collections import OrderedDict
+import numpy as np
+from flopy.mbase import BaseModel
+from flopy.discretization.modeltime import ModelTime
+from flopy.discretization import StructuredGrid, VertexGrid
+from .grb import GrbFile
+
+
+LENUNI = {"unknown": 0, "undefined": 0, "feet": 1, "meters": 2,
+          "centimeters": 3}
+
+
+def read_blocks(filename):
+    """
+    Method to read the BEGIN/END blocks of a MODFLOW 6 input file
+
+    Parameters
+    ----------
+    filename : str
+        MODFLOW 6 input file
+
+    Returns
+    -------
+        OrderedDict of {block name: list of line tokens}
+    """
+    blocks = OrderedDict()
+    current = None
+    with open(filename) as foo:
+        for line in foo:
+            tokens = line.split("#")[0].split("!")[0].split()
+            if not tokens:
+                continue
+            key = tokens[0].upper()
+            if key == "BEGIN":
+                current = tokens[1].upper()
+                blocks.setdefault(current, [])
+            elif key == "END":
+                current = None
+            elif current is not None:
+                blocks[current].append(tokens)
+    return blocks
+
+
+class Mf6GridModel(BaseModel):
+    """
+    Light MODFLOW 6 groundwater flow model object with the grid
+    from the binary grid (.grb) file and the time discretization
+    from the TDIS file. Model input packages are not loaded, the
+    object provides the modelgrid and modeltime needed to export
+    model output.
+
+    Parameters
+    ----------
+    modelname : str
+        name of the model
+    grb : GrbFile
+        binary grid file of the model
+    period_data : dict
+        dictionary of perlen, nstp and tsmult arrays
+    time_units : str
+        TDIS time units
+    model_ws : str
+        path to the simulation workspace
+    lenuni : int or str
+        optional length units, default is the DIS length units
+    verbose : bool
+    """
+    def __init__(self, modelname, grb, period_data, time_units="days",
+                 model_ws=".", lenuni=None, verbose=False, **kwargs):
+
+        super(Mf6GridModel, self).__init__(modelname, "nam", "mf6",
+                                           model_ws,
+                                           structured=grb.grid_type == "DIS",
+                                           verbose=verbose, **kwargs)
+        self.mfnam_packages = {}
+        self.grb = grb
+        self.period_data = period_data
+        self.time_units = time_units
+        self.start_datetime = None
+        self.verbose = verbose
+        # MODFLOW 6 dry and inactive cell values
+        self.hdry = -1e30
+        self.hnoflo = 1e30
+
+        if isinstance(lenuni, str):
+            lenuni = LENUNI.get(lenuni.lower(), 0)
+        self._lenuni = lenuni or 0
+        self._length_multiplier = 1.
+        self._grid = None
+
+    def __repr__(self):
+        return "MODFLOW 6 {} grid, {} layer(s) {} cell(s) per layer, " \
+               "{} stress period(s)".format(self.grb.grid_type,
+                                            self.nlay, self.grb.ncpl,
+                                            self.nper)
+
+    @property
+    def lenuni(self):
+        return self._lenuni
+
+    @property
+    def nlay(self):
+        return self.grb.nlay
+
+    @property
+    def nrow(self):
+        return self.grb.data.get("NROW")
+
+    @property
+    def ncol(self):
+        return self.grb.data.get("NCOL")
+
+    @property
+    def ncpl(self):
+        return self.grb.ncpl
+
+    @property
+    def nper(self):
+        return len(self.period_data["perlen"])
+
+    @property
+    def nrow_ncol_nlay_nper(self):
+        return self.nrow, self.ncol, self.nlay, self.nper
+
+    @property
+    def modeltime(self):
+        self._model_time = ModelTime(self.period_data, self.time_units,
+                                     self.start_datetime)
+        return self._model_time
+
+    @property
+    def modelgrid(self):
+        if self._grid is None:
+            self._grid = self._build_grid()
+        return self._grid
+
+    @modelgrid.setter
+    def modelgrid(self, value):
+        self._grid = value
+
+    def multiply_lengths(self, multiplier):
+        """
+        Method to apply a length conversion factor to the
+        horizontal grid dimensions
+
+        Parameters
+        ----------
+        multiplier : float
+        """
+        self._length_multiplier = float(multiplier)
+        self._grid = None
+
+    def _build_grid(self):
+        """
+        Method to build a flopy model grid from the binary grid file
+        """
+        grb = self.grb
+        mult = self._length_multiplier
+        xoff, yoff, angrot = grb.origin
+        if grb.grid_type == "DIS":
+            return StructuredGrid(grb.data["DELC"] * mult,
+                                  grb.data["DELR"] * mult,
+                                  grb.top, grb.botm, grb.idomain,
+                                  self.lenuni, xoff=xoff, yoff=yoff,
+                                  angrot=angrot)
+
+        vertices, cell2d = grb.cell2d()
+        if mult != 1.:
+            vertices = [[i, x * mult, y * mult] for i, x, y in vertices]
+            cell2d = [[c[0], c[1] * mult, c[2] * mult] + c[3:]
+                      for c in cell2d]
+        return VertexGrid(vertices=vertices, cell2d=cell2d, top=grb.top,
+                          botm=grb.botm, idomain=grb.idomain,
+                          lenuni=self.lenuni, xoff=xoff, yoff=yoff,
+                          angrot=angrot, nlay=grb.nlay, ncpl=grb.ncpl)
+
+    def _set_name(self, value):
+        pass
+
+    def write_name_file(self):
+        pass
+
+    def set_model_units(self, iunit0=None):
+        pass
+
+    def load_results(self, **kwargs):
+        pass
+
+    @staticmethod
+    def load(f, model_ws=".", lenuni=None, verbose=False):
+        """
+        Method to load the grid and time discretization of a
+        MODFLOW 6 groundwater flow model from its binary grid file
+
+        Parameters
+        ----------
+        f : str
+            simulation name file (mfsim.nam) or groundwater flow
+            model name file
+        model_ws : str
+            simulation workspace
+        lenuni : int or str
+            optional length units, overrides the DIS length units
+        verbose : bool
+
+        Returns
+        -------
+            Mf6GridModel
+        """
+        blocks = read_blocks(os.path.join(model_ws, f))
+        if "TIMING" in blocks:
+            sim_blocks = blocks
+            models = [t for t in blocks.get("MODELS", [])
+                      if t[0].upper() == "GWF6"]
+            if not models:
+                raise ValueError("No GWF6 model in {}".format(f))
+            namfile = models[0][1]
+            modelname = models[0][2] if len(models[0]) > 2 else \
+                os.path.splitext(os.path.basename(namfile))[0]
+            blocks = read_blocks(os.path.join(model_ws, namfile))
+        else:
+            sim_blocks = read_blocks(os.path.join(model_ws, "mfsim.nam"))
+            modelname = os.path.splitext(os.path.basename(f))[0]
+
+        tdis = [t[1] for t in sim_blocks.get("TIMING", [])
+                if t[0].upper() == "TDIS6"]
+        if not tdis:
+            raise ValueError("No TDIS6 file in the simulation name file")
+        period_data, time_units = _read_tdis(os.path.join(model_ws, tdis[0]))
+
+        dis = [t[1] for t in blocks.get("PACKAGES", [])
+               if t[0].upper() in ("DIS6", "DISV6", "DISU6")]
+        if not dis:
+            raise ValueError("No discretization package in the "
+                             "model name file")
+        dis_file = os.path.join(model_ws, dis[0])
+        grb_file = dis_file + ".grb"
+        if not os.path.isfile(grb_file):
+            raise IOError("Binary grid file {} not found, it is written "
+                          "by MODFLOW 6 when the model runs"
+                          .format(grb_file))
+
+        if lenuni is None and os.path.isfile(dis_file):
+            for tokens in read_blocks(dis_file).get("OPTIONS", []):
+                if tokens[0].upper() == "LENGTH_UNITS":
+                    lenuni = tokens[1]
+
+        return Mf6GridModel(modelname, GrbFile(grb_file), period_data,
+                            time_units, model_ws=model_ws, lenuni=lenuni,
+                            verbose=verbose)
+
+
+def _read_tdis(filename):
+    """
+    Method to read stress period data and time units from a
+    TDIS file
+    """
+    blocks = read_blocks(filename)
+    time_units = "days"
+    for tokens in blocks.get("OPTIONS", []):
+        if tokens[0].upper() == "TIME_UNITS":
+            time_units = tokens[1].lower()
+
+    rows = blocks.get("PERIODDATA", [])
+    if rows and rows[0][0].upper() == "OPEN/CLOSE":
+        fname = os.path.join(os.path.dirname(filename), rows[0][1])
+        with open(fname) as foo:
+            rows = [line.split() for line in foo if line.strip()]
+
+    data = np.array([[float(i) for i in row[:3]] for row in rows])
+    period_data = {"perlen": data[:, 0], "nstp": data[:, 1].astype(int),
+                   "tsmult": data[:, 2]}
+    return period_data, time_units
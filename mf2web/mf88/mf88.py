@@ -3,6 +3,7 @@ from flopy.discretization.modeltime import ModelTime
 from flopy.discretization import StructuredGrid
 import mf2web
 from ..utils import parse_scriptfile
+from .scratch import ScratchArrays
 import os
 
 
@@ -27,10 +28,15 @@ class Modflow88(BaseModel):
 
     verbose : bool
         is mf88 going to be verbose?
+
+    scratch_dir : str
+        optional directory for out-of-core array storage. When set,
+        the large package arrays are written once to memory-mapped
+        scratch files and paged in on demand
     """
     def __init__(self, modelname="modflowtest", scriptfile_ext=".sh",
                  exe_name="mf88.exe", model_ws=".", verbose=False,
-                 lenuni=0, **kwargs):
+                 lenuni=0, scratch_dir=None, **kwargs):
 
         super(Modflow88, self).__init__(modelname, scriptfile_ext,
                                         exe_name, model_ws, structured=True,
@@ -44,6 +50,12 @@ class Modflow88(BaseModel):
         self.external_path = "."
         self.verbose = verbose
 
+        self.scratch = None
+        if scratch_dir is not None:
+            self.scratch = ScratchArrays(scratch_dir)
+        # read position of unformatted external array units
+        self.binary_offsets = {}
+
         self.hext = 'hds'
         self.cext = 'cbc'
 
@@ -258,7 +270,8 @@ class Modflow88(BaseModel):
 
     @staticmethod
     def load(f, exe_name='mf88.exe', verbose=False,
-             model_ws='.', forgive=True, lenuni=0):
+             model_ws='.', forgive=True, lenuni=0, load_only=None,
+             scratch_dir=None):
         """
         Load an existing MODFLOW model.
 
@@ -277,6 +290,12 @@ class Modflow88(BaseModel):
             useful for debugging. Default False.
         lenuni : int, str
             length unit for model. Not in mf88 but useful for exporting
+        load_only : list of str
+            optional package types to load (e.g. ['BCF']). The BAS
+            package is always loaded. Default None loads every package
+        scratch_dir : str
+            optional directory for out-of-core storage of the package
+            arrays, for models that do not fit in memory
 
 
         Returns
@@ -298,7 +317,7 @@ class Modflow88(BaseModel):
                   .format(modelname, 50 * '-'))
 
         ml = Modflow88(modelname, exe_name=exe_name, verbose=verbose,
-                       model_ws=model_ws)
+                       model_ws=model_ws, scratch_dir=scratch_dir)
 
         # create utility to parse the script file!
         ext_unit_dict = parse_scriptfile(scriptfile_path, model_ws)
@@ -312,8 +331,16 @@ class Modflow88(BaseModel):
         ml.lenuni = lenuni
         iunit = bas.iunit
 
+        if load_only is not None:
+            load_only = [i.upper() for i in load_only]
+
         for pos, unit in enumerate(iunit):
 
+            pak = ml.mfnam_packages.get(pos)
+            if load_only is not None and \
+                    (pak is None or pak.ftype() not in load_only):
+                continue
+
             if unit > 0:
                 if forgive:
                     try:
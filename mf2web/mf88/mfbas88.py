@@ -1,7 +1,8 @@
 from flopy.pakbase import Package
-from flopy.utils import Util3d, Util2d
+from flopy.utils import Util2d
 import numpy as np
 import sys
+from .scratch import as_util3d, load_util3d
 
 
 class Modflow88Bas(Package):
@@ -39,11 +40,11 @@ class Modflow88Bas(Package):
         self.iunit = iunit
         self.iapart = iapart
         self.istrt = istrt
-        self.ibound = Util3d(model, (nlay, nrow, ncol), np.int32, ibound,
-                             name='ibound', locat=self.unit_number[0])
+        self.ibound = as_util3d(model, (nlay, nrow, ncol), np.int32, ibound,
+                                name='ibound', locat=self.unit_number[0])
         self.hnoflo = hnoflo
-        self.shead = Util3d(model, (nlay, nrow, ncol), np.float32, shead,
-                            name='shead', locat=self.unit_number[0])
+        self.shead = as_util3d(model, (nlay, nrow, ncol), np.float32, shead,
+                               name='shead', locat=self.unit_number[0])
 
         self.perlen = Util2d(model, (self.nper,), np.float32, perlen,
                              name="perlen")
@@ -113,13 +114,13 @@ class Modflow88Bas(Package):
         line = f.readline()[0:20]
         iapart, istrt = [int(i) for i in line.split()]
 
-        ibound = Util3d.load(f, model, (nlay, nrow, ncol), np.int32, "ibound",
+        ibound = load_util3d(f, model, (nlay, nrow, ncol), np.int32, "ibound",
                              ext_unit_dict)
 
         hnoflo = float(f.readline()[0:10])
 
 
-        shead = Util3d.load(f, model, (nlay, nrow, ncol), np.float32, "shead",
+        shead = load_util3d(f, model, (nlay, nrow, ncol), np.float32, "shead",
                             ext_unit_dict)
 
         perlen = []
@@ -1,7 +1,9 @@
 from flopy.pakbase import Package
-from flopy.utils import Util3d, Util2d
+from flopy.utils import Util2d
 import numpy as np
 import sys
+from .scratch import as_util3d, zeros
+from .util88 import read_util2d
 
 
 class Modflow88Bcf(Package):
@@ -40,25 +42,25 @@ class Modflow88Bcf(Package):
                            locat=self.unit_number[0])
         self.delc = Util2d(model, (nrow,), np.float32, delc, name='delc',
                            locat=self.unit_number[0])
-        self.sf1 = Util3d(model, (nlay, nrow, ncol), np.float32, sf1,
-                          'Primary Storage Coefficient',
-                          locat=self.unit_number[0])
-        self.tran = Util3d(model, (nlay, nrow, ncol), np.float32, tran,
-                           'Transmissivity', locat=self.unit_number[0])
-        self.hy = Util3d(model, (nlay, nrow, ncol), np.float32, hy,
-                         'Horizontal Hydraulic Conductivity',
-                         locat=self.unit_number[0])
-        self.bot = Util3d(model, (nlay, nrow, ncol), np.float32, bot,
-                           'bot', locat=self.unit_number[0])
-        self.vcont = Util3d(model, (nlay - 1, nrow, ncol), np.float32,
-                                vcont,
-                                'Vertical Conductance',
-                                locat=self.unit_number[0])
-        self.sf2 = Util3d(model, (nlay, nrow, ncol), np.float32, sf2,
-                          'Secondary Storage Coefficient',
-                          locat=self.unit_number[0])
-        self.top = Util3d(model, (nlay, nrow, ncol), np.float32, top,
-                           'top', locat=self.unit_number[0])
+        self.sf1 = as_util3d(model, (nlay, nrow, ncol), np.float32, sf1,
+                             'Primary Storage Coefficient',
+                             locat=self.unit_number[0])
+        self.tran = as_util3d(model, (nlay, nrow, ncol), np.float32, tran,
+                              'Transmissivity', locat=self.unit_number[0])
+        self.hy = as_util3d(model, (nlay, nrow, ncol), np.float32, hy,
+                            'Horizontal Hydraulic Conductivity',
+                            locat=self.unit_number[0])
+        self.bot = as_util3d(model, (nlay, nrow, ncol), np.float32, bot,
+                              'bot', locat=self.unit_number[0])
+        self.vcont = as_util3d(model, (nlay - 1, nrow, ncol), np.float32,
+                                   vcont,
+                                   'Vertical Conductance',
+                                   locat=self.unit_number[0])
+        self.sf2 = as_util3d(model, (nlay, nrow, ncol), np.float32, sf2,
+                             'Secondary Storage Coefficient',
+                             locat=self.unit_number[0])
+        self.top = as_util3d(model, (nlay, nrow, ncol), np.float32, top,
+                              'top', locat=self.unit_number[0])
 
         self.parent.add_package(self)
 
@@ -113,64 +115,64 @@ class Modflow88Bcf(Package):
         for k in range(nlay):
             laycon[k] = int(t[k][1])
 
-        trpy = Util2d.load(f, model, (nlay,), np.float32, 'trpy',
+        trpy = read_util2d(f, model, (nlay,), np.float32, 'trpy',
                            ext_unit_dict)
 
-        delr = Util2d.load(f, model, (ncol,), np.float32, 'delr',
+        delr = read_util2d(f, model, (ncol,), np.float32, 'delr',
                            ext_unit_dict)
 
-        delc = Util2d.load(f, model, (nrow,), np.float32, 'delc',
+        delc = read_util2d(f, model, (nrow,), np.float32, 'delc',
                            ext_unit_dict)
 
-        sf1 = np.zeros((nlay, nrow, ncol))
-        tran = np.zeros((nlay, nrow, ncol))
-        hy = np.zeros((nlay, nrow, ncol))
-        bot = np.zeros((nlay, nrow, ncol))
-        top = np.zeros((nlay, nrow, ncol))
+        sf1 = zeros(model, 'sf1', (nlay, nrow, ncol), np.float32)
+        tran = zeros(model, 'tran', (nlay, nrow, ncol), np.float32)
+        hy = zeros(model, 'hy', (nlay, nrow, ncol), np.float32)
+        bot = zeros(model, 'bot', (nlay, nrow, ncol), np.float32)
+        top = zeros(model, 'top', (nlay, nrow, ncol), np.float32)
 
         if nlay > 1:
-            vcont = np.zeros((nlay - 1, nrow, ncol))
+            vcont = zeros(model, 'vcont', (nlay - 1, nrow, ncol), np.float32)
         else:
-            vcont = np.zeros((nlay, nrow, ncol))
+            vcont = zeros(model, 'vcont', (nlay, nrow, ncol), np.float32)
 
-        sf2 = np.zeros((nlay, nrow, ncol))
+        sf2 = zeros(model, 'sf2', (nlay, nrow, ncol), np.float32)
 
         for k in range(nlay):
 
             # sf1
             if iss != 0:
-                t = Util2d.load(f, model, (nrow, ncol), np.float32, 'sf1',
+                t = read_util2d(f, model, (nrow, ncol), np.float32, 'sf1',
                                 ext_unit_dict)
                 sf1[k] = t.array
 
             # tran or hy and bot
             if ((laycon[k] == 0) or (laycon[k] == 2)):
-                t = Util2d.load(f, model, (nrow, ncol), np.float32, 'tran',
+                t = read_util2d(f, model, (nrow, ncol), np.float32, 'tran',
                                 ext_unit_dict)
                 tran[k] = t.array
             else:
-                t = Util2d.load(f, model, (nrow, ncol), np.float32, 'hy',
+                t = read_util2d(f, model, (nrow, ncol), np.float32, 'hy',
                                 ext_unit_dict)
                 hy[k] = t.array
 
-                t = Util2d.load(f, model, (nrow, ncol), np.float32, 'bot',
+                t = read_util2d(f, model, (nrow, ncol), np.float32, 'bot',
                                 ext_unit_dict)
                 bot[k] = t.array
 
             # vcont
             if k < (nlay - 1):
-                t = Util2d.load(f, model, (nrow, ncol), np.float32, 'vcont',
+                t = read_util2d(f, model, (nrow, ncol), np.float32, 'vcont',
                                 ext_unit_dict)
                 vcont[k] = t.array
 
             # sf2
             if (iss != 0 and ((laycon[k] == 2) or (laycon[k] == 3))):
-                t = Util2d.load(f, model, (nrow, ncol), np.float32, 'sf2',
+                t = read_util2d(f, model, (nrow, ncol), np.float32, 'sf2',
                                 ext_unit_dict)
                 sf2[k] = t.array
 
             if laycon[k] == 2 or laycon[k] == 3:
-                t = Util2d.load(f, model, (nrow, ncol), np.float32, 'top',
+                t = read_util2d(f, model, (nrow, ncol), np.float32, 'top',
                                 ext_unit_dict)
                 top[k] = t.array
 
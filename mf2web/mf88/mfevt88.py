@@ -1,7 +1,8 @@
 from flopy.pakbase import Package
-from flopy.utils import Util2d, Transient2d
+from flopy.utils import Transient2d
 import numpy as np
 import sys
+from .scratch import load_util2d
 
 
 class Modflow88Evt(Package):
@@ -97,26 +98,26 @@ class Modflow88Evt(Package):
             if insurf < 0:
                 surf[per] = surf[per - 1]
             else:
-                surf[per] = Util2d.load(f, model, (nrow, ncol), np.float32, 'surf',
+                surf[per] = load_util2d(f, model, (nrow, ncol), np.float32, 'surf',
                                         ext_unit_dict)
 
             if inevtr < 0:
                 evtr[per] = evtr[per - 1]
             else:
-                evtr[per] = Util2d.load(f, model, (nrow, ncol), np.float32, 'evtr',
+                evtr[per] = load_util2d(f, model, (nrow, ncol), np.float32, 'evtr',
                                         ext_unit_dict)
 
             if inexdp < 0:
                 exdp[per] = exdp[per - 1]
             else:
-                exdp[per] = Util2d.load(f, model, (nrow, ncol), np.float32, 'exdp',
+                exdp[per] = load_util2d(f, model, (nrow, ncol), np.float32, 'exdp',
                                         ext_unit_dict)
 
             if nevtop == 2:
                 if inievt < 0:
                     ievt[per] = ievt[per - 1]
                 else:
-                    ievt[per] = Util2d.load(f, model, (nrow, ncol), np.int32, 'ievt',
+                    ievt[per] = load_util2d(f, model, (nrow, ncol), np.int32, 'ievt',
                                             ext_unit_dict)
 
         return Modflow88Evt(model, nevtop, ievtcb, surf, evtr, exdp, ievt)
@@ -1,7 +1,8 @@
 from flopy.pakbase import Package
-from flopy.utils import Util2d, Transient2d
+from flopy.utils import Transient2d
 import numpy as np
 import sys
+from .scratch import load_util2d
 
 
 class Modflow88Rch(Package):
@@ -86,7 +87,7 @@ class Modflow88Rch(Package):
                 rech[per] = rech[per - 1]
 
             else:
-                arr = Util2d.load(f, model, (nrow, ncol), np.float32, 'rech',
+                arr = load_util2d(f, model, (nrow, ncol), np.float32, 'rech',
                                   ext_unit_dict)
 
                 rech[per] = arr
@@ -96,7 +97,7 @@ class Modflow88Rch(Package):
                     irch[per] = irch[per - 1]
 
                 else:
-                    arr = Util2d.load(f, model, (nrow, ncol), np.int32, "irch",
+                    arr = load_util2d(f, model, (nrow, ncol), np.int32, "irch",
                                       ext_unit_dict)
 
                     irch[per] = arr
@@ -0,0 +1,239 @@
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+from flopy.utils import Util3d
+from flopy.export.netcdf import NetCdf
+from flopy.export.longnames import NC_LONG_NAMES
+try:
+    from flopy.export.unitsformat import NC_UNITS_FORMAT
+except ImportError:
+    NC_UNITS_FORMAT = {}
+from .util88 import read_util2d
+
+
+class ScratchArrays(object):
+    """
+    Store of memory-mapped scratch arrays for out-of-core models.
+    Parsed arrays are written once to scratch files and paged in
+    on demand. The scratch directory is removed with the store.
+
+    Parameters
+    ----------
+    scratch_dir : str
+        directory the scratch files are created in, default is the
+        system temporary directory
+    """
+    def __init__(self, scratch_dir=None):
+        if scratch_dir is not None and not os.path.isdir(scratch_dir):
+            os.makedirs(scratch_dir)
+        self.path = tempfile.mkdtemp(prefix="mf2web_", dir=scratch_dir)
+        self._count = 0
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path,
+                                           True)
+
+    def allocate(self, name, shape, dtype):
+        """
+        Method to create a zero filled scratch array
+
+        Parameters
+        ----------
+        name : str
+            array name, used in the scratch file name
+        shape : tuple
+        dtype : np.dtype
+
+        Returns
+        -------
+            np.memmap
+        """
+        self._count += 1
+        fname = os.path.join(self.path, "{}_{}.dat".format(
+            self._count, "".join(c if c.isalnum() else "_" for c in name)))
+        return np.memmap(fname, dtype=dtype, mode="w+", shape=shape)
+
+    def close(self):
+        """
+        Method to remove the scratch files
+        """
+        self._finalizer()
+
+
+class ScratchUtil3d(Util3d):
+    """
+    Util3d backed by a memory-mapped scratch array. The array
+    property returns a read only view of the scratch array instead
+    of stacking a copy of every layer, so layers are paged in on
+    demand. Netcdf exports are masked and written one layer copy
+    at a time.
+
+    Parameters
+    ----------
+    model : model object
+    shape : tuple
+        (nlay, nrow, ncol)
+    dtype : np.dtype
+    value : np.memmap
+        scratch array
+    name : str
+    locat : int
+    """
+    def __init__(self, model, shape, dtype, value, name, locat=None):
+        super(ScratchUtil3d, self).__init__(model, shape, dtype, value,
+                                            name, locat=locat)
+        self._scratch = value
+        self._writable = False
+
+    @property
+    def array(self):
+        if self._writable:
+            return np.array(self._scratch)
+        a = np.asarray(self._scratch).view()
+        a.flags.writeable = False
+        return a
+
+    def export(self, f, **kwargs):
+        """
+        Override of Util3d.export. flopy masks the exported array in
+        place, netcdf exports mask a copy of one layer at a time and
+        other formats get a writable copy of the array.
+        """
+        if not isinstance(f, NetCdf):
+            self._writable = True
+            try:
+                return super(ScratchUtil3d, self).export(f, **kwargs)
+            finally:
+                self._writable = False
+
+        modelgrid = kwargs.get("modelgrid", self.model.modelgrid)
+        min_valid = kwargs.get("min_valid", -1.0e9)
+        max_valid = kwargs.get("max_valid", 1.0e9)
+        name = self.name[0] if isinstance(self.name, (list, tuple)) \
+            else self.name
+        name = name.replace(" ", "_").lower()
+        inactive = None
+        if modelgrid.idomain is not None and "ibound" not in name:
+            inactive = np.asarray(modelgrid.idomain) == 0
+
+        # the range is needed for the attributes before any layer
+        # is written
+        mn, mx = np.inf, -np.inf
+        for k in range(self.shape[0]):
+            layer = self._export_layer(k, inactive, min_valid, max_valid)
+            if layer.size > 0:
+                mn = min(mn, float(layer.min()))
+                mx = max(mx, float(layer.max()))
+        if mn > mx:
+            raise Exception("error processing {}: all NaNs".format(name))
+
+        units = "unitless"
+        if name in NC_UNITS_FORMAT:
+            units = NC_UNITS_FORMAT[name].format(f.grid_units, f.time_units)
+        attribs = {"long_name": NC_LONG_NAMES.get(name, name),
+                   "coordinates": "layer latitude longitude",
+                   "units": units, "min": mn, "max": mx}
+        floating = np.dtype(self.dtype).kind == "f"
+        precision_str = "f{}".format(np.dtype(self.dtype).itemsize) \
+            if floating else "i4"
+        var = f.create_variable(name, attribs, precision_str=precision_str,
+                                dimensions=f.dimension_names)
+        for k in range(self.shape[0]):
+            a = np.array(self._scratch[k])
+            if floating:
+                invalid = ~np.isfinite(a) | (a <= min_valid) | \
+                    (a >= max_valid)
+                if inactive is not None:
+                    invalid |= inactive[k]
+                a[invalid] = f.fillvalue
+            var[k] = a
+        return f
+
+    def _export_layer(self, k, inactive, min_valid, max_valid):
+        """
+        Method to get the valid values of a layer
+        """
+        a = np.asarray(self._scratch[k])
+        valid = (a > min_valid) & (a < max_valid)
+        if a.dtype.kind == "f":
+            valid &= np.isfinite(a)
+        if inactive is not None:
+            valid &= ~inactive[k]
+        return a[valid]
+
+
+def zeros(model, name, shape, dtype):
+    """
+    Method to allocate a package array, memory-mapped when the
+    model is loaded out of core
+
+    Parameters
+    ----------
+    model : Modflow88
+    name : str
+    shape : tuple
+    dtype : np.dtype
+
+    Returns
+    -------
+        np.ndarray or np.memmap
+    """
+    scratch = getattr(model, "scratch", None)
+    if scratch is None:
+        return np.zeros(shape, dtype=dtype)
+    return scratch.allocate(name, shape, dtype)
+
+
+def as_util3d(model, shape, dtype, value, name, locat=None):
+    """
+    Method to wrap a package array as a Util3d, scratch arrays
+    are wrapped without copying
+
+    Returns
+    -------
+        Util3d or ScratchUtil3d
+    """
+    if isinstance(value, ScratchUtil3d):
+        return value
+    if isinstance(value, np.memmap):
+        return ScratchUtil3d(model, shape, dtype, value, name, locat=locat)
+    return Util3d(model, shape, dtype, value, name, locat=locat)
+
+
+def load_util2d(f, model, shape, dtype, name, ext_unit_dict=None):
+    """
+    Method to load a 2d array, copied to a scratch array when the
+    model is loaded out of core
+
+    Returns
+    -------
+        Util2d or np.memmap
+    """
+    u2d = read_util2d(f, model, shape, dtype, name, ext_unit_dict)
+    if getattr(model, "scratch", None) is None:
+        return u2d
+    a = model.scratch.allocate(name, shape, dtype)
+    a[:] = u2d.array
+    return a
+
+
+def load_util3d(f, model, shape, dtype, name, ext_unit_dict=None):
+    """
+    Method to load a 3d array one layer at a time. Out of core
+    models read each layer into a scratch array.
+
+    Returns
+    -------
+        Util3d or ScratchUtil3d
+    """
+    if getattr(model, "scratch", None) is None:
+        u2ds = [read_util2d(f, model, shape[1:], dtype,
+                            "{} layer {}".format(name, k + 1), ext_unit_dict)
+                for k in range(shape[0])]
+        return Util3d(model, shape, dtype, u2ds, name)
+    a = model.scratch.allocate(name, shape, dtype)
+    for k in range(shape[0]):
+        a[k] = read_util2d(f, model, shape[1:], dtype,
+                           "{} layer {}".format(name, k + 1),
+                           ext_unit_dict).array
+    return ScratchUtil3d(model, shape, dtype, a, name)
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+from flopy.utils import Util2d
+
+
+def read_util2d(f, model, shape, dtype, name, ext_unit_dict=None):
+    """
+    Method to load a modflow-88 array. Arrays on unformatted units
+    (LOCAT < 0) are memory mapped straight from the fortran record of
+    the external file, all other arrays are loaded by flopy's
+    Util2d.load()
+
+    Parameters
+    ----------
+    f : file handle
+        package file positioned at the array control record
+    model : Modflow88
+    shape : tuple
+    dtype : np.dtype
+        np.float32 or np.int32
+    name : str
+    ext_unit_dict : dict
+        unit dictionary from parse_scriptfile()
+
+    Returns
+    -------
+        Util2d
+    """
+    pos = f.tell()
+    line = f.readline()
+    try:
+        locat = int(line[0:10])
+    except ValueError:
+        locat = 0
+
+    if locat >= 0 or ext_unit_dict is None or -locat not in ext_unit_dict:
+        f.seek(pos)
+        return Util2d.load(f, model, shape, dtype, name, ext_unit_dict)
+
+    # (I10, F10.0 or I10, 5A4, I10) control record
+    field = line[10:20].strip()
+    if np.dtype(dtype).kind == "i":
+        cnstnt = int(field or 0)
+    else:
+        cnstnt = float(field or 0.)
+    if cnstnt == 0:
+        cnstnt = 1
+
+    fname = os.path.join(model.model_ws, ext_unit_dict[-locat].filename)
+    a = read_unformatted_record(model, -locat, fname, dtype,
+                                int(np.prod(shape))).reshape(shape)
+    return Util2d(model, shape, dtype, a, name, cnstnt=cnstnt)
+
+
+def read_unformatted_record(model, unit, filename, dtype, count):
+    """
+    Method to memory map the next fortran unformatted record of an
+    external array file. Records are read sequentially, the position
+    of each unit is kept by the model. Records with and without 4 byte
+    length markers are supported.
+
+    Parameters
+    ----------
+    model : Modflow88
+    unit : int
+        fortran unit number of the file
+    filename : str
+        external array file
+    dtype : np.dtype
+    count : int
+        number of values of the record
+
+    Returns
+    -------
+        read only np.memmap
+    """
+    dtype = np.dtype(dtype)
+    nbytes = dtype.itemsize * count
+    offset = model.binary_offsets.get(unit, 0)
+    size = os.path.getsize(filename)
+
+    marker = 0
+    if offset + 4 <= size:
+        marker = int(np.memmap(filename, dtype="<i4", mode="r",
+                               offset=offset, shape=(1,))[0])
+    if marker == nbytes:
+        start, end = offset + 4, offset + nbytes + 8
+    else:
+        start, end = offset, offset + nbytes
+
+    if start + nbytes > size:
+        raise IOError("Unexpected end of file reading {} values from {}"
+                      .format(count, filename))
+    model.binary_offsets[unit] = end
+    return np.memmap(filename, dtype=dtype.newbyteorder("<"), mode="r",
+                     offset=start, shape=(count,))
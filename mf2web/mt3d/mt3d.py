@@ -70,7 +70,8 @@ class Mt3dms(fp.mt3d.Mt3dms):
 
     @staticmethod
     def load(f, version='mt3dms', exe_name='mt3dms.exe', verbose=False,
-             model_ws='.', load_only=None, forgive=False, modflowmodel=None):
+             model_ws='.', load_only=None, forgive=False, modflowmodel=None,
+             ext_unit_dict=None):
         """
         Load an existing model.
 
@@ -103,6 +104,12 @@ class Mt3dms(fp.mt3d.Mt3dms):
             This is a flopy Modflow model object upon which this Mt3dms
             model is based. (the default is None)
 
+        ext_unit_dict : dict
+            Name file entries already parsed by the caller, e.g. by
+            Seawat.load for the modflow side of the same name file.
+            File handles are shared, packages are resolved for MT3D.
+            (the default is None, which means the name file is read)
+
         Returns
         -------
         mt : flopy.mt3d.mt.Mt3dms
@@ -144,19 +151,26 @@ class Mt3dms(fp.mt3d.Mt3dms):
         files_not_loaded = []
 
         # read name file
-        try:
-            # namefile_path = os.path.join(mt.model_ws, mt.namefile)
-            # namefile_path = f
-            namefile_path = os.path.join(mt.model_ws, f)
-            ext_unit_dict = mfreadnam.parsenamefile(namefile_path,
-                                                    mt.mfnam_packages,
-                                                    verbose=verbose)
-        except Exception as e:
-            # print("error loading name file entries from file")
-            # print(str(e))
-            # return None
-            raise Exception(
-                "error loading name file entries from file:\n" + str(e))
+        if ext_unit_dict is not None:
+            ext_unit_dict = {key: mfreadnam.NamData(item.filetype,
+                                                    item.filename,
+                                                    item.filehandle,
+                                                    mt.mfnam_packages)
+                             for key, item in ext_unit_dict.items()}
+        else:
+            try:
+                # namefile_path = os.path.join(mt.model_ws, mt.namefile)
+                # namefile_path = f
+                namefile_path = os.path.join(mt.model_ws, f)
+                ext_unit_dict = mfreadnam.parsenamefile(namefile_path,
+                                                        mt.mfnam_packages,
+                                                        verbose=verbose)
+            except Exception as e:
+                # print("error loading name file entries from file")
+                # print(str(e))
+                # return None
+                raise Exception(
+                    "error loading name file entries from file:\n" + str(e))
 
         if mt.verbose:
             print('\n{}\nExternal unit dictionary:\n{}\n{}\n'.
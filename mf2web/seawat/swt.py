@@ -1,6 +1,8 @@
 import flopy as fp
+from flopy.utils import mfreadnam
 from ..mt3d import Mt3dms
 import os
+import inspect
 
 
 # This class can be removed when Seawat is fixed!
@@ -68,7 +70,7 @@ class Seawat(fp.seawat.Seawat):
 
     @staticmethod
     def load(f, version='seawat', exe_name='swtv4', verbose=False,
-             model_ws='.', load_only=None):
+             model_ws='.', load_only=None, mt_load_only=None):
         """
         Load an existing model.
 
@@ -97,6 +99,11 @@ class Seawat(fp.seawat.Seawat):
             Filetype(s) to load (e.g. ['lpf', 'adv'])
             (default is None, which means that all will be loaded)
 
+        mt_load_only : list of strings
+            MT3DMS filetype(s) to load (e.g. ['btn', 'adv']), BTN is
+            always loaded
+            (default is None, which means that all will be loaded)
+
         Returns
         -------
         m : flopy.seawat.swt.Seawat
@@ -121,12 +128,24 @@ class Seawat(fp.seawat.Seawat):
                     version=version, exe_name=exe_name, model_ws=model_ws,
                     verbose=verbose)
 
-        mf = fp.modflow.Modflow.load(f, version='mf2k', exe_name=None, verbose=verbose,
-                                     model_ws=model_ws, load_only=load_only, forgive=True,
-                                     check=False)
+        # the name file is parsed once, modflow and mt3dms share its
+        # entries and the file handles of external arrays
+        mf = fp.modflow.Modflow(modelname, version='mf2k', exe_name=None,
+                                verbose=verbose, model_ws=model_ws)
+        ext_unit_dict = mfreadnam.parsenamefile(os.path.join(model_ws, f),
+                                                mf.mfnam_packages,
+                                                verbose=verbose)
+        try:
+            _load_modflow(mf, ext_unit_dict, load_only=load_only)
 
-        mt = Mt3dms.load(f, version='mt3dms', exe_name=None, verbose=verbose,
-                         model_ws=model_ws, forgive=True, modflowmodel=mf)
+            mt = Mt3dms.load(f, version='mt3dms', exe_name=None,
+                             verbose=verbose, model_ws=model_ws,
+                             load_only=mt_load_only, forgive=True,
+                             modflowmodel=mf, ext_unit_dict=ext_unit_dict)
+        finally:
+            for item in ext_unit_dict.values():
+                if hasattr(item.filehandle, 'close'):
+                    item.filehandle.close()
 
         # set listing and global files using mf objects
         ms.lst = mf.lst
@@ -149,4 +168,130 @@ class Seawat(fp.seawat.Seawat):
         # potentially drop _mf and _mt not sure why we need them, may cuase issues...
 
         # return model object
-        return ms
\ No newline at end of file
+        return ms
+
+
+def _load_modflow(mf, ext_unit_dict, load_only=None):
+    """
+    Method to load the modflow packages of a SEAWAT name file into
+    a modflow model, from name file entries parsed by the caller.
+    Follows flopy's Modflow.load(), which always reads the name file
+    itself. Entries are not removed from ext_unit_dict, so they can be
+    handed to the mt3dms loader afterwards.
+
+    Parameters
+    ----------
+    mf : flopy.modflow.Modflow
+        empty modflow model
+    ext_unit_dict : dict
+        name file entries from flopy.utils.mfreadnam.parsenamefile()
+    load_only : list of strings
+        Filetype(s) to load (e.g. ['lpf', 'adv'])
+        (default is None, which means that all will be loaded)
+
+    Returns
+    -------
+    mf : flopy.modflow.Modflow
+    """
+    ext_pkg_d = {v.filetype: k for (k, v) in ext_unit_dict.items()}
+
+    # reset unit numbers of the listing and global files
+    if 'GLOBAL' in ext_pkg_d:
+        unitnumber = ext_pkg_d['GLOBAL']
+        mf.glo.unit_number = [unitnumber]
+        mf.glo.file_name = [os.path.basename(
+            ext_unit_dict[unitnumber].filename)]
+    if 'LIST' in ext_pkg_d:
+        unitnumber = ext_pkg_d['LIST']
+        mf.lst.unit_number = [unitnumber]
+        mf.lst.file_name = [os.path.basename(
+            ext_unit_dict[unitnumber].filename)]
+
+    # look for the free format flag in bas6
+    bas_key = ext_pkg_d.get('BAS6')
+    if bas_key is not None:
+        with open(ext_unit_dict[bas_key].filename) as foo:
+            line = foo.readline()
+            while line.startswith("#"):
+                line = foo.readline()
+        if "FREE" in line.upper():
+            mf.free_format_input = True
+
+    # load dis
+    dis_key = ext_pkg_d.get('DIS')
+    if dis_key is None:
+        raise KeyError('discretization entry not found in nam file')
+    _load_package(ext_unit_dict[dis_key], mf, ext_unit_dict)
+    loaded = [dis_key]
+
+    if load_only is None:
+        load_only = list(ext_pkg_d.keys())
+    else:
+        if not isinstance(load_only, list):
+            load_only = [load_only]
+        load_only = [filetype.upper() for filetype in load_only]
+        not_found = [filetype for filetype in load_only
+                     if filetype not in ext_pkg_d]
+        if not_found:
+            raise KeyError("the following load_only entries were not "
+                           "found in the ext_unit_dict: " +
+                           ','.join(not_found))
+
+    # zone, mult and pval arrays are used by the other packages
+    if 'PVAL' in ext_pkg_d:
+        mf.mfpar.set_pval(mf, ext_unit_dict)
+        loaded.append(ext_pkg_d['PVAL'])
+    if 'ZONE' in ext_pkg_d:
+        mf.mfpar.set_zone(mf, ext_unit_dict)
+        loaded.append(ext_pkg_d['ZONE'])
+    if 'MULT' in ext_pkg_d:
+        mf.mfpar.set_mult(mf, ext_unit_dict)
+        loaded.append(ext_pkg_d['MULT'])
+
+    for key, item in ext_unit_dict.items():
+        if key in loaded:
+            continue
+        if item.package is not None:
+            if item.filetype in load_only:
+                try:
+                    _load_package(item, mf, ext_unit_dict)
+                except Exception as e:
+                    mf.load_fail = True
+                    if mf.verbose:
+                        print('   {:4s} package load...failed\n   {!s}'
+                              .format(item.filetype, e))
+            elif mf.verbose:
+                print('   {:4s} package load...skipped'
+                      .format(item.filetype))
+        elif "data" in item.filetype.lower():
+            if key not in mf.pop_key_list and key not in mf.external_units:
+                mf.external_fnames.append(item.filename)
+                mf.external_units.append(key)
+                mf.external_binflag.append("binary"
+                                           in item.filetype.lower())
+                mf.external_output.append(False)
+
+    # remove binary output units and external files that are now
+    # internal to a package
+    for key in mf.pop_key_list:
+        try:
+            mf.remove_external(unit=key)
+        except Exception:
+            pass
+
+    return mf
+
+
+def _load_package(item, model, ext_unit_dict):
+    """
+    Method to load a package from its name file entry
+    """
+    if "check" in inspect.signature(item.package.load).parameters:
+        pck = item.package.load(item.filename, model,
+                                ext_unit_dict=ext_unit_dict, check=False)
+    else:
+        pck = item.package.load(item.filename, model,
+                                ext_unit_dict=ext_unit_dict)
+    if model.verbose:
+        print('   {:4s} package load...success'.format(pck.name[0]))
+    return pck
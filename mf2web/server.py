@@ -0,0 +1,531 @@
+"""
+Local slice server for exported mf2web products.
+
+File handles of the <ipds>.<scenario>.<kind> netcdf files and zarr stores
+are kept open for the life of the server, and decoded (variable, time,
+layer) slabs are held in a size-bounded LRU cache, so repeated requests
+from the web front end do not reopen or decompress the file. Slices are
+returned as little-endian float32 arrays.
+
+Endpoints
+---------
+/files
+    json list of the products in the served directory
+/info?file=<name>
+    json description of the variables, shapes and times of a product
+/slice?file=<name>&variable=<var>&time=<index>&layer=<index>
+    binary slice, an optional window=<row0>,<row1>,<col0>,<col1>
+    parameter returns a sub-window. The shape is returned in the
+    X-Shape header and the fill value in the X-Fill-Value header
+/timeseries?file=<name>&variable=<var>&layer=<index>&row=<index>&col=<index>
+    binary time series of a cell, from the cell-major
+    <ipds>.<scenario>.ts.nc product
+/stats
+    json cache hit rate, cache size and request latency
+"""
+import os
+import json
+import time
+import threading
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from .export.gather import ActiveCellIndex, GATHERED_DIMENSION
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+try:
+    import zarr
+except ImportError:
+    zarr = None
+
+
+PRODUCT_EXTENSIONS = (".nc", ".zarr", ".zarr.zip")
+
+
+class SliceCache(object):
+    """
+    Thread safe, size-bounded least recently used cache of
+    decoded arrays
+
+    Parameters
+    ----------
+    max_bytes : int
+        maximum size of the cached arrays
+    """
+    def __init__(self, max_bytes=256 * 2 ** 20):
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, loader):
+        """
+        Method to get a cached array, loading and caching
+        it on a miss
+
+        Parameters
+        ----------
+        key : tuple
+            cache key
+        loader : callable
+            method that returns the array of key
+
+        Returns
+        -------
+            tuple of (np.ndarray, bool hit)
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key], True
+            self.misses += 1
+
+        array = loader()
+        with self._lock:
+            if key not in self._entries and array.nbytes <= self.max_bytes:
+                self._entries[key] = array
+                self.nbytes += array.nbytes
+                while self.nbytes > self.max_bytes:
+                    _, old = self._entries.popitem(last=False)
+                    self.nbytes -= old.nbytes
+        return array, False
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.
+        return self.hits / float(total)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hit_rate, "entries": len(self),
+                "nbytes": self.nbytes, "max_bytes": self.max_bytes}
+
+
+class Product(object):
+    """
+    Open netcdf file or zarr store of an exported product
+
+    Parameters
+    ----------
+    path : str
+        netcdf file, zarr directory store or zarr zip store
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._store = None
+        if path.endswith(".nc"):
+            if netCDF4 is None:
+                raise ImportError("netCDF4 must be installed to serve "
+                                  "netcdf files")
+            self.ds = netCDF4.Dataset(path)
+            self.ds.set_auto_mask(False)
+            self.variables = self.ds.variables
+        else:
+            if zarr is None:
+                raise ImportError("zarr must be installed to serve "
+                                  "zarr stores")
+            if path.endswith(".zip"):
+                self._store = zarr.ZipStore(path, mode="r")
+                self.ds = zarr.open_group(self._store, mode="r")
+            else:
+                self.ds = zarr.open_group(path, mode="r")
+            self.variables = {k: v for k, v in self.ds.arrays()}
+
+        self.gather = None
+        if GATHERED_DIMENSION in self.variables:
+            self.gather = ActiveCellIndex.from_arrays(
+                self.grid_shape, self.read("crop_y"), self.read("crop_x"),
+                self.read(GATHERED_DIMENSION))
+
+    def dimensions(self, name):
+        var = self.variables[name]
+        if hasattr(var, "dimensions"):
+            return tuple(var.dimensions)
+        return tuple(var.attrs.get("_ARRAY_DIMENSIONS", ()))
+
+    def attributes(self, name):
+        var = self.variables[name]
+        if hasattr(var, "ncattrs"):
+            return {k: var.getncattr(k) for k in var.ncattrs()}
+        return dict(var.attrs)
+
+    def fill_value(self, name):
+        attrs = self.attributes(name)
+        fill = attrs.get("_FillValue", getattr(self.variables[name],
+                                               "fill_value", None))
+        if fill is None:
+            return float("nan")
+        return float(fill)
+
+    @property
+    def grid_shape(self):
+        sizes = {}
+        for name in self.variables:
+            for dim, size in zip(self.dimensions(name),
+                                 self.variables[name].shape):
+                sizes[dim] = size
+        return tuple(sizes.get(d, 0) for d in ("layer", "y", "x"))
+
+    @property
+    def times(self):
+        if "time" not in self.variables:
+            return []
+        return np.asarray(self.read("time")).tolist()
+
+    def read(self, name, index=Ellipsis):
+        """
+        Method to read (part of) a variable
+
+        Parameters
+        ----------
+        name : str
+            variable name
+        index : tuple
+            numpy style index
+
+        Returns
+        -------
+            np.ndarray
+        """
+        # netCDF4 handles are not thread safe
+        with self._lock:
+            return np.asarray(self.variables[name][index])
+
+    def slab(self, name, itime, layer):
+        """
+        Method to decode a single (y, x) layer of a variable
+
+        Parameters
+        ----------
+        name : str
+            variable name
+        itime : int
+            time index, ignored for variables without a time dimension
+        layer : int
+            zero based layer
+
+        Returns
+        -------
+            (nrow, ncol) np.ndarray of float32
+        """
+        dims = self.dimensions(name)
+        index = ()
+        if dims and dims[0] == "time":
+            index = (itime,)
+
+        if dims and dims[-1] == GATHERED_DIMENSION:
+            values = self.read(name, index or Ellipsis)
+            fill = self.fill_value(name)
+            array = self.gather.scatter(values, fill)[layer]
+        elif tuple(dims[-3:]) == ("layer", "y", "x"):
+            array = self.read(name, index + (layer,))
+        elif tuple(dims[-2:]) == ("y", "x"):
+            array = self.read(name, index or Ellipsis)
+        else:
+            raise ValueError("{} is not a gridded variable".format(name))
+        return np.ascontiguousarray(array, dtype="<f4")
+
+    def timeseries(self, name, layer, row, col):
+        """
+        Method to read the time series of a cell from a cell-major
+        variable, a single contiguous read
+
+        Parameters
+        ----------
+        name : str
+            variable name
+        layer : int
+        row : int
+        col : int
+            zero based model cell
+
+        Returns
+        -------
+            (ntime,) np.ndarray of float32
+        """
+        dims = self.dimensions(name)
+        if not dims or dims[-1] != "time":
+            raise ValueError("{} is not a cell-major variable".format(name))
+
+        if dims[:-1] == (GATHERED_DIMENSION,):
+            cell = self.gather.cell(layer, row, col)
+            if cell is None:
+                # inactive cells are not stored
+                return np.full(self.variables[name].shape[-1],
+                               self.fill_value(name), dtype="<f4")
+            array = self.read(name, (cell,))
+        elif dims[:-1] == ("layer", "y", "x"):
+            array = self.read(name, (layer, row, col))
+        else:
+            raise ValueError("{} is not a gridded variable".format(name))
+        return np.ascontiguousarray(array, dtype="<f4")
+
+    def info(self):
+        """
+        Method to describe the variables of the product
+
+        Returns
+        -------
+            dict
+        """
+        variables = {}
+        for name in self.variables:
+            attrs = self.attributes(name)
+            variables[name] = {
+                "dimensions": list(self.dimensions(name)),
+                "shape": list(self.variables[name].shape),
+                "units": str(attrs.get("units", "")),
+                "min": _float(attrs.get("min")),
+                "max": _float(attrs.get("max"))}
+        return {"grid_shape": list(self.grid_shape), "times": self.times,
+                "gathered": self.gather is not None,
+                "variables": variables}
+
+    def close(self):
+        if self._store is not None:
+            self._store.close()
+        elif hasattr(self.ds, "close"):
+            self.ds.close()
+
+
+class SliceServer(ThreadingHTTPServer):
+    """
+    Local http server of (variable, time, layer) slices of the
+    exported products in a directory
+
+    Parameters
+    ----------
+    directory : str
+        directory of the exported products
+    host : str
+        host name, default only serves local requests
+    port : int
+        port number
+    cache_bytes : int
+        maximum size of the slice cache
+    """
+    daemon_threads = True
+
+    def __init__(self, directory=".", host="127.0.0.1", port=8085,
+                 cache_bytes=256 * 2 ** 20):
+        ThreadingHTTPServer.__init__(self, (host, port), SliceHandler)
+        self.directory = os.path.abspath(directory)
+        self.cache = SliceCache(cache_bytes)
+        self.products = {}
+        self.requests = 0
+        self.latency = deque(maxlen=1000)
+        self._lock = threading.Lock()
+
+    def product(self, name):
+        """
+        Method to get an open product, products are opened on the
+        first request and kept open
+
+        Parameters
+        ----------
+        name : str
+            product file name relative to the served directory
+
+        Returns
+        -------
+            Product
+        """
+        with self._lock:
+            if name not in self.products:
+                path = os.path.abspath(os.path.join(self.directory, name))
+                if os.path.dirname(path) != self.directory or \
+                        not name.endswith(PRODUCT_EXTENSIONS) or \
+                        not os.path.exists(path):
+                    raise KeyError(name)
+                self.products[name] = Product(path)
+            return self.products[name]
+
+    def list_products(self):
+        return sorted(f for f in os.listdir(self.directory)
+                      if f.endswith(PRODUCT_EXTENSIONS))
+
+    def get_slice(self, name, variable, itime, layer, window=None):
+        """
+        Method to get a slice through the cache
+
+        Parameters
+        ----------
+        name : str
+            product file name
+        variable : str
+            variable name
+        itime : int
+            time index
+        layer : int
+            zero based layer
+        window : tuple
+            optional (row0, row1, col0, col1) sub-window
+
+        Returns
+        -------
+            tuple of (np.ndarray, fill value, bool cache hit)
+        """
+        product = self.product(name)
+        if variable not in product.variables:
+            raise KeyError(variable)
+
+        key = (name, variable, itime, layer)
+        array, hit = self.cache.get(
+            key, lambda: product.slab(variable, itime, layer))
+        if window is not None:
+            row0, row1, col0, col1 = window
+            array = array[row0:row1, col0:col1]
+        return array, product.fill_value(variable), hit
+
+    def record_latency(self, seconds):
+        with self._lock:
+            self.requests += 1
+            self.latency.append(seconds)
+
+    def stats(self):
+        """
+        Method to get cache and request latency statistics
+
+        Returns
+        -------
+            dict
+        """
+        with self._lock:
+            latency = np.array(self.latency) * 1000.
+            requests = self.requests
+        stats = {"requests": requests, "cache": self.cache.stats()}
+        if latency.size > 0:
+            stats["latency_ms"] = {
+                "mean": float(latency.mean()),
+                "p50": float(np.percentile(latency, 50)),
+                "p95": float(np.percentile(latency, 95)),
+                "max": float(latency.max())}
+        return stats
+
+    def server_close(self):
+        ThreadingHTTPServer.server_close(self)
+        for product in self.products.values():
+            product.close()
+        self.products = {}
+
+
+class SliceHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of the SliceServer endpoints
+    """
+    def do_GET(self):
+        t0 = time.perf_counter()
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == "/slice":
+                self._send_slice(query, t0)
+            elif url.path == "/timeseries":
+                self._send_timeseries(query, t0)
+            elif url.path == "/info":
+                self._send_json(self.server.product(query["file"]).info())
+            elif url.path == "/files":
+                self._send_json(self.server.list_products())
+            elif url.path == "/stats":
+                self._send_json(self.server.stats())
+            else:
+                self.send_error(404, "Unknown endpoint")
+        except KeyError as e:
+            self.send_error(404, "Not found: {}".format(e))
+        except (ValueError, IndexError) as e:
+            self.send_error(400, str(e))
+        finally:
+            self.server.record_latency(time.perf_counter() - t0)
+
+    def _send_slice(self, query, t0):
+        window = None
+        if "window" in query:
+            window = tuple(int(i) for i in query["window"].split(","))
+            if len(window) != 4:
+                raise ValueError("window must be row0,row1,col0,col1")
+
+        array, fill, hit = self.server.get_slice(
+            query["file"], query["variable"], int(query.get("time", 0)),
+            int(query.get("layer", 0)), window)
+        self._send_array(array, fill, t0, "hit" if hit else "miss")
+
+    def _send_timeseries(self, query, t0):
+        product = self.server.product(query["file"])
+        variable = query["variable"]
+        if variable not in product.variables:
+            raise KeyError(variable)
+        array = product.timeseries(variable, int(query.get("layer", 0)),
+                                   int(query["row"]), int(query["col"]))
+        self._send_array(array, product.fill_value(variable), t0)
+
+    def _send_array(self, array, fill, t0, cache=None):
+        body = array.tobytes()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Shape", ",".join(str(i) for i in array.shape))
+        self.send_header("X-Dtype", "<f4")
+        self.send_header("X-Fill-Value", repr(fill))
+        if cache is not None:
+            self.send_header("X-Cache", cache)
+        self.send_header("X-Elapsed-Ms", "{:.3f}".format(
+            (time.perf_counter() - t0) * 1000.))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory=".", host="127.0.0.1", port=8085,
+          cache_bytes=256 * 2 ** 20):
+    """
+    Method to serve the exported products of a directory
+    until interrupted
+
+    Parameters
+    ----------
+    directory : str
+        directory of the exported products
+    host : str
+        host name
+    port : int
+        port number
+    cache_bytes : int
+        maximum size of the slice cache
+    """
+    server = SliceServer(directory, host, port, cache_bytes)
+    print("Serving {} on http://{}:{}".format(server.directory, host, port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _float(value):
+    if value is None:
+        return None
+    return float(np.asarray(value).ravel()[0])
@@ -1,2 +1,10 @@
-from . import fix_output
-from .read_utils import mflist_reader, parse_scriptfile
\ No newline at end of file
+from ..lazy import lazy_attributes
+
+# read_utils is only needed by modflow-88 models, readers are imported
+# on first use
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {"mflist_reader": ".read_utils", "parse_scriptfile": ".read_utils",
+     "SelectiveCellBudgetFile": ".budgetfile",
+     "FormattedHeadIndex": ".headfile", "binary_head_cache": ".headfile"},
+    ("fix_output",))
@@ -0,0 +1,329 @@
+import os
+import numpy as np
+
+
+HEADER1 = np.dtype([("kstp", "<i4"), ("kper", "<i4"), ("text", "S16"),
+                    ("ncol", "<i4"), ("nrow", "<i4"), ("nlay", "<i4")])
+
+
+def kstpkper_totims(modeltime):
+    """
+    Method to build a lookup of simulation times for each time step.
+    Non-compact budget records do not store totim, so the lookup is
+    used to place them on the time axis of the export.
+
+    Parameters
+    ----------
+    modeltime : flopy ModelTime object
+
+    Returns
+    -------
+        dict of {(kstp, kper): totim} with one based kstp and kper
+    """
+    lookup = {}
+    t0 = 0.
+    for kper, (perlen, nstp, tsmult) in enumerate(zip(modeltime.perlen,
+                                                      modeltime.nstp,
+                                                      modeltime.tsmult)):
+        nstp = int(nstp)
+        if tsmult == 1:
+            dt = perlen / float(nstp)
+        else:
+            dt = perlen * (tsmult - 1.) / (tsmult ** nstp - 1.)
+        t = t0
+        for kstp in range(nstp):
+            t += dt * tsmult ** kstp
+            # budget and head files store totim in single precision
+            lookup[(kstp + 1, kper + 1)] = float(np.float32(t))
+        t0 += perlen
+    return lookup
+
+
+class SelectiveCellBudgetFile(object):
+    """
+    Cell budget file reader that only indexes the budget terms
+    that are requested. Headers are read for every record, but
+    the data of records with other terms is skipped by seeking
+    past it.
+
+    Parameters
+    ----------
+    filename : str
+        binary cell budget file
+    budget_terms : list
+        budget record texts to read (e.g. ["STORAGE", "WELLS"]).
+        Matching ignores case and surrounding whitespace. None
+        reads every term
+    precision : str
+        "single", "double" or "auto"
+    totim_lookup : dict
+        optional {(kstp, kper): totim} lookup for records that
+        do not store totim (non-compact budgets)
+
+    Notes
+    -----
+    Supports full 3d records and compact records written with
+    imeth 0 through 6.
+
+    """
+    def __init__(self, filename, budget_terms=None, precision="auto",
+                 totim_lookup=None):
+        self.filename = filename
+        self.file = open(filename, "rb")
+        self.totalbytes = os.path.getsize(filename)
+        self.totim_lookup = totim_lookup
+
+        self.budget_terms = None
+        if budget_terms is not None:
+            self.budget_terms = [_clean(t) for t in budget_terms]
+
+        if precision == "auto":
+            precision = self._detect_precision()
+        self.precision = precision
+        self.realtype = np.float32 if precision == "single" else np.float64
+        self.header2 = np.dtype([("imeth", "<i4"), ("delt", self.realtype),
+                                 ("pertim", self.realtype),
+                                 ("totim", self.realtype)])
+
+        self._records = []
+        # {(totim, term): records} and {(kstp, kper, term): records}
+        self._by_totim = {}
+        self._by_kstpkper = {}
+        self._build_index()
+
+    @property
+    def recordarray(self):
+        dtype = np.dtype([("kstp", "<i4"), ("kper", "<i4"), ("text", "S16"),
+                          ("ncol", "<i4"), ("nrow", "<i4"), ("nlay", "<i4"),
+                          ("imeth", "<i4"), ("totim", np.float64)])
+        return np.array([tuple(r[k] for k in dtype.names)
+                         for r in self._records], dtype=dtype)
+
+    @property
+    def textlist(self):
+        texts = []
+        for record in self._records:
+            if record["text"] not in texts:
+                texts.append(record["text"])
+        return texts
+
+    @property
+    def times(self):
+        return sorted(set(r["totim"] for r in self._records))
+
+    def get_data(self, totim=None, kstpkper=None, text=None, full3D=True):
+        """
+        Method to get budget records
+
+        Parameters
+        ----------
+        totim : float
+            simulation time of the records
+        kstpkper : tuple
+            zero based (kstp, kper) of the records
+        text : str or bytes
+            budget term
+        full3D : bool
+            return list style records as (nlay, nrow, ncol) masked
+            arrays. If False list style records are returned as
+            (node, q) tuples
+
+        Returns
+        -------
+            list of np.ndarray
+        """
+        records = self._records
+        if text is not None:
+            text = _clean(text)
+            if totim is not None:
+                records = self._by_totim.get((totim, text), [])
+            elif kstpkper is not None:
+                kstp, kper = kstpkper
+                records = self._by_kstpkper.get((kstp + 1, kper + 1, text),
+                                                [])
+
+        data = []
+        for record in records:
+            if text is not None and record["term"] != text:
+                continue
+            if totim is not None and record["totim"] != totim:
+                continue
+            if kstpkper is not None and \
+                    (record["kstp"] - 1, record["kper"] - 1) != \
+                    tuple(kstpkper):
+                continue
+            data.append(self._read_record(record, full3D))
+        return data
+
+    def close(self):
+        self.file.close()
+
+    def _build_index(self):
+        """
+        Method to read record headers, keeping the data offsets of
+        requested terms and seeking past all other record data
+        """
+        f = self.file
+        f.seek(0)
+        while f.tell() < self.totalbytes:
+            record = self._read_header()
+            nbytes = self._payload_size(record)
+            term = _clean(record["text"])
+            if self.budget_terms is None or term in self.budget_terms:
+                record["term"] = term
+                record["offset"] = f.tell()
+                self._records.append(record)
+                self._by_totim.setdefault(
+                    (record["totim"], term), []).append(record)
+                self._by_kstpkper.setdefault(
+                    (record["kstp"], record["kper"], term), []).append(record)
+            f.seek(nbytes, 1)
+
+        if self.budget_terms is not None:
+            found = set(r["term"] for r in self._records)
+            for term in self.budget_terms:
+                if term not in found:
+                    print("Warning, budget term not found in {}: {}"
+                          .format(os.path.basename(self.filename), term))
+
+    def _read_header(self):
+        """
+        Method to read a record header at the current file position
+        """
+        f = self.file
+        h1 = np.fromfile(f, HEADER1, 1)[0]
+        record = {"kstp": int(h1["kstp"]), "kper": int(h1["kper"]),
+                  "text": h1["text"], "ncol": int(h1["ncol"]),
+                  "nrow": int(h1["nrow"]), "nlay": int(h1["nlay"]),
+                  "imeth": 0, "totim": -1., "naux": 0}
+
+        if record["nlay"] < 0:
+            h2 = np.fromfile(f, self.header2, 1)[0]
+            record["imeth"] = int(h2["imeth"])
+            record["totim"] = float(h2["totim"])
+            if record["imeth"] == 5:
+                nauxp1 = int(np.fromfile(f, "<i4", 1)[0])
+                record["naux"] = nauxp1 - 1
+                f.seek(16 * record["naux"], 1)
+            elif record["imeth"] == 6:
+                # model and package names of both ids
+                f.seek(4 * 16, 1)
+                ndat = int(np.fromfile(f, "<i4", 1)[0])
+                record["naux"] = ndat - 1
+                f.seek(16 * record["naux"], 1)
+            if record["imeth"] in (2, 5, 6):
+                record["nlist"] = int(np.fromfile(f, "<i4", 1)[0])
+
+        if record["totim"] <= 0 and self.totim_lookup is not None:
+            record["totim"] = self.totim_lookup.get(
+                (record["kstp"], record["kper"]), -1.)
+        return record
+
+    def _payload_size(self, record):
+        """
+        Method to calculate the number of data bytes of a record
+        """
+        rsize = np.dtype(self.realtype).itemsize
+        ncol, nrow, nlay = record["ncol"], record["nrow"], abs(record["nlay"])
+        imeth = record["imeth"]
+        if imeth in (0, 1):
+            return ncol * nrow * nlay * rsize
+        elif imeth == 2:
+            return record["nlist"] * (4 + rsize)
+        elif imeth == 3:
+            return ncol * nrow * (4 + rsize)
+        elif imeth == 4:
+            return ncol * nrow * rsize
+        elif imeth == 5:
+            return record["nlist"] * (4 + rsize * (record["naux"] + 1))
+        elif imeth == 6:
+            return record["nlist"] * (8 + rsize * (record["naux"] + 1))
+        raise ValueError("Unsupported budget imeth: {}".format(imeth))
+
+    def _read_record(self, record, full3D=True):
+        """
+        Method to read the data of an indexed record
+        """
+        f = self.file
+        f.seek(record["offset"])
+        ncol, nrow, nlay = record["ncol"], record["nrow"], abs(record["nlay"])
+        shape = (nlay, nrow, ncol)
+        imeth = record["imeth"]
+
+        if imeth in (0, 1):
+            return np.fromfile(f, self.realtype,
+                               ncol * nrow * nlay).reshape(shape)
+
+        elif imeth == 3:
+            ilay = np.fromfile(f, "<i4", nrow * ncol)
+            q = np.fromfile(f, self.realtype, nrow * ncol)
+            a = np.zeros(shape, dtype=self.realtype)
+            a.reshape(nlay, -1)[ilay - 1, np.arange(nrow * ncol)] = q
+            return a
+
+        elif imeth == 4:
+            a = np.zeros(shape, dtype=self.realtype)
+            a[0] = np.fromfile(f, self.realtype,
+                               nrow * ncol).reshape(nrow, ncol)
+            return a
+
+        # list style records
+        nval = record["naux"] + 1
+        if imeth == 6:
+            dtype = np.dtype([("node", "<i4"), ("node2", "<i4"),
+                              ("q", self.realtype, (nval,))])
+        else:
+            dtype = np.dtype([("node", "<i4"),
+                              ("q", self.realtype, (nval,))])
+        data = np.fromfile(f, dtype, record["nlist"])
+        node = data["node"] - 1
+        q = data["q"][:, 0]
+        if not full3D:
+            return node, q
+
+        ncells = nlay * nrow * ncol
+        a = np.bincount(node, weights=q, minlength=ncells)
+        mask = np.bincount(node, minlength=ncells) == 0
+        return np.ma.masked_array(a.reshape(shape), mask=mask.reshape(shape))
+
+    def _detect_precision(self):
+        """
+        Method to detect the real precision by checking that the
+        first record is followed by a valid header or the end of file
+        """
+        for precision in ("single", "double"):
+            self.realtype = np.float32 if precision == "single" \
+                else np.float64
+            self.header2 = np.dtype([("imeth", "<i4"),
+                                     ("delt", self.realtype),
+                                     ("pertim", self.realtype),
+                                     ("totim", self.realtype)])
+            try:
+                self.file.seek(0)
+                record = self._read_header()
+                if record["imeth"] not in range(7):
+                    continue
+                self.file.seek(self._payload_size(record), 1)
+                pos = self.file.tell()
+                if pos == self.totalbytes:
+                    return precision
+                elif pos + HEADER1.itemsize > self.totalbytes:
+                    continue
+                h1 = np.fromfile(self.file, HEADER1, 1)[0]
+                if h1["kstp"] > 0 and h1["kper"] > 0 and \
+                        h1["ncol"] > 0 and h1["nrow"] > 0 and \
+                        all(32 <= c < 127 for c in bytearray(h1["text"])):
+                    return precision
+            except (IndexError, ValueError):
+                continue
+        raise ValueError("Could not determine the precision of {}"
+                         .format(self.filename))
+
+
+def _clean(text):
+    """
+    Method to normalize budget text for matching
+    """
+    if isinstance(text, bytes):
+        text = text.decode()
+    return text.strip().upper()
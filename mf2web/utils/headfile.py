@@ -0,0 +1,257 @@
+import os
+import re
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+# header of a binary head record, followed by ncol * nrow float32 values
+BINARY_HEADER = np.dtype([("kstp", "<i4"), ("kper", "<i4"),
+                          ("pertim", "<f4"), ("totim", "<f4"),
+                          ("text", "S16"), ("ncol", "<i4"), ("nrow", "<i4"),
+                          ("ilay", "<i4")])
+
+# kstp kper pertim totim text ncol nrow ilay (format)
+FORMATTED_HEADER = re.compile(
+    rb"[ \t]*(\d+)[ \t]+(\d+)[ \t]+(\S+)[ \t]+(\S+)[ \t]+(\S+)[ \t]+"
+    rb"(\d+)[ \t]+(\d+)[ \t]+(-?\d+)[ \t]*(\([^\r\n]*\))?[ \t]*\r?$",
+    re.MULTILINE)
+
+# field width of a fortran format, e.g. (10(1X1PE13.5)) or (20F10.3)
+_FORMAT_FIELD = re.compile(r"(?:(\d*)X,?)?(?:\d*P)?[EFGD](\d+)",
+                           re.IGNORECASE)
+
+CACHE_SUFFIX = ".mf2web.hds"
+
+
+class FormattedHeadIndex(object):
+    """
+    Index of the layer records of a formatted (ascii) head file.
+    The file is memory mapped and record headers are found by
+    jumping over array blocks, which have the same length for every
+    record of the same layer shape. The record search falls back to a
+    regular expression scan when the layout changes.
+
+    Parameters
+    ----------
+    filename : str
+        formatted head file
+
+    Attributes
+    ----------
+    records : list
+        list of dicts with kstp, kper, pertim, totim, text, ncol,
+        nrow, ilay, fmt and the start and stop offsets of the array
+        block
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.records = []
+        with open(filename, "rb") as foo:
+            if os.path.getsize(filename) == 0:
+                return
+            mm = mmap.mmap(foo.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                self._build_index(mm)
+            finally:
+                mm.close()
+
+    def _build_index(self, mm):
+        size = len(mm)
+        match = FORMATTED_HEADER.search(mm, 0)
+        stride = {}
+        while match is not None:
+            record = _header_record(match)
+            start = match.end() + 1
+            shape = (record["nrow"], record["ncol"])
+
+            nxt, found = None, False
+            if shape in stride:
+                # the next header, or the end of the file, directly
+                # follows a block of the same length
+                pos = start + stride[shape]
+                if pos == size:
+                    found = True
+                elif pos < size:
+                    nxt = FORMATTED_HEADER.match(mm, pos)
+                    found = nxt is not None
+            if not found:
+                # first record of this shape or a different layout
+                nxt = FORMATTED_HEADER.search(mm, start)
+            stop = size if nxt is None else nxt.start()
+            stride[shape] = stop - start
+
+            record["start"], record["stop"] = start, stop
+            self.records.append(record)
+            match = nxt
+
+    @property
+    def recordarray(self):
+        dtype = np.dtype([("kstp", "<i4"), ("kper", "<i4"),
+                          ("pertim", "<f4"), ("totim", "<f4"),
+                          ("text", "S16"), ("ncol", "<i4"),
+                          ("nrow", "<i4"), ("ilay", "<i4")])
+        return np.array([tuple(r[k] for k in dtype.names)
+                         for r in self.records], dtype=dtype)
+
+
+def _header_record(match):
+    """
+    Method to build a record dict from a header match
+    """
+    kstp, kper, pertim, totim, text, ncol, nrow, ilay, fmt = match.groups()
+    return {"kstp": int(kstp), "kper": int(kper),
+            "pertim": _float(pertim), "totim": _float(totim),
+            "text": text.strip().upper(), "ncol": int(ncol),
+            "nrow": int(nrow), "ilay": int(ilay),
+            "fmt": None if fmt is None else fmt.decode()}
+
+
+def _float(value):
+    return float(value.upper().replace(b"D", b"E"))
+
+
+def parse_array_block(block, record):
+    """
+    Method to parse the values of an array block with a single
+    vectorized call. Values that run together (fixed width formats
+    without blank separators) are split on the format field width.
+
+    Parameters
+    ----------
+    block : bytes
+        array block of a formatted head record
+    record : dict
+        record of a FormattedHeadIndex
+
+    Returns
+    -------
+        np.ndarray of float32 with (nrow, ncol) shape
+    """
+    count = record["nrow"] * record["ncol"]
+    if b"D" in block or b"d" in block:
+        block = block.replace(b"D", b"E").replace(b"d", b"e")
+    values = np.fromstring(block, dtype=np.float32, sep=" ")
+    if values.size != count and record["fmt"] is not None:
+        values = _parse_fixed_width(block, record["fmt"])
+    if values.size != count:
+        raise ValueError("Expected {} values for layer {} of time step {}, "
+                         "stress period {}, found {}".format(
+                             count, record["ilay"], record["kstp"],
+                             record["kper"], values.size))
+    return values.reshape(record["nrow"], record["ncol"])
+
+
+def _parse_fixed_width(block, fmt):
+    """
+    Method to split fixed width fields of a fortran format
+    """
+    match = _FORMAT_FIELD.search(fmt)
+    if match is None:
+        return np.zeros(0, dtype=np.float32)
+    width = int(match.group(2))
+    if match.group(1) is not None:
+        # blank separator, e.g. 1X
+        width += int(match.group(1) or 1)
+    lines = block.decode("ascii", "replace").splitlines()
+    fields = [line[i:i + width] for line in lines
+              for i in range(0, len(line.rstrip()), width)]
+    return np.array([f for f in fields if f.strip()], dtype=np.float32)
+
+
+def convert_formatted_head(fhd_file, hds_file, workers=None):
+    """
+    Method to write a formatted head file as a binary head file
+    that flopy's HeadFile reads. Records are parsed in blocks by
+    worker processes that write straight to their offset of the
+    binary file.
+
+    Parameters
+    ----------
+    fhd_file : str
+        formatted head file
+    hds_file : str
+        binary head file name
+    workers : int
+        number of worker processes, default is os.cpu_count()
+    """
+    records = FormattedHeadIndex(fhd_file).records
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + BINARY_HEADER.itemsize +
+                       4 * record["nrow"] * record["ncol"])
+
+    tmp = hds_file + ".{}.tmp".format(os.getpid())
+    with open(tmp, "wb") as foo:
+        foo.truncate(offsets[-1])
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    nblocks = max(1, min(workers, len(records)))
+    bounds = np.linspace(0, len(records), nblocks + 1).astype(int)
+    blocks = [(fhd_file, tmp, records[start:stop], offsets[start])
+              for start, stop in zip(bounds[:-1], bounds[1:])
+              if start < stop]
+    try:
+        if len(blocks) > 1:
+            with ProcessPoolExecutor(max_workers=len(blocks)) as pool:
+                for _ in pool.map(_convert_block, *zip(*blocks)):
+                    pass
+        else:
+            for block in blocks:
+                _convert_block(*block)
+        os.replace(tmp, hds_file)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _convert_block(fhd_file, hds_file, records, offset):
+    """
+    Worker method that parses a block of formatted records and
+    writes them at their offset of the binary head file
+    """
+    header = np.zeros(1, dtype=BINARY_HEADER)
+    with open(fhd_file, "rb") as src, open(hds_file, "r+b") as dst:
+        mm = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            dst.seek(offset)
+            for record in records:
+                a = parse_array_block(mm[record["start"]:record["stop"]],
+                                      record)
+                for key in BINARY_HEADER.names:
+                    header[key] = record[key]
+                header["text"] = record["text"].rjust(16)
+                dst.write(header.tobytes())
+                dst.write(np.ascontiguousarray(a, dtype="<f4").tobytes())
+        finally:
+            mm.close()
+
+
+def binary_head_cache(fhd_file, cache_file=None, workers=None):
+    """
+    Method to get a binary head file of a formatted head file. The
+    binary file is written next to the formatted file on first use,
+    later calls return it as long as it is newer than the formatted
+    head file.
+
+    Parameters
+    ----------
+    fhd_file : str
+        formatted head file
+    cache_file : str
+        optional binary head file name, default is the formatted
+        head file name with a ".mf2web.hds" suffix
+    workers : int
+        number of worker processes used to parse the formatted file
+
+    Returns
+    -------
+        str : binary head file name
+    """
+    if cache_file is None:
+        cache_file = fhd_file + CACHE_SUFFIX
+    if not os.path.isfile(cache_file) or \
+            os.path.getmtime(cache_file) < os.path.getmtime(fhd_file):
+        convert_formatted_head(fhd_file, cache_file, workers=workers)
+    return cache_file
@@ -1,5 +1,4 @@
 import argparse
-from mf2web import GwWebFlow
 
 
 desc = "Create netcdf files for GwWebFlow from MODFLOW models"
@@ -19,24 +18,84 @@ parser.add_argument("--hds", nargs=1, type=str,
                     help="Model binary head file")
 parser.add_argument("--fhd", nargs=1, type=str,
                     help="ASCII formatted head file")
-parser.add_argument("--ucn", nargs=1, type=str,
-                    help="Seawat binary ucn output file")
+parser.add_argument("--ucn", nargs="+", type=str,
+                    help="Seawat binary ucn output file(s), one per "
+                         "species, or auto to find MT3D00N.UCN files")
 parser.add_argument("--cbc", nargs=1, type=str,
                     help="Model binary cell budget file")
+parser.add_argument("--statvar", nargs=1, type=str,
+                    help="GSFLOW/PRMS statvar output file")
+parser.add_argument("--ani", nargs=1, type=str,
+                    help="GSFLOW/PRMS animation output file")
+parser.add_argument("--cbc-terms", nargs="+", type=str,
+                    help="Cell budget terms to export, "
+                         "e.g. STORAGE WELLS \"FLOW RIGHT FACE\"")
+parser.add_argument("--zones", nargs=1, type=str,
+                    help="ZoneBudget zone file, or layer, for zone budgets "
+                         "of the cell budget terms")
+parser.add_argument("--derived", nargs="+", type=str,
+                    choices=["drawdown", "saturated_thickness"],
+                    help="Derived products computed from heads")
+parser.add_argument("--drawdown-ref", nargs=1, type=float,
+                    help="Simulation time of the drawdown reference heads, "
+                         "default is the starting heads")
+parser.add_argument("--tiles", nargs="+", type=int,
+                    help="Zoom levels of a Web-Mercator tile pyramid "
+                         "of the output layers")
+parser.add_argument("--timeseries", action="store_true",
+                    help="Write a cell-major copy of heads and "
+                         "concentrations for hydrograph queries")
+parser.add_argument("--active-only", action="store_true",
+                    help="Store 3d variables by active cells only")
+parser.add_argument("--force", action="store_true",
+                    help="Export even if the files are up to date with "
+                         "the model files")
+parser.add_argument("--profile", nargs=1, type=str,
+                    choices=["full", "output-only", "grid-only"],
+                    help="Model packages to load, full (default) exports "
+                         "input and output, output-only loads the grid "
+                         "and BTN packages and exports output")
+parser.add_argument("--units", nargs=2, type=str,
+                    metavar=("LENGTH", "TIME"),
+                    help="Export units, e.g. meters days. Variables are "
+                         "converted from the reference file units")
+parser.add_argument("--scratch-dir", nargs=1, type=str,
+                    help="Directory for out-of-core storage of "
+                         "modflow-88 package arrays")
+parser.add_argument("--baseline-ws", nargs=1, type=str,
+                    help="Output directory of the baseline run, writes "
+                         "the difference of the output files to the "
+                         "baseline files of the same name")
 parser.add_argument("--ws", nargs=1, type=str,
                     help="Model directory path")
+parser.add_argument("--backend", nargs=1, type=str,
+                    choices=["netcdf", "zarr"],
+                    help="Export format, netcdf (default) or zarr")
+parser.add_argument("--store", nargs=1, type=str,
+                    choices=["directory", "zip"],
+                    help="Zarr store type, directory (default) or zip")
+parser.add_argument("--workers", nargs=1, type=int,
+                    help="Number of worker processes used to read output "
+                         "files and write zarr chunks")
 
 args = parser.parse_args()
 
+# imported after argument parsing, so --help does not load flopy
+from mf2web import GwWebFlow
+
 output_dict = {}
 if args.ucn is not None:
-    output_dict["UCN"] = args.ucn[0]
+    output_dict["UCN"] = args.ucn if len(args.ucn) > 1 else args.ucn[0]
 if args.hds is not None:
     output_dict["HDS"] = args.hds[0]
 if args.cbc is not None:
     output_dict["CBC"] = args.cbc[0]
 if args.fhd is not None:
     output_dict["FHD"] = args.fhd[0]
+if args.statvar is not None:
+    output_dict["STATVAR"] = args.statvar[0]
+if args.ani is not None:
+    output_dict["ANI"] = args.ani[0]
 
 if not output_dict:
     output_dict = None
@@ -53,6 +112,40 @@ length_multiplier = 1
 if args.mult is not None:
     length_multiplier = args.mult[0]
 
+budget_terms = None
+if args.cbc_terms is not None:
+    budget_terms = args.cbc_terms
+
+derived = args.derived
+
+drawdown_reference = None
+if args.drawdown_ref is not None:
+    drawdown_reference = args.drawdown_ref[0]
+
+backend = "netcdf"
+if args.backend is not None:
+    backend = args.backend[0]
+
+store = "directory"
+if args.store is not None:
+    store = args.store[0]
+
+workers = None
+if args.workers is not None:
+    workers = args.workers[0]
+
+scratch_dir = None
+if args.scratch_dir is not None:
+    scratch_dir = args.scratch_dir[0]
+
+zones = None
+if args.zones is not None:
+    zones = args.zones[0]
+
+profile = "full"
+if args.profile is not None:
+    profile = args.profile[0]
+
 nam = args.nam[0]
 ref = args.ref[0]
 ipds = args.ipds[0]
@@ -64,7 +157,33 @@ if version is not None:
 gwweb = GwWebFlow(nam, ref, ipds, scenario=scenario,
                   output_files=output_dict,
                   model_ws=ws,
-                  length_multiplier=length_multiplier)
+                  length_multiplier=length_multiplier,
+                  budget_terms=budget_terms,
+                  profile=profile,
+                  units=args.units,
+                  scratch_dir=scratch_dir)
+
+if profile == "full":
+    gwweb.create_netcdf_input_file(backend=backend, store=store,
+                                   workers=workers,
+                                   active_only=args.active_only,
+                                   force=args.force)
+gwweb.create_netcdf_output_file(backend=backend, store=store,
+                                workers=workers, derived=derived,
+                                drawdown_reference=drawdown_reference,
+                                active_only=args.active_only,
+                                zones=zones,
+                                force=args.force)
+if args.baseline_ws is not None:
+    gwweb.create_netcdf_diff_file(baseline_ws=args.baseline_ws[0],
+                                  backend=backend, store=store,
+                                  workers=workers,
+                                  active_only=args.active_only,
+                                  force=args.force)
+
+if args.timeseries and output_dict is not None and backend == "netcdf":
+    gwweb.create_netcdf_timeseries_file(force=args.force)
 
-gwweb.create_netcdf_input_file()
-gwweb.create_netcdf_output_file()
\ No newline at end of file
+if args.tiles is not None and output_dict is not None and \
+        backend == "netcdf" and not args.active_only:
+    gwweb.create_tile_pyramid(zooms=args.tiles)
\ No newline at end of file
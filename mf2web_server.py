@@ -0,0 +1,37 @@
+import argparse
+
+
+desc = "Serve slices of exported GwWebFlow products to a local web client"
+
+parser = argparse.ArgumentParser(prog="mf2web_server.py", description=desc)
+parser.add_argument("-d", "--dir", nargs=1, type=str,
+                    help="Directory of exported netcdf files and zarr stores")
+parser.add_argument("-p", "--port", nargs=1, type=int,
+                    help="Port number, default is 8085")
+parser.add_argument("--host", nargs=1, type=str,
+                    help="Host name, default only serves local requests")
+parser.add_argument("--cache-mb", nargs=1, type=int,
+                    help="Size of the slice cache in MB, default is 256")
+
+args = parser.parse_args()
+
+# imported after argument parsing, so --help stays fast
+from mf2web.server import serve
+
+directory = "."
+if args.dir is not None:
+    directory = args.dir[0]
+
+port = 8085
+if args.port is not None:
+    port = args.port[0]
+
+host = "127.0.0.1"
+if args.host is not None:
+    host = args.host[0]
+
+cache_mb = 256
+if args.cache_mb is not None:
+    cache_mb = args.cache_mb[0]
+
+serve(directory, host=host, port=port, cache_bytes=cache_mb * 2 ** 20)
@@ -20,5 +20,6 @@ setup(name="mf2web",
       platforms='Windows, Mac OS-X, Linux',
       install_requires=['flopy',
                         'numpy>=1.9'],
-      packages=['mf2web', 'mf2web.seawat', 'mf2web.mt3d', 'mf2web.mf88', 'mf2web.utils'],
+      packages=['mf2web', 'mf2web.seawat', 'mf2web.mt3d', 'mf2web.mf88', 'mf2web.utils',
+                'mf2web.export', 'mf2web.mf6'],
       version=0.1)
@@ -0,0 +1,69 @@
+import numpy as np
+from mf2web.utils.budgetfile import HEADER1, kstpkper_totims
+from mf2web.export.output import get_output_reader, read_record
+
+
+class ModelTime(object):
+    perlen = [10.]
+    nstp = [2]
+    tsmult = [1.]
+
+
+def write_noncompact_budget(fname, shape, records):
+    """
+    Method to write an old style (non-compact) budget file, records
+    are (kstp, kper, text, array) tuples without a totim
+    """
+    nlay, nrow, ncol = shape
+    with open(fname, "wb") as foo:
+        for kstp, kper, text, a in records:
+            header = np.zeros(1, dtype=HEADER1)
+            header["kstp"], header["kper"] = kstp, kper
+            header["text"] = text.rjust(16)
+            header["ncol"], header["nrow"], header["nlay"] = ncol, nrow, nlay
+            foo.write(header.tobytes())
+            foo.write(np.asarray(a, dtype="<f4").tobytes())
+
+
+def test_noncompact_budget_records_by_totim(tmp_path):
+    shape = (2, 3, 4)
+    storage = [np.full(shape, i + 1, dtype=np.float32) for i in range(2)]
+    wells = [-np.full(shape, i + 1, dtype=np.float32) for i in range(2)]
+    fname = str(tmp_path / "model.cbc")
+    write_noncompact_budget(fname, shape,
+                            [(1, 1, b"STORAGE", storage[0]),
+                             (1, 1, b"WELLS", wells[0]),
+                             (2, 1, b"STORAGE", storage[1]),
+                             (2, 1, b"WELLS", wells[1])])
+
+    lookup = kstpkper_totims(ModelTime())
+    assert lookup == {(1, 1): 5., (2, 1): 10.}
+
+    reader = get_output_reader("CBC", fname, totim_lookup=lookup)
+    try:
+        assert sorted(set(reader.recordarray["totim"].tolist())) == \
+            [5., 10.]
+        for itime, totim in enumerate((5., 10.)):
+            a = read_record(reader, totim, b"         STORAGE")
+            np.testing.assert_array_equal(a, storage[itime])
+            a = read_record(reader, totim, b"           WELLS")
+            np.testing.assert_array_equal(a, wells[itime])
+    finally:
+        reader.close()
+
+
+def test_noncompact_budget_selected_terms(tmp_path):
+    shape = (1, 2, 2)
+    fname = str(tmp_path / "model.cbc")
+    write_noncompact_budget(fname, shape,
+                            [(1, 1, b"STORAGE", np.ones(shape)),
+                             (1, 1, b"WELLS", -np.ones(shape))])
+
+    reader = get_output_reader("CBC", fname, budget_terms=["wells"],
+                               totim_lookup={(1, 1): 1.})
+    try:
+        assert [t.strip() for t in reader.textlist] == [b"WELLS"]
+        np.testing.assert_array_equal(read_record(reader, 1., b"WELLS"),
+                                      -np.ones(shape))
+    finally:
+        reader.close()
@@ -0,0 +1,63 @@
+import numpy as np
+from mf2web.export.stats import VariableStatistics, Histogram, \
+    PERCENTILES, STATISTICS
+
+
+FILLVALUE = -1e30
+
+
+def percentile_statistics(values):
+    return np.array([values[STATISTICS.index("p{:02d}".format(p))]
+                     for p in PERCENTILES])
+
+
+def test_head_percentiles():
+    rng = np.random.default_rng(0)
+    heads = rng.uniform(1480., 1520., size=(6, 3, 20, 30))
+    heads[:, :, :2] = FILLVALUE
+
+    # two workers of three time steps each
+    stats = [VariableStatistics(3, FILLVALUE) for _ in range(2)]
+    for itime, a in enumerate(heads):
+        stats[itime // 3].update(itime, a)
+    stats = stats[0].merge(stats[1])
+
+    valid = heads[heads != FILLVALUE]
+    tolerance = (valid.max() - valid.min()) / 1000.
+    result = stats.statistics()
+    assert result["count"] == valid.size
+    np.testing.assert_allclose(
+        [result["p{:02d}".format(p)] for p in PERCENTILES],
+        np.percentile(valid, PERCENTILES), atol=tolerance)
+
+    layers = stats.layer_statistics()
+    for k in range(3):
+        layer = heads[:, k][heads[:, k] != FILLVALUE]
+        np.testing.assert_allclose(percentile_statistics(layers[k]),
+                                   np.percentile(layer, PERCENTILES),
+                                   atol=tolerance)
+
+    steps = stats.time_statistics(6)
+    a = heads[4, 1][heads[4, 1] != FILLVALUE]
+    # a few hundred values, within the spacing of neighbouring values
+    np.testing.assert_allclose(percentile_statistics(steps[4, 1]),
+                               np.percentile(a, PERCENTILES),
+                               atol=2. * (a.max() - a.min()) / a.size)
+
+
+def test_histogram_merge_of_different_ranges():
+    rng = np.random.default_rng(1)
+    low = rng.normal(10., 0.01, 5000)
+    high = rng.normal(1000., 50., 5001)
+    histogram = Histogram()
+    histogram.add(low)
+    other = Histogram()
+    other.add(high)
+    histogram.merge(other)
+
+    values = np.concatenate([low, high])
+    assert histogram.counts.sum() == values.size
+    np.testing.assert_allclose(
+        histogram.percentiles(PERCENTILES, values.min(), values.max()),
+        np.percentile(values, PERCENTILES),
+        atol=(values.max() - values.min()) / 1000.)